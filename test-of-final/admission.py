@@ -0,0 +1,78 @@
+import threading
+import time
+
+
+# AdmissionController class
+#
+# Caps the multiprogramming level (transactions running at once) and adapts
+# the cap AIMD-style once per window of finished transactions: it grows by one
+# while the abort rate stays under target_abort_rate and throughput keeps up,
+# and is cut by `decrease` when aborts climb or throughput falls after a
+# raise, i.e. once the protocol has started to thrash.
+class AdmissionController:
+    def __init__(self, initial_limit=8, min_limit=1, max_limit=256, target_abort_rate=0.2,
+                 decrease=0.5, window=16, clock=time.perf_counter):
+        self.limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_abort_rate = target_abort_rate
+        self.decrease = decrease
+        self.window = window
+        self.clock = clock
+        self.active = 0
+        self.queued = 0
+        self.condition = threading.Condition()
+
+        self.window_started = clock()
+        self.window_finished = 0
+        self.window_aborts = 0
+        self.last_throughput = None
+        self.raised = False
+        self.adjustments = []  # (time, limit, abort_rate, throughput), newest last
+
+    def enqueue(self, count):
+        # Count transactions a dispatcher holds back until acquire(enqueued=True)
+        with self.condition:
+            self.queued += count
+
+    def acquire(self, enqueued=False):
+        with self.condition:
+            if not enqueued:
+                self.queued += 1
+            while self.active >= self.limit:
+                self.condition.wait()
+            self.queued -= 1
+            self.active += 1
+
+    def release(self, aborts=0):
+        with self.condition:
+            self.active -= 1
+            self.window_finished += 1
+            self.window_aborts += aborts
+            if self.window_finished >= self.window:
+                self.adjust()
+            self.condition.notify_all()
+
+    def adjust(self):
+        now = self.clock()
+        elapsed = now - self.window_started
+        throughput = self.window_finished / elapsed if elapsed > 0 else 0.0
+        abort_rate = self.window_aborts / (self.window_finished + self.window_aborts)
+
+        if abort_rate > self.target_abort_rate or (
+                self.raised and self.last_throughput is not None and throughput < 0.9 * self.last_throughput):
+            self.limit = max(self.min_limit, int(self.limit * self.decrease))
+            self.raised = False
+        elif self.limit < self.max_limit:
+            self.limit += 1
+            self.raised = True
+
+        self.adjustments.append((now, self.limit, abort_rate, throughput))
+        del self.adjustments[:-64]
+        self.last_throughput = throughput
+        self.window_started = now
+        self.window_finished = self.window_aborts = 0
+
+    def snapshot(self):
+        with self.condition:
+            return {"limit": self.limit, "active": self.active, "queued": self.queued}
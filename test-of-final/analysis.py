@@ -0,0 +1,159 @@
+from collections import defaultdict
+
+try:
+    import numpy
+except ImportError:  # Optional: a pure-Python pass gives the same answers, slower
+    numpy = None
+
+
+# ConflictAnalysis class
+class ConflictAnalysis:
+    def __init__(self, transactions, operations, conflict_pairs, hot_items, wait_die_aborts, wound_wait_waits,
+                 wound_wait_aborts):
+        self.transactions = transactions
+        self.operations = operations
+        self.conflict_pairs = conflict_pairs
+        self.hot_items = hot_items
+        self.wait_die_aborts = wait_die_aborts
+        self.wound_wait_waits = wound_wait_waits
+        self.wound_wait_aborts = wound_wait_aborts
+
+    def predicted_aborts(self, protocol):
+        if protocol == "wait-die":
+            return self.wait_die_aborts
+        if protocol == "wound-wait":
+            return self.wound_wait_aborts
+        raise ValueError(f"No abort prediction for {protocol!r}")
+
+    def format(self):
+        hot = ", ".join(f"{item} ({pairs})" for item, pairs in self.hot_items)
+        return [
+            f"{self.transactions} transactions, {self.operations} operations, "
+            f"{self.conflict_pairs} conflicting pairs",
+            f"Most contended items: {hot or '-'}",
+            f"Wait-Die: {len(self.wait_die_aborts)} predicted aborts",
+            f"Wound-Wait: {len(self.wound_wait_waits)} predicted waits, "
+            f"{len(self.wound_wait_aborts)} predicted aborts",
+        ]
+
+
+# Predicts contention for a queued batch before it runs, using the model the
+# executor follows: every transaction starts at once, oldest first, and its
+# k-th operation holds its lock during tick k.
+#   conflict_pairs  distinct transaction pairs sharing an item, one writing
+#   wait-die        a request that meets an older conflicting request in the
+#                   same (item, tick) dies
+#   wound-wait      that request waits instead, so it gets the lock a tick
+#                   late; if an older conflicting request for the item
+#                   arrives in that tick, the late holder is wounded
+# With NumPy the (transaction, item, tick) incidence is handled as flat
+# arrays: group counts with bincount, tick groups with one lexsort, so the
+# cost is a few sorts over the operations rather than any per-pair work.
+def analyze_conflicts(transactions, top_n=5, use_numpy=None):
+    use_numpy = numpy is not None if use_numpy is None else use_numpy
+    if use_numpy and numpy is None:
+        raise ImportError("numpy is not installed")
+
+    ordered = sorted(transactions, key=lambda t: t[0].start_time)
+    tids = [trans.tid for trans, _ in ordered]
+    item_ids = {}
+    ranks, items, ticks, writes = [], [], [], []
+    for rank, (_, operations) in enumerate(ordered):
+        for tick, (op, item) in enumerate(operations):
+            ranks.append(rank)
+            items.append(item_ids.setdefault(item, len(item_ids)))
+            ticks.append(tick)
+            writes.append(op == 'W')
+    names = list(item_ids)
+
+    analyze = _analyze_numpy if use_numpy else _analyze_python
+    pair_counts, wait_die, wound_waits, wound_aborts = analyze(ranks, items, ticks, writes, len(names))
+    hot = sorted(((names[item], pairs) for item, pairs in pair_counts.items() if pairs), key=lambda e: -e[1])
+    return ConflictAnalysis(len(ordered), len(ranks), sum(pair_counts.values()), hot[:top_n],
+                            {tids[rank] for rank in wait_die}, {tids[rank] for rank in wound_waits},
+                            {tids[rank] for rank in wound_aborts})
+
+
+def _analyze_python(ranks, items, ticks, writes, item_count):
+    # Per item: distinct readers and writers (a write subsumes a read)
+    access = defaultdict(dict)
+    for rank, item, write in zip(ranks, items, writes):
+        access[item][rank] = access[item].get(rank, False) or write
+    pair_counts = {}
+    for item, modes in access.items():
+        writers = sum(modes.values())
+        readers = len(modes) - writers
+        pair_counts[item] = writers * (writers - 1) // 2 + writers * readers
+
+    # Tick groups in arrival (age) order
+    groups = defaultdict(list)
+    for rank, item, tick, write in zip(ranks, items, ticks, writes):
+        groups[(item, tick)].append((rank, write))
+    oldest = {}
+    oldest_writer = {}
+    for key, members in groups.items():
+        members.sort()
+        oldest[key] = members[0][0]
+        oldest_writer[key] = next((rank for rank, write in members if write), None)
+
+    wait_die, wound_waits, wound_aborts = set(), set(), set()
+    for (item, tick), members in groups.items():
+        seen_write = members[0][1]
+        for rank, write in members[1:]:
+            if write or seen_write:
+                wait_die.add(rank)
+                wound_waits.add(rank)
+                later = (item, tick + 1)
+                rival = oldest.get(later) if write else oldest_writer.get(later)
+                if rival is not None and rival < rank:
+                    wound_aborts.add(rank)
+            seen_write = seen_write or write
+    return pair_counts, wait_die, wound_waits, wound_aborts
+
+
+def _analyze_numpy(ranks, items, ticks, writes, item_count):
+    ranks = numpy.asarray(ranks, dtype=numpy.int64)
+    items = numpy.asarray(items, dtype=numpy.int64)
+    ticks = numpy.asarray(ticks, dtype=numpy.int64)
+    writes = numpy.asarray(writes, dtype=numpy.int64)
+    if not len(ranks):
+        return {}, set(), set(), set()
+    transaction_count = int(ranks.max()) + 1
+    tick_count = int(ticks.max()) + 2
+
+    # Distinct (item, transaction) accesses; a write subsumes a read
+    access = items * transaction_count + ranks
+    order = numpy.argsort(access, kind="stable")
+    access, access_writes = access[order], writes[order]
+    starts = numpy.flatnonzero(numpy.r_[True, access[1:] != access[:-1]])
+    distinct_items = access[starts] // transaction_count
+    distinct_writes = numpy.maximum.reduceat(access_writes, starts)
+    writers = numpy.bincount(distinct_items, weights=distinct_writes, minlength=item_count)
+    total = numpy.bincount(distinct_items, minlength=item_count)
+    pairs = writers * (writers - 1) // 2 + writers * (total - writers)
+    pair_counts = {item: int(count) for item, count in enumerate(pairs) if count}
+
+    # (item, tick) groups sorted by age; position 0 of each group is its oldest
+    group = items * tick_count + ticks
+    order = numpy.lexsort((ranks, group))
+    group, group_ranks, group_writes = group[order], ranks[order], writes[order]
+    first = numpy.r_[True, group[1:] != group[:-1]]
+    starts = numpy.flatnonzero(first)
+    group_index = numpy.cumsum(first) - 1
+    writes_before = numpy.cumsum(group_writes) - group_writes
+    writes_before -= writes_before[starts][group_index]
+    blocked = ~first & ((group_writes == 1) | (writes_before > 0))
+
+    # Oldest member and oldest writer of every group, looked up for tick + 1
+    keys = group[starts]
+    oldest = group_ranks[starts]
+    writer_ranks = numpy.where(group_writes == 1, group_ranks, transaction_count)
+    oldest_writer = numpy.minimum.reduceat(writer_ranks, starts)
+    later = group[blocked] + 1
+    position = numpy.minimum(numpy.searchsorted(keys, later), len(keys) - 1)
+    present = keys[position] == later
+    rival = numpy.where(group_writes[blocked] == 1, oldest[position], oldest_writer[position])
+    wounded = present & (rival < group_ranks[blocked])
+
+    waiting = set(group_ranks[blocked].tolist())
+    return pair_counts, waiting, waiting, set(group_ranks[blocked][wounded].tolist())
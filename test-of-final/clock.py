@@ -0,0 +1,47 @@
+import threading
+import time
+
+# Timestamp layout (fits a signed 64-bit field, as used on the wire):
+#   42 bits wall-clock milliseconds | 12 bits logical counter | 8 bits node id
+# The logical counter lives in the low bits of the HLC value, so bursts of
+# more than 4096 stamps per millisecond simply borrow from the physical part
+# and stay monotonic.
+LOGICAL_BITS = 12
+NODE_BITS = 8
+MAX_NODE_ID = (1 << NODE_BITS) - 1
+
+
+def physical_ms(timestamp):
+    return timestamp >> (LOGICAL_BITS + NODE_BITS)
+
+
+def node_of(timestamp):
+    return timestamp & MAX_NODE_ID
+
+
+# HybridLogicalClock class
+class HybridLogicalClock:
+    # Give every thread pool or process that issues start times its own
+    # node_id; stamps are then unique and totally ordered across all of them
+    def __init__(self, node_id=0, wall_ms=lambda: time.time_ns() // 1_000_000):
+        if not 0 <= node_id <= MAX_NODE_ID:
+            raise ValueError(f"node_id must be between 0 and {MAX_NODE_ID}")
+        self.node_id = node_id
+        self.wall_ms = wall_ms
+        self.last = 0
+        self.mutex = threading.Lock()
+
+    def now(self):
+        wall = self.wall_ms() << LOGICAL_BITS
+        with self.mutex:
+            self.last = max(self.last + 1, wall)
+            return (self.last << NODE_BITS) | self.node_id
+
+    def update(self, remote_timestamp):
+        # Fold in a stamp received from another node so causally later
+        # stamps issued here always compare greater
+        remote = remote_timestamp >> NODE_BITS
+        wall = self.wall_ms() << LOGICAL_BITS
+        with self.mutex:
+            self.last = max(self.last + 1, remote + 1, wall)
+            return (self.last << NODE_BITS) | self.node_id
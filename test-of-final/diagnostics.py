@@ -0,0 +1,73 @@
+import gzip
+import json
+import time
+from collections import deque
+
+
+def _open(path, mode):
+    return gzip.open(path, mode + "t", encoding="utf-8") if path.endswith(".gz") else open(path, mode, encoding="utf-8")
+
+
+def dump_state(lock_manager, path):
+    # One consistent LockManager.state_snapshot(), written as compact JSON
+    # (gzipped when the path ends in .gz)
+    state = lock_manager.state_snapshot()
+    with _open(path, "w") as out:
+        json.dump(state, out, separators=(",", ":"))
+    return state
+
+
+def load_state(path):
+    with _open(path, "r") as source:
+        state = json.load(source)
+    if state.get("version") != 1:
+        raise ValueError(f"Unsupported lock state version: {state.get('version')!r}")
+    return state
+
+
+def restore_state(lock_manager, state, make_transaction):
+    # Rebuild holders, modes and wait queues in a fresh manager of the dump's
+    # protocol; returns the restored transactions by tid. A waiter the dump
+    # has no transaction for is left out and reported on the manager's queue.
+    if state["protocol"] != lock_manager.protocol:
+        raise ValueError(f"Lock state is from a {state['protocol']} manager, not {lock_manager.protocol}")
+    trans_by_tid = {}
+    for tid, start_time, held in state["transactions"]:
+        trans = make_transaction(tid, start_time)
+        trans.locks_held.update(held)
+        trans_by_tid[tid] = trans
+
+    skipped = []
+    with lock_manager.lock:
+        for trans in trans_by_tid.values():
+            lock_manager.transactions[trans.tid] = trans
+        for item, entry in state["holders"].items():
+            lock_manager.locks[item] = list(entry["tids"])
+            lock_manager.lock_table[item] = entry["mode"]
+        for item, entries in state["waiters"].items():
+            waiters = deque()
+            for tid, lock_type, waited_since in entries:
+                if tid in trans_by_tid:
+                    waiters.append((trans_by_tid[tid], lock_type, waited_since))
+                else:
+                    skipped.append((tid, item))
+            if waiters:
+                lock_manager.wait_queue[item] = waiters
+    for tid, item in skipped:
+        lock_manager.messages.put(f"Lock state: skipped waiter T{tid} on {item}, which has no transaction")
+    return trans_by_tid
+
+
+def describe_state(state, now=None):
+    now = now or state["taken_at"]
+    lines = [f"Protocol: {state['protocol']}, {len(state['transactions'])} transactions"]
+    for item, entry in sorted(state["holders"].items()):
+        lines.append(f"  {item}: {entry['mode']} held by {', '.join(f'T{tid}' for tid in entry['tids'])}")
+    for item, entries in sorted(state["waiters"].items()):
+        queued = ", ".join(f"T{tid} {lock_type} ({now - since:.3f}s)" for tid, lock_type, since in entries)
+        lines.append(f"  {item}: waiting {queued}")
+    return lines
+
+
+def default_dump_path():
+    return time.strftime("lock-state-%Y%m%d-%H%M%S.json")
@@ -0,0 +1,154 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from metrics import bucket_index, bucket_upper_bound
+
+# Exported wait/hold histogram bounds in seconds
+EXPORT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+# Prometheus text exposition format 0.0.4
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _bucket_edges(bounds):
+    # A cumulative bucket may only count whole HDR buckets, so each bound is
+    # moved down to the last HDR bucket edge at or below it and exported
+    # under that exact value: (le label, last HDR bucket index)
+    edges = []
+    for bound in bounds:
+        limit_ns = int(round(bound * 1e9))
+        index = bucket_index(limit_ns)
+        if bucket_upper_bound(index) > limit_ns:
+            index -= 1
+        edges.append((f"{bucket_upper_bound(index) / 1e9:.9g}", index))
+    return edges
+
+
+EXPORT_EDGES = _bucket_edges(EXPORT_BUCKETS)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _histogram_lines(name, help_text, histogram):
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    cumulative = 0
+    index = 0
+    for label, limit in EXPORT_EDGES:
+        while index <= limit:
+            cumulative += histogram.counts[index]
+            index += 1
+        lines.append(f'{name}_bucket{{le="{label}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{le="+Inf"}} {histogram.count}')
+    lines.append(f"{name}_sum {histogram.total / 1e9}")
+    lines.append(f"{name}_count {histogram.count}")
+    return lines
+
+
+def render_metrics(snapshot, table=None):
+    lines = [
+        "# HELP lock_grants_total Locks granted.",
+        "# TYPE lock_grants_total counter",
+        f"lock_grants_total {snapshot['grants']}",
+        "# HELP lock_waits_total Lock requests that had to wait.",
+        "# TYPE lock_waits_total counter",
+        f"lock_waits_total {snapshot['waits']}",
+        "# HELP transactions_committed_total Transactions committed.",
+        "# TYPE transactions_committed_total counter",
+        f"transactions_committed_total {snapshot['commits']}",
+        "# HELP transactions_read_only_total Read-only transactions served from a snapshot.",
+        "# TYPE transactions_read_only_total counter",
+        f"transactions_read_only_total {snapshot['read_only']}",
+        "# HELP transaction_aborts_total Transaction aborts by protocol rule.",
+        "# TYPE transaction_aborts_total counter",
+    ]
+    for rule, count in sorted(snapshot["aborts"].items()):
+        lines.append(f'transaction_aborts_total{{rule="{_escape(rule)}"}} {count}')
+    lines += [
+        "# HELP transactions_active Transactions started but not committed.",
+        "# TYPE transactions_active gauge",
+        f"transactions_active {snapshot['active']}",
+        "# HELP lock_item_waits_total Lock waits per item.",
+        "# TYPE lock_item_waits_total counter",
+    ]
+    for item, count in sorted(snapshot["item_waits"].items()):
+        lines.append(f'lock_item_waits_total{{item="{_escape(item)}"}} {count}')
+    lines += [
+        "# HELP transaction_worst_wait_seconds Longest single lock wait of the most starved transactions.",
+        "# TYPE transaction_worst_wait_seconds gauge",
+    ]
+    for tid, wait_ns, aborts, waiting in snapshot.get("starvation", ()):
+        lines.append(f'transaction_worst_wait_seconds{{tid="{tid}",aborts="{aborts}",waiting="{int(waiting)}"}} '
+                     f'{wait_ns / 1e9:.9f}')
+    lines += _histogram_lines("lock_wait_seconds", "Time from enqueue to grant.", snapshot["wait_ns"])
+    lines += _histogram_lines("lock_hold_seconds", "Time from grant to release.", snapshot["hold_ns"])
+
+    if table is not None:
+        lines += [
+            "# HELP lock_items_held Items with at least one lock holder.",
+            "# TYPE lock_items_held gauge",
+            f"lock_items_held {len(table['holders'])}",
+            "# HELP lock_waiters Transactions queued per item.",
+            "# TYPE lock_waiters gauge",
+        ]
+        for item, depth in sorted(table["waiters"].items()):
+            lines.append(f'lock_waiters{{item="{_escape(item)}"}} {depth}')
+
+    return "\n".join(lines) + "\n"
+
+
+# MetricsExporter class
+class MetricsExporter:
+    # lock_manager_source returns the current LockManager (or None); the App
+    # swaps managers between batches, so it is looked up on every scrape
+    def __init__(self, metrics, lock_manager_source=None, host="127.0.0.1", port=0):
+        self.metrics = metrics
+        self.lock_manager_source = lock_manager_source
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = exporter.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def render(self):
+        table = None
+        lock_manager = self.lock_manager_source() if self.lock_manager_source else None
+        if lock_manager is not None:
+            table = lock_manager.table_snapshot()
+        return render_metrics(self.metrics.snapshot(), table)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self.thread is not None:
+            self.thread.join()
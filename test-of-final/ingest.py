@@ -0,0 +1,166 @@
+import csv
+import gzip
+import json
+import re
+import sys
+import threading
+from queue import Queue
+
+FORMATS = ("text", "jsonl", "csv")
+
+_OPERATION = re.compile(r"([RW])\(\s*([^()\s,]+)\s*\)")
+_TEXT_LINE = re.compile(r"\s*T?(\d+)\s*:(.*)")
+
+
+def parse_operations(text):
+    operations = [(match.group(1), match.group(2)) for match in _OPERATION.finditer(text)]
+    if _OPERATION.sub(" ", text).replace(",", " ").split() or not operations:
+        raise ValueError(f"Malformed operations: {text.strip()!r}")
+    return operations
+
+
+# Input formats, one transaction per record unless noted:
+#   text   T1: R(x) W(y)         the "T<tid>:" prefix is optional; blank
+#                                lines and lines starting with # are skipped
+#   jsonl  {"tid": 1, "operations": [["R", "x"], ["W", "y"]]}
+#                                operations may also be "R(x) W(y)", tid may
+#                                be left out
+#   csv    tid,op,item           one operation per row; consecutive rows with
+#                                the same tid form a transaction; an optional
+#                                header row is skipped
+# Every parser takes an iterable of lines and yields (tid or None, operations).
+def parse_text(lines):
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        match = _TEXT_LINE.fullmatch(line)
+        if match is None:
+            yield None, parse_operations(line)
+        else:
+            yield int(match.group(1)), parse_operations(match.group(2))
+
+
+def parse_jsonl(lines):
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if "operations" not in record:
+            raise ValueError("Record has no operations")
+        operations = record["operations"]
+        if isinstance(operations, str):
+            operations = parse_operations(operations)
+        else:
+            operations = [(op, str(item)) for op, item in operations]
+            if not operations or any(op not in ("R", "W") for op, _ in operations):
+                raise ValueError(f"Malformed operations: {record['operations']!r}")
+        tid = record.get("tid")
+        yield (None if tid is None else int(tid)), operations
+
+
+def parse_csv(lines):
+    tid, operations = None, []
+    for row in csv.reader(lines):
+        if not row or (not operations and tid is None and row[0].strip().lower() == "tid"):
+            continue
+        if len(row) != 3 or row[1].strip() not in ("R", "W"):
+            raise ValueError(f"Malformed row: {','.join(row)!r}")
+        row_tid = int(row[0])
+        if operations and row_tid != tid:
+            yield tid, operations
+            operations = []
+        tid = row_tid
+        operations.append((row[1].strip(), row[2].strip()))
+    if operations:
+        yield tid, operations
+
+
+PARSERS = {"text": parse_text, "jsonl": parse_jsonl, "csv": parse_csv}
+
+
+def detect_format(path):
+    name = path[:-3] if path.endswith(".gz") else path
+    if name.endswith((".jsonl", ".ndjson", ".json")):
+        return "jsonl"
+    if name.endswith(".csv"):
+        return "csv"
+    return "text"
+
+
+def _numbered(lines, counter):
+    for counter[0], line in enumerate(lines, 1):
+        yield line
+
+
+# Stream (tid, operations) records from a file, a .gz file or stdin ("-").
+# Nothing is read ahead: each record is parsed when the consumer asks for
+# it, so the size of the source does not matter. Records without a tid get
+# the one after the largest tid seen so far. Parse errors are ValueErrors
+# naming the source and line.
+def read_transactions(source, fmt=None):
+    fmt = fmt or ("text" if source == "-" else detect_format(source))
+    if fmt not in PARSERS:
+        raise ValueError(f"Unknown transaction format: {fmt!r}")
+    if source == "-":
+        stream, name = sys.stdin, "<stdin>"
+    elif source.endswith(".gz"):
+        stream, name = gzip.open(source, "rt", newline=""), source
+    else:
+        stream, name = open(source, newline=""), source
+
+    line = [0]
+    next_tid = 1
+    try:
+        for tid, operations in PARSERS[fmt](_numbered(stream, line)):
+            if tid is None:
+                tid = next_tid
+            next_tid = max(next_tid, tid + 1)
+            yield tid, operations
+    except (ValueError, TypeError) as error:
+        raise ValueError(f"{name}:{line[0]}: {error}") from error
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+# Run a record stream on a fixed pool of worker threads. Records pass
+# through a queue of at most `backlog` entries, so the reader blocks while
+# the workers are busy and the source is consumed only as fast as
+# transactions finish. Returns the number of records run. If execute
+# raises, reading stops, the workers skip what is still queued, and the
+# first error is raised here once they have all exited.
+def run_stream(records, execute, workers=16, backlog=64):
+    queue = Queue(maxsize=backlog)
+    errors = []
+
+    def work():
+        while True:
+            record = queue.get()
+            if record is None:
+                return
+            if errors:
+                continue  # Keep draining so the reader never blocks on a full queue
+            try:
+                execute(*record)
+            except Exception as error:
+                errors.append(error)
+
+    threads = [threading.Thread(target=work, name=f"worker-{n}", daemon=True) for n in range(1, workers + 1)]
+    for thread in threads:
+        thread.start()
+    count = 0
+    try:
+        for record in records:
+            if errors:
+                break
+            queue.put(record)
+            count += 1
+    finally:
+        for _ in threads:
+            queue.put(None)
+        for thread in threads:
+            thread.join()
+    if errors:
+        raise errors[0]
+    return count
@@ -0,0 +1,124 @@
+import threading
+
+
+# Lock activity of one running transaction
+class LockActivity:
+    __slots__ = ("tid", "begin", "waits", "holds", "queued", "aborts", "version", "owner")
+
+    def __init__(self, tid, begin):
+        self.tid = tid
+        self.begin = begin
+        self.waits = {}  # item -> (start, lock_type)
+        self.holds = {}  # item -> (start, lock_type)
+        self.queued = []  # (item, lock_type) still in a wait queue, even after an abort
+        self.aborts = 0
+        self.version = 0  # bumped on every event
+        self.owner = None  # whatever the recorder draws it on: a timeline row, a trace track
+
+
+# LockSpanRecorder class
+#
+# The bookkeeping shared by the timeline and trace recorders (same interface
+# as replay.ScheduleRecorder): it turns engine events into wait spans, from
+# being queued to the grant or the abort, and hold spans, from the grant to
+# the release, abort or commit. read_item doesn't block, so a transaction
+# can commit while still queued for an item; that request is remembered
+# until its grant arrives, which is reported as late instead of starting a
+# new transaction. Subclasses supply _now() and the hooks below, which all
+# run under self._lock.
+class LockSpanRecorder:
+    def __init__(self, forward=None):
+        self.forward = forward  # Optional recorder that gets every event too
+        self.active = {}  # tid -> LockActivity, while the transaction runs
+        self.lingering = {}  # committed tid -> (item, lock_type) it is still queued for
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def record(self, kind, tid, item=None, lock_type=None, detail=None):
+        if self.forward is not None:
+            self.forward.record(kind, tid, item, lock_type, detail)
+        if kind == "add":
+            return
+        with self._lock:
+            if self.closed:
+                return
+            now = self._now()
+            activity = self.active.get(tid)
+            if activity is None:
+                # A grant for a request left queued at commit, or an abort
+                # after commit, has no running transaction to go on
+                lingering = self.lingering.get(tid)
+                if kind == "granted" and lingering is not None and (item, lock_type) in lingering:
+                    lingering.remove((item, lock_type))
+                    if not lingering:
+                        del self.lingering[tid]
+                    self._late(tid, kind, item, lock_type, now, detail)
+                    return
+                if kind == "aborted":
+                    self._late(tid, kind, item, lock_type, now, detail)
+                    return
+                if kind == "release":
+                    return
+                activity = self.active[tid] = LockActivity(tid, now)
+                self._begin(activity)
+            activity.version += 1
+
+            if kind == "waiting":
+                activity.waits.setdefault(item, (now, lock_type))
+                activity.queued.append((item, lock_type))
+            elif kind == "granted":
+                if (item, lock_type) in activity.queued:
+                    activity.queued.remove((item, lock_type))
+                waited = activity.waits.pop(item, None)
+                if waited is not None:
+                    self._span(activity, "wait", item, waited[1], waited[0], now)
+                activity.holds.setdefault(item, (now, lock_type))
+            elif kind == "release":
+                held = activity.holds.pop(item, None)
+                if held is not None:
+                    self._span(activity, "hold", item, held[1], held[0], now)
+            elif kind == "aborted":
+                activity.aborts += 1
+                self._close_spans(activity, now, "aborted")
+                self._aborted(activity, now, detail)
+            elif kind == "commit":
+                if activity.queued:
+                    self.lingering[tid] = activity.queued
+                self._close_spans(activity, now)
+                self._committed(activity, now)
+                del self.active[tid]
+
+    def _close_spans(self, activity, now, how=None):
+        for item, (start, lock_type) in activity.waits.items():
+            self._span(activity, "wait", item, lock_type, start, now, how)
+        for item, (start, lock_type) in activity.holds.items():
+            self._span(activity, "hold", item, lock_type, start, now, how)
+        activity.waits.clear()
+        activity.holds.clear()
+
+    def _close_active(self, now):
+        # Under self._lock: end everything still open, e.g. when the run stops
+        for activity in self.active.values():
+            self._close_spans(activity, now, "unfinished")
+        self.closed = True
+
+    # Hooks
+    def _now(self):
+        raise NotImplementedError
+
+    def _begin(self, activity):
+        pass
+
+    def _span(self, activity, category, item, lock_type, start, end, how=None):
+        # category is "wait" or "hold"; how is None, "aborted" or "unfinished"
+        pass
+
+    def _aborted(self, activity, now, detail):
+        pass
+
+    def _committed(self, activity, now):
+        pass
+
+    def _late(self, tid, kind, item, lock_type, now, detail):
+        # A "granted" for a request left queued at commit, or an "aborted" after commit
+        pass
@@ -0,0 +1,493 @@
+import queue
+import socket
+import socketserver
+import struct
+import threading
+from contextlib import contextmanager
+
+from clock import HybridLogicalClock
+from sharding import shard_for
+
+# Wire format: every frame is a 4-byte big-endian length followed by the body.
+# Request body:  opcode, request id, tid, start time, lock type, item length, item
+# Response body: request id, status
+# A REQUEST is answered once it is decided, GRANTED or ABORTED: a request that
+# has to wait holds its reply (and any frames pipelined behind it on the same
+# connection) until the lock is handed over. REQUEST_MANY does the same for a
+# whole lock set carried in the item field, like PREPARE, and answers once
+# for all of it. WAITING is only a PREPARE vote. ROLLBACK_PREPARED (tid 0)
+# rolls back every transaction still prepared on the node, for coordinator
+# recovery.
+LENGTH = struct.Struct("!I")
+REQUEST_HEADER = struct.Struct("!BIqqcH")
+RESPONSE = struct.Struct("!IB")
+
+OP_REQUEST = 1
+OP_RELEASE = 2
+OP_ABORT = 3
+OP_END = 4
+OP_PREPARE = 5
+OP_COMMIT = 6
+OP_ROLLBACK = 7
+OP_REQUEST_MANY = 8
+OP_ROLLBACK_PREPARED = 9
+
+GRANTED = 0
+WAITING = 1
+ABORTED = 2
+OK = 3
+ERROR = 4
+
+STATUS_NAMES = {GRANTED: "granted", WAITING: "waiting", ABORTED: "aborted", OK: "ok", ERROR: "error"}
+
+
+def encode_request(opcode, request_id, tid, start_time=0, item="", lock_type="-"):
+    item_bytes = item.encode("utf-8")
+    body = REQUEST_HEADER.pack(opcode, request_id, tid, start_time, lock_type.encode("ascii"), len(item_bytes))
+    return LENGTH.pack(len(body) + len(item_bytes)) + body + item_bytes
+
+
+# A PREPARE or REQUEST_MANY carries every (item, lock_type) for one node in the item field
+def encode_lock_requests(requests):
+    return "\0".join(lock_type + item for item, lock_type in requests)
+
+
+def decode_lock_requests(field):
+    return [(entry[1:], entry[0]) for entry in field.split("\0") if entry]
+
+
+def decode_request(body):
+    opcode, request_id, tid, start_time, lock_type, item_length = REQUEST_HEADER.unpack_from(body)
+    item = body[REQUEST_HEADER.size:REQUEST_HEADER.size + item_length].decode("utf-8")
+    return opcode, request_id, tid, start_time, item, lock_type.decode("ascii")
+
+
+# Server side: one LockManager shared by every connection
+class LockService:
+    def __init__(self, lock_manager, make_transaction, clock=None):
+        self.lock_manager = lock_manager
+        self.make_transaction = make_transaction
+        # This node's clock; every start time received is folded in, so any
+        # stamp issued here afterwards orders after it
+        self.clock = clock or HybridLogicalClock()
+        self.transactions = {}
+        self.aborted = set()
+        self.prepared = set()
+        self.mutex = threading.Lock()
+        self.decided = threading.Condition(lock_manager.lock)  # Notified on every grant and abort
+        lock_manager.recorder = self
+
+    # Recorder interface: remember aborts until the owner hears about them,
+    # and wake requests blocked in request(). Grants and aborts are always
+    # recorded under the manager's lock.
+    def record(self, kind, tid, item=None, lock_type=None, detail=None):
+        if kind == "aborted":
+            self.aborted.add(tid)
+        if kind in ("granted", "aborted"):
+            self.decided.notify_all()
+
+    def transaction(self, tid, start_time):
+        with self.mutex:
+            trans = self.transactions.get(tid)
+            if trans is None:
+                self.clock.update(start_time)
+                trans = self.make_transaction(tid, start_time)
+                self.transactions[tid] = trans
+                self.lock_manager.add_transaction(trans)
+            return trans
+
+    def forget(self, trans):
+        with self.mutex:
+            self.transactions.pop(trans.tid, None)
+        self.lock_manager.remove_transaction(trans)
+
+    def handle(self, opcode, tid, start_time, item, lock_type):
+        lock_manager = self.lock_manager
+        if opcode == OP_ROLLBACK_PREPARED:
+            self.rollback_prepared()
+            return OK
+        if opcode not in (OP_REQUEST, OP_REQUEST_MANY, OP_PREPARE):
+            with self.mutex:
+                trans = self.transactions.get(tid)
+            if trans is None:
+                # Already finished; repeats (e.g. a resent COMMIT) are harmless
+                self.aborted.discard(tid)
+                return OK
+        else:
+            trans = self.transaction(tid, start_time)
+
+        if opcode == OP_PREPARE:
+            return self.prepare(trans, decode_lock_requests(item))
+        if opcode == OP_COMMIT or opcode == OP_ROLLBACK:
+            self.finish(trans)
+            return OK
+        if opcode == OP_REQUEST:
+            return self.request(trans, item, lock_type)
+        if opcode == OP_REQUEST_MANY:
+            return self.request_many(trans, decode_lock_requests(item))
+        if opcode == OP_RELEASE:
+            lock_manager.release_lock(trans, item)
+            return OK
+        if opcode == OP_ABORT:
+            lock_manager.abort_transaction(trans, cause="client")
+            self.aborted.discard(tid)
+            self.forget(trans)
+            return OK
+        if opcode == OP_END:
+            self.finish(trans)
+            return OK
+        return ERROR
+
+    def request(self, trans, item, lock_type):
+        lock_manager = self.lock_manager
+        tid = trans.tid
+        with self.decided:
+            if tid in self.aborted:
+                self.aborted.discard(tid)
+                return ABORTED
+            if item in trans.locks_held and (lock_type == 'R' or lock_manager.lock_table[item] == 'W'):
+                return GRANTED  # Already held in this mode or a stronger one: nothing to do
+            lock_manager.request_lock(trans, item, lock_type)
+            return self.await_decision(trans, item)
+
+    def request_many(self, trans, requests):
+        # One critical section for the whole set (LockManager.request_locks,
+        # in item order); it is only left to wait for an item that is not
+        # free, and picks up with the rest of the set once that is granted
+        lock_manager = self.lock_manager
+        tid = trans.tid
+        with self.decided:
+            while True:
+                if tid in self.aborted:
+                    self.aborted.discard(tid)
+                    return ABORTED
+                if lock_manager.request_locks(trans, requests):
+                    return GRANTED
+                if tid not in self.aborted:
+                    blocked = min(item for item, _ in requests if item not in trans.locks_held)
+                    if self.await_decision(trans, blocked) == ABORTED:
+                        return ABORTED
+
+    def await_decision(self, trans, item):
+        # Called under self.decided once item has been requested
+        tid = trans.tid
+        while item not in trans.locks_held and tid not in self.aborted:
+            self.decided.wait()
+        if tid in self.aborted:
+            # Aborted while queued: leave the queue, and hand back a lock
+            # promoted to it after the abort
+            self.aborted.discard(tid)
+            self.lock_manager.cancel_wait(trans, item)
+            if item in trans.locks_held:
+                self.lock_manager.release_lock(trans, item)
+            return ABORTED
+        return GRANTED
+
+    # Two-phase commit participant: phase one takes every lock this node
+    # needs in one go and votes GRANTED (yes), WAITING (retry later with the
+    # same start time) or ABORTED (the protocol killed it). A waiting request
+    # is withdrawn rather than left queued, and under wound-wait a prepared
+    # holder is never wounded: the requester is told to retry instead.
+    def prepare(self, trans, requests):
+        lock_manager = self.lock_manager
+        tid = trans.tid
+        with lock_manager.lock:
+            if tid in self.aborted:
+                self.aborted.discard(tid)
+                self.finish(trans)
+                return ABORTED
+            for item, lock_type in sorted(requests):
+                if item in trans.locks_held:
+                    continue
+                holders = lock_manager.locks.get(item, ())
+                conflicts = lock_type == 'W' or lock_manager.lock_table.get(item) == 'W'
+                if lock_manager.protocol == "wound-wait" and conflicts and any(
+                        holder in self.prepared and holder != tid for holder in holders):
+                    self.finish(trans)
+                    return WAITING
+                lock_manager.request_lock(trans, item, lock_type)
+                if tid in self.aborted:
+                    self.aborted.discard(tid)
+                    self.finish(trans)
+                    return ABORTED
+                if item not in trans.locks_held:
+                    lock_manager.cancel_wait(trans, item)
+                    self.finish(trans)
+                    return WAITING
+            self.prepared.add(tid)
+            return GRANTED
+
+    def finish(self, trans):
+        # Commit and rollback both just release: this engine has no values
+        with self.lock_manager.lock:
+            for held in list(trans.locks_held):
+                self.lock_manager.release_lock(trans, held)
+            self.aborted.discard(trans.tid)
+            self.prepared.discard(trans.tid)
+        self.forget(trans)
+
+    def in_doubt(self):
+        with self.lock_manager.lock:
+            return set(self.prepared)
+
+    # Coordinator recovery: roll back every transaction still prepared here
+    def rollback_prepared(self):
+        orphans = []
+        with self.lock_manager.lock:
+            for tid in sorted(self.prepared):
+                with self.mutex:
+                    trans = self.transactions.get(tid)
+                if trans is None:
+                    self.prepared.discard(tid)
+                else:
+                    orphans.append(trans)
+        for trans in orphans:
+            self.finish(trans)
+        return [trans.tid for trans in orphans]
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        # Parse every complete frame that has arrived and answer the whole
+        # pipelined batch with a single sendall
+        service = self.server.service
+        buffer = b""
+        while True:
+            data = self.request.recv(65536)
+            if not data:
+                return
+            buffer += data
+            responses = []
+            offset = 0
+            while len(buffer) - offset >= LENGTH.size:
+                (length,) = LENGTH.unpack_from(buffer, offset)
+                if len(buffer) - offset - LENGTH.size < length:
+                    break
+                body = buffer[offset + LENGTH.size:offset + LENGTH.size + length]
+                offset += LENGTH.size + length
+                responses.append(self.answer(service, body))
+            buffer = buffer[offset:]
+            if responses:
+                self.request.sendall(b"".join(responses))
+
+    def answer(self, service, body):
+        try:
+            opcode, request_id, tid, start_time, item, lock_type = decode_request(body)
+        except (struct.error, UnicodeDecodeError):
+            return RESPONSE.pack(0, ERROR)
+        try:
+            status = service.handle(opcode, tid, start_time, item, lock_type)
+        except Exception:
+            status = ERROR
+        return RESPONSE.pack(request_id, status)
+
+
+class _ThreadingServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+# LockServer class
+class LockServer:
+    def __init__(self, lock_manager, make_transaction, host="127.0.0.1", port=0, node_id=0):
+        self.service = LockService(lock_manager, make_transaction, HybridLogicalClock(node_id))
+        self.server = _ThreadingServer((host, port), _Handler)
+        self.server.service = self.service
+        self.thread = None
+
+    @property
+    def address(self):
+        return self.server.server_address[:2]
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def serve_forever(self):
+        self.server.serve_forever()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self.thread is not None:
+            self.thread.join()
+
+
+# LockClient class: one connection; calls may be pipelined
+class LockClient:
+    # Responses are drained every `window` frames so neither side can fill
+    # its socket buffer while the other is still writing
+    window = 1024
+
+    def __init__(self, host, port, timeout=10.0):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.stream = self.sock.makefile("rb")
+        self.next_request_id = 0
+
+    def close(self):
+        self.stream.close()
+        self.sock.close()
+
+    def pipeline(self, calls):
+        # calls: (opcode, tid, start_time, item, lock_type) tuples
+        calls = list(calls)
+        statuses = []
+        for start in range(0, len(calls), self.window):
+            statuses += self._send_window(calls[start:start + self.window])
+        return statuses
+
+    def _send_window(self, calls):
+        frames = []
+        expected = []
+        for opcode, tid, start_time, item, lock_type in calls:
+            self.next_request_id = (self.next_request_id + 1) & 0xFFFFFFFF
+            expected.append(self.next_request_id)
+            frames.append(encode_request(opcode, self.next_request_id, tid, start_time, item, lock_type))
+        self.sock.sendall(b"".join(frames))
+
+        statuses = []
+        for request_id in expected:
+            data = self.stream.read(RESPONSE.size)
+            if len(data) < RESPONSE.size:
+                raise ConnectionError("Lock server closed the connection")
+            got_id, status = RESPONSE.unpack(data)
+            if got_id != request_id:
+                raise ConnectionError(f"Out-of-order response {got_id}, expected {request_id}")
+            statuses.append(status)
+        return statuses
+
+    def request_lock(self, tid, start_time, item, lock_type):
+        return self.pipeline([(OP_REQUEST, tid, start_time, item, lock_type)])[0]
+
+    def request_locks(self, tid, start_time, requests):
+        return self.pipeline([(OP_REQUEST_MANY, tid, start_time, encode_lock_requests(requests), "-")])[0]
+
+    def release_lock(self, tid, item):
+        return self.pipeline([(OP_RELEASE, tid, 0, item, "-")])[0]
+
+    def abort_transaction(self, tid):
+        return self.pipeline([(OP_ABORT, tid, 0, "", "-")])[0]
+
+    def end_transaction(self, tid):
+        return self.pipeline([(OP_END, tid, 0, "", "-")])[0]
+
+
+# ConnectionPool class
+class ConnectionPool:
+    def __init__(self, host, port, size=4):
+        self.host = host
+        self.port = port
+        self.size = size
+        self.idle = queue.LifoQueue()
+        self.created = 0
+        self.mutex = threading.Lock()
+        # A REQUEST can hold a pooled connection until the lock is handed
+        # over, so calls the server answers at once (release, end, abort) go
+        # on this connection instead: queued behind blocked requests, they
+        # could never free the lock those requests wait for
+        self.control = None
+        self.control_mutex = threading.Lock()
+
+    @contextmanager
+    def connection(self):
+        try:
+            client = self.idle.get_nowait()
+        except queue.Empty:
+            with self.mutex:
+                create = self.created < self.size
+                if create:
+                    self.created += 1
+            client = LockClient(self.host, self.port) if create else self.idle.get()
+        try:
+            yield client
+        except Exception:
+            client.close()
+            with self.mutex:
+                self.created -= 1
+            raise
+        self.idle.put(client)
+
+    @contextmanager
+    def control_connection(self):
+        with self.control_mutex:
+            if self.control is None:
+                self.control = LockClient(self.host, self.port)
+            try:
+                yield self.control
+            except Exception:
+                self.control.close()
+                self.control = None
+                raise
+
+    def close(self):
+        with self.control_mutex:
+            if self.control is not None:
+                self.control.close()
+                self.control = None
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+# ClusterClient class: routes each item to the node that owns it
+class ClusterClient:
+    def __init__(self, addresses, pool_size=4):
+        self.pools = [ConnectionPool(host, port, pool_size) for host, port in addresses]
+
+    def node_for(self, item):
+        return shard_for(item, len(self.pools))
+
+    def request_locks(self, tid, start_time, requests):
+        # requests: [(item, lock_type), ...]; one REQUEST_MANY frame per node,
+        # in node order, and every item gets its node's answer
+        by_node = {}
+        for item, lock_type in requests:
+            by_node.setdefault(self.node_for(item), []).append((item, lock_type))
+        answers = {}
+        for node in sorted(by_node):
+            with self.pools[node].connection() as client:
+                answers[node] = client.request_locks(tid, start_time, by_node[node])
+        return [answers[self.node_for(item)] for item, _ in requests]
+
+    def release_lock(self, tid, item):
+        with self.pools[self.node_for(item)].control_connection() as client:
+            return client.release_lock(tid, item)
+
+    def end_transaction(self, tid):
+        for pool in self.pools:
+            with pool.control_connection() as client:
+                client.end_transaction(tid)
+
+    def abort_transaction(self, tid):
+        for pool in self.pools:
+            with pool.control_connection() as client:
+                client.abort_transaction(tid)
+
+    def close(self):
+        for pool in self.pools:
+            pool.close()
+
+
+# Several nodes on localhost for testing, each on its own ephemeral port.
+# Nodes get ids 1..nodes, leaving 0 to the client that issues start times.
+class LocalCluster:
+    def __init__(self, nodes, make_lock_manager, make_transaction):
+        self.servers = [LockServer(make_lock_manager(), make_transaction, node_id=node_id)
+                        for node_id in range(1, nodes + 1)]
+
+    @property
+    def addresses(self):
+        return [server.address for server in self.servers]
+
+    def __enter__(self):
+        for server in self.servers:
+            server.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        for server in self.servers:
+            server.stop()
@@ -0,0 +1,261 @@
+import heapq
+import threading
+import time
+from collections import Counter
+
+# Log-linear (HDR-style) buckets: 16 sub-buckets per power of two, ~6% error
+SUB_BUCKET_BITS = 4
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+MAX_MAGNITUDE = 42  # ~73 minutes in nanoseconds
+
+# Finished transactions kept for the starvation report
+STARVATION_HISTORY = 100
+NUM_BUCKETS = (MAX_MAGNITUDE - SUB_BUCKET_BITS + 1) * SUB_BUCKETS
+
+
+def bucket_index(value):
+    if value < SUB_BUCKETS:
+        return max(value, 0)
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    index = ((shift + 1) << SUB_BUCKET_BITS) + (value >> shift) - SUB_BUCKETS
+    return min(index, NUM_BUCKETS - 1)
+
+
+def bucket_upper_bound(index):
+    if index < SUB_BUCKETS:
+        return index
+    shift = (index >> SUB_BUCKET_BITS) - 1
+    sub = index & (SUB_BUCKETS - 1)
+    return ((SUB_BUCKETS + sub + 1) << shift) - 1
+
+
+# Histogram class
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * NUM_BUCKETS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, value):
+        self.counts[bucket_index(value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        counts = other.counts[:]
+        for index, n in enumerate(counts):
+            if n:
+                self.counts[index] += n
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def mean(self):
+        return self.total / self.count if self.count else 0
+
+    def percentile(self, q):
+        if not self.count:
+            return 0
+        rank = max(1, int(round(self.count * q / 100.0)))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bucket_upper_bound(index), self.max)
+        return self.max
+
+    def buckets(self):
+        for index, n in enumerate(self.counts):
+            if n:
+                yield bucket_upper_bound(index), n
+
+
+# Per-thread slice of the metrics; only its owning thread writes to it
+class _MetricsShard:
+    def __init__(self):
+        self.wait_ns = Histogram()
+        self.hold_ns = Histogram()
+        self.grants = 0
+        self.waits = 0
+        self.begins = 0
+        self.commits = 0
+        self.read_only = 0
+        self.aborts = Counter()
+        self.item_waits = Counter()
+        self.item_max_queue = {}
+
+    def merge(self, other):
+        self.wait_ns.merge(other.wait_ns)
+        self.hold_ns.merge(other.hold_ns)
+        self.grants += other.grants
+        self.waits += other.waits
+        self.begins += other.begins
+        self.commits += other.commits
+        self.read_only += other.read_only
+        self.aborts.update(dict(other.aborts))
+        self.item_waits.update(dict(other.item_waits))
+        for item, depth in list(other.item_max_queue.items()):
+            if depth > self.item_max_queue.get(item, 0):
+                self.item_max_queue[item] = depth
+
+
+# LockMetrics class
+class LockMetrics:
+    def __init__(self, clock=time.perf_counter_ns):
+        self.clock = clock
+        self._local = threading.local()
+        self._shards = []  # (owning thread, shard) for live threads
+        self._retired = _MetricsShard()  # everything from threads that have exited
+        self._shards_lock = threading.Lock()
+        self._wait_started = {}  # tid -> {item: wait start}
+        self._granted_at = {}
+        # Starvation monitor: worst single wait and abort count per live
+        # transaction; the worst finished ones stay in a bounded heap
+        self._worst_wait = {}
+        self._restarts = Counter()
+        self._worst_finished = []
+        self._finished_lock = threading.Lock()
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = _MetricsShard()
+            self._local.shard = shard
+            with self._shards_lock:
+                self._retire_exited()
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def _retire_exited(self):
+        # Called under _shards_lock. A dead thread never writes its shard
+        # again, so fold it into _retired; with one thread per transaction
+        # the list would otherwise grow with every transaction ever run.
+        live = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                live.append((thread, shard))
+            else:
+                self._retired.merge(shard)
+        self._shards = live
+
+    def transaction_started(self, trans):
+        self._shard().begins += 1
+
+    def transaction_committed(self, trans):
+        self._shard().commits += 1
+        # A queued request the transaction moved on from is never granted
+        # to it as a wait, so it must not count as waiting any more
+        self._wait_started.pop(trans.tid, None)
+        worst = self._worst_wait.pop(trans.tid, 0)
+        restarts = self._restarts.pop(trans.tid, 0)
+        if worst or restarts:
+            with self._finished_lock:
+                entry = (worst, restarts, trans.tid)
+                if len(self._worst_finished) < STARVATION_HISTORY:
+                    heapq.heappush(self._worst_finished, entry)
+                else:
+                    heapq.heappushpop(self._worst_finished, entry)
+
+    def read_only_committed(self, trans):
+        # Served from a snapshot; also counted by transaction_committed
+        self._shard().read_only += 1
+
+    def wait_started(self, trans, item, queue_depth):
+        shard = self._shard()
+        shard.waits += 1
+        shard.item_waits[item] += 1
+        if queue_depth > shard.item_max_queue.get(item, 0):
+            shard.item_max_queue[item] = queue_depth
+        self._wait_started.setdefault(trans.tid, {})[item] = self.clock()
+
+    def _end_wait(self, tid, item):
+        waits = self._wait_started.get(tid)
+        if not waits:
+            return None
+        started = waits.pop(item, None)
+        if not waits:
+            self._wait_started.pop(tid, None)
+        return started
+
+    def wait_cancelled(self, trans, item):
+        self._end_wait(trans.tid, item)
+
+    def forget_pending(self):
+        # The lock manager these waits and holds belong to was replaced, and
+        # the next one numbers its transactions from 1 again
+        self._wait_started.clear()
+        self._granted_at.clear()
+        self._worst_wait.clear()
+        self._restarts.clear()
+
+    def lock_granted(self, trans, item):
+        now = self.clock()
+        shard = self._shard()
+        shard.grants += 1
+        started = self._end_wait(trans.tid, item)
+        if started is not None:
+            shard.wait_ns.record(now - started)
+            if now - started > self._worst_wait.get(trans.tid, 0):
+                self._worst_wait[trans.tid] = now - started
+        self._granted_at[(trans.tid, item)] = now
+
+    def lock_released(self, trans, item):
+        granted = self._granted_at.pop((trans.tid, item), None)
+        if granted is not None:
+            self._shard().hold_ns.record(self.clock() - granted)
+
+    def transaction_aborted(self, trans, cause):
+        self._shard().aborts[cause or "unknown"] += 1
+        self._restarts[trans.tid] += 1
+
+    def starvation(self, top_n=5):
+        # Worst wait per transaction, longest first, as
+        # (tid, worst_wait_ns, aborts, still_waiting). A wait still in
+        # progress counts up to now.
+        now = self.clock()
+        worst = dict(self._worst_wait)
+        waiting = set()
+        for tid, waits in list(self._wait_started.items()):
+            for started in list(waits.values()):
+                waiting.add(tid)
+                if now - started > worst.get(tid, 0):
+                    worst[tid] = now - started
+        restarts = dict(self._restarts)
+        report = [(wait, restarts.get(tid, 0), tid, tid in waiting) for tid, wait in worst.items()]
+        report += [(0, aborts, tid, False) for tid, aborts in restarts.items() if tid not in worst]
+        with self._finished_lock:
+            report += [(wait, aborts, tid, False) for wait, aborts, tid in self._worst_finished]
+        report.sort(key=lambda entry: (entry[0], entry[1]), reverse=True)
+        return [(tid, wait, aborts, still_waiting) for wait, aborts, tid, still_waiting in report[:top_n]]
+
+    def snapshot(self, top_n=5):
+        total = _MetricsShard()
+        with self._shards_lock:
+            self._retire_exited()
+            total.merge(self._retired)
+            shards = [shard for _, shard in self._shards]
+        for shard in shards:
+            total.merge(shard)
+
+        merged = {
+            "wait_ns": total.wait_ns,
+            "hold_ns": total.hold_ns,
+            "grants": total.grants,
+            "waits": total.waits,
+            "begins": total.begins,
+            "commits": total.commits,
+            "read_only": total.read_only,
+            "aborts": total.aborts,
+            "item_waits": total.item_waits,
+            "item_max_queue": total.item_max_queue,
+        }
+
+        merged["hot_items"] = merged["item_waits"].most_common(top_n)
+        merged["starvation"] = self.starvation(top_n)
+        merged["active"] = merged["begins"] - merged["commits"]
+        merged["waiting"] = sum(len(waits) for waits in list(self._wait_started.values()))
+        merged["taken_at"] = self.clock()
+        return merged
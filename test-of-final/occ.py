@@ -0,0 +1,132 @@
+import threading
+import time
+
+from replay import NullQueue
+
+
+# Per-transaction read and write sets, kept by the engine between begin and commit
+class _Workspace:
+    __slots__ = ("reads", "writes")
+
+    def __init__(self):
+        self.reads = {}  # item -> version seen by the first read
+        self.writes = []  # buffered writes, in program order
+
+
+# OptimisticEngine class
+#
+# Silo-style optimistic concurrency control behind the LockManager interface:
+# request_lock() never blocks, a read just remembers the item's version and a
+# write is buffered; release_lock() does nothing. commit_transaction() is the
+# only critical section: it checks that every version read is still current,
+# then installs the writes by bumping their versions. A transaction that
+# fails validation is aborted and its caller runs it again from the start.
+class OptimisticEngine:
+    protocol = "occ"
+
+    def __init__(self, metrics=None, recorder=None, messages=None, store=None):
+        self.versions = {}  # item -> number of committed writes
+        self.store = store  # Optional value store; commit scatters the writer's tid into it
+        self.workspaces = {}  # tid -> _Workspace
+        self.transactions = {}
+        self.metrics = metrics
+        self.recorder = recorder
+        self.messages = messages if messages is not None else NullQueue()
+        self.lock = threading.RLock()
+        self.validations = 0
+        self.validation_failures = 0
+
+    def add_transaction(self, trans):
+        with self.lock:
+            self.transactions[trans.tid] = trans
+            if self.recorder is not None:
+                self.recorder.record("add", trans.tid, detail=trans.start_time)
+
+    def remove_transaction(self, trans):
+        with self.lock:
+            self.transactions.pop(trans.tid, None)
+            self.workspaces.pop(trans.tid, None)
+
+    def request_lock(self, trans, item, lock_type):
+        workspace = self.workspaces.get(trans.tid)
+        if workspace is None:
+            workspace = self.workspaces[trans.tid] = _Workspace()
+        if lock_type == 'W':
+            workspace.writes.append(item)
+        elif item not in workspace.reads:
+            # A plain dict read: the GIL keeps it atomic, validation catches races
+            workspace.reads[item] = self.versions.get(item, 0)
+        if self.metrics is not None:
+            # Nothing waits here: every access is granted at once, and held
+            # (for the hold-time histogram) until the caller releases it
+            self.metrics.lock_granted(trans, item)
+
+    def release_lock(self, trans, item):
+        if self.metrics is not None:
+            self.metrics.lock_released(trans, item)
+
+    def read_snapshot(self, trans, items):
+        # Read-only fast path: committed versions as of now, nothing to validate
+        with self.lock:
+            if self.recorder is not None:
+                self.recorder.record("snapshot", trans.tid, detail=tuple(items))
+            if self.store is not None:
+                snapshot = dict(zip(items, self.store.get_many(items)))
+            else:
+                snapshot = {item: self.versions.get(item, 0) for item in items}
+            if self.recorder is not None:
+                for item in snapshot:
+                    self.recorder.record("granted", trans.tid, item, 'R')
+                self.recorder.record("commit", trans.tid)
+        return snapshot
+
+    def commit_transaction(self, trans):
+        workspace = self.workspaces.pop(trans.tid, None) or _Workspace()
+        with self.lock:
+            self.validations += 1
+            stale = [item for item, version in workspace.reads.items() if self.versions.get(item, 0) != version]
+            if stale:
+                self.validation_failures += 1
+                self.abort_transaction(trans, cause="validation")
+                return False
+            for item in workspace.writes:
+                self.versions[item] = self.versions.get(item, 0) + 1
+            if self.store is not None and workspace.writes:
+                written = list(dict.fromkeys(workspace.writes))
+                self.store.put_many(written, [trans.tid] * len(written))
+            if self.recorder is not None:
+                # The commit is the serialization point: report the operations here
+                for item in workspace.reads:
+                    self.recorder.record("granted", trans.tid, item, 'R')
+                for item in dict.fromkeys(workspace.writes):
+                    self.recorder.record("granted", trans.tid, item, 'W')
+                self.recorder.record("commit", trans.tid)
+        self.messages.put(f"Transaction {trans.tid} validated and committed "
+                          f"({len(workspace.reads)} reads, {len(workspace.writes)} writes)")
+        return True
+
+    def abort_transaction(self, trans, cause=None):
+        with self.lock:
+            self.workspaces.pop(trans.tid, None)
+            trans.aborts += 1
+            if self.metrics is not None:
+                self.metrics.transaction_aborted(trans, cause)
+            if self.recorder is not None:
+                self.recorder.record("aborted", trans.tid, detail=cause)
+        self.messages.put(f"Transaction {trans.tid} aborted ({cause or 'external'}), restarting")
+
+    def table_snapshot(self):
+        with self.lock:
+            return {"holders": {}, "modes": {}, "waiters": {}, "transactions": len(self.transactions)}
+
+    def state_snapshot(self):
+        with self.lock:
+            transactions = [(trans.tid, trans.start_time) for trans in self.transactions.values()]
+        return {
+            "version": 1,
+            "taken_at": time.time(),
+            "protocol": self.protocol,
+            "transactions": [[tid, start_time, []] for tid, start_time in transactions],
+            "holders": {},
+            "waiters": {},
+        }
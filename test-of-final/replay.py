@@ -0,0 +1,128 @@
+import threading
+
+from diagnostics import restore_state
+
+# Steps are the top-level calls into a LockManager; decisions are what it did
+STEP_KINDS = ("add", "request", "release", "abort", "snapshot")
+DECISION_KINDS = ("granted", "waiting", "aborted")
+
+
+# Message sink that drops everything, for runs nobody is watching
+class NullQueue:
+    def put(self, message):
+        pass
+
+
+# ScheduleRecorder class
+class ScheduleRecorder:
+    def __init__(self):
+        self.events = []
+        self._lock = threading.Lock()
+
+    def record(self, kind, tid, item=None, lock_type=None, detail=None):
+        with self._lock:
+            self.events.append((kind, tid, item, lock_type, detail))
+
+    def steps(self):
+        return [event for event in self.events if event[0] in STEP_KINDS]
+
+    def decisions(self):
+        return [event for event in self.events if event[0] in DECISION_KINDS]
+
+    def transactions(self):
+        return {tid: start_time for kind, tid, _, _, start_time in self.events if kind == "add"}
+
+    def format(self):
+        lines = []
+        for kind, tid, item, lock_type, detail in self.events:
+            if kind == "add":
+                lines.append(f"T{tid} start_time={detail}")
+            elif kind in ("request", "waiting", "granted"):
+                lines.append(f"T{tid} {kind} {lock_type}({item})")
+            elif kind == "release":
+                lines.append(f"T{tid} release {item}")
+            elif kind == "snapshot":
+                lines.append(f"T{tid} snapshot {' '.join(map(str, detail))}")
+            elif kind == "commit":
+                lines.append(f"T{tid} commit")
+            else:
+                lines.append(f"T{tid} {kind} ({detail or 'external'})")
+        return lines
+
+
+# Result of one deterministic run
+class ReplayResult:
+    def __init__(self, recorder, lock_manager):
+        self.recorder = recorder
+        self.lock_manager = lock_manager
+
+    def decisions(self):
+        return self.recorder.decisions()
+
+    def matches(self, other):
+        return self.decisions() == other.decisions()
+
+
+# DeterministicScheduler class
+class DeterministicScheduler:
+    # make_lock_manager() must return a quiet manager (NullQueue messages,
+    # re_execute=False) so nothing runs outside the scheduler's own thread
+    def __init__(self, make_lock_manager, make_transaction):
+        self.make_lock_manager = make_lock_manager
+        self.make_transaction = make_transaction
+
+    def run(self, transactions, schedule, initial_state=None):
+        # transactions: {tid: (start_time, [(op, item), ...])}
+        # schedule: tids (run that transaction's next operation, request then
+        # release, like read_item/write_item without the sleep) or explicit
+        # ("request", tid, item, lock_type) / ("release", tid, item) /
+        # ("abort", tid) / ("snapshot", tid, items) steps
+        # initial_state: a diagnostics dump to start from instead of an empty
+        # table; its transactions can be named in explicit steps
+        lock_manager = self.make_lock_manager()
+        trans_by_tid = {}
+        if initial_state is not None:
+            trans_by_tid = restore_state(lock_manager, initial_state, self.make_transaction)
+        recorder = ScheduleRecorder()
+        lock_manager.recorder = recorder
+
+        for tid, (start_time, _) in sorted(transactions.items(), key=lambda t: t[1][0]):
+            trans_by_tid[tid] = self.make_transaction(tid, start_time)
+            lock_manager.add_transaction(trans_by_tid[tid])
+
+        cursors = dict.fromkeys(transactions, 0)
+        for step in schedule:
+            if isinstance(step, int):
+                operations = transactions[step][1]
+                if cursors[step] >= len(operations):
+                    raise ValueError(f"Transaction {step} has no operation left in the schedule")
+                op, item = operations[cursors[step]]
+                cursors[step] += 1
+                trans = trans_by_tid[step]
+                lock_manager.request_lock(trans, item, op)
+                lock_manager.release_lock(trans, item)
+                continue
+
+            kind, tid = step[0], step[1]
+            trans = trans_by_tid[tid]
+            if kind == "request":
+                lock_manager.request_lock(trans, step[2], step[3])
+            elif kind == "release":
+                lock_manager.release_lock(trans, step[2])
+            elif kind == "abort":
+                lock_manager.abort_transaction(trans)
+            elif kind == "snapshot":
+                lock_manager.read_snapshot(trans, step[2])
+            else:
+                raise ValueError(f"Unknown schedule step: {step!r}")
+
+        return ReplayResult(recorder, lock_manager)
+
+    def replay(self, recorded):
+        # Re-issue the recorded top-level calls in their original order
+        start_times = recorded.transactions()
+        schedule = [event[:4] if event[0] == "request" else event[:3] if event[0] == "release" else
+                    ("snapshot", event[1], event[4]) if event[0] == "snapshot" else event[:2]
+                    for event in recorded.steps() if event[0] != "add"]
+        transactions = {tid: (start_time, []) for tid, start_time in start_times.items()}
+        return self.run(transactions, schedule)
@@ -0,0 +1,220 @@
+import threading
+
+# Stop keeping cycle and anomaly details past this many; they are still counted
+MAX_REPORTED = 100
+
+
+# SerializabilityReport class
+class SerializabilityReport:
+    def __init__(self, operations, committed, aborted, cycles, cycle_count, anomalies, anomaly_count, live):
+        self.operations = operations
+        self.committed = committed
+        self.aborted = aborted
+        self.cycles = cycles
+        self.cycle_count = cycle_count
+        self.anomalies = anomalies
+        self.anomaly_count = anomaly_count
+        self.live = live
+
+    @property
+    def serializable(self):
+        return self.cycle_count == 0
+
+    def summary(self):
+        verdict = "conflict-serializable" if self.serializable else f"NOT serializable ({self.cycle_count} cycles)"
+        return (f"{verdict}: {self.operations} operations, {self.committed} committed, {self.aborted} aborted, "
+                f"{self.anomaly_count} anomalies")
+
+    def format(self):
+        lines = [self.summary()]
+        for cycle, item in self.cycles:
+            lines.append(f"  cycle on {item}: {' -> '.join(f'T{tid}' for tid in cycle)}")
+        for kind, tid, item, other in self.anomalies:
+            lines.append(f"  {kind}: T{tid} read {item} written by aborted T{other}")
+        return lines
+
+
+# SerializabilityChecker class
+#
+# Builds the conflict (precedence) graph incrementally from recorder events:
+# every "granted" is an operation, "aborted" discards the operations of that
+# incarnation (the tid may carry on as a new one) and "commit" ends it. Per
+# item only the last writer and the readers since are kept, which preserves
+# reachability. A committed transaction gains no new incoming edges, so once
+# it has no predecessors it can never be on a cycle and is dropped; memory
+# follows the live part of the graph, not the length of the history.
+#
+# An edge that would close a cycle is reported and left out, so each
+# violation is reported once and the graph stays acyclic.
+class SerializabilityChecker:
+    def __init__(self):
+        self.current = {}  # tid -> node of its running incarnation
+        self.next_incarnation = 0
+        self.succs = {}  # node -> {succ: {item: op of node}}
+        self.preds = {}  # node -> {pred: {item: op of pred}}
+        self.touched = {}  # node -> items it accessed
+        self.committed = set()
+        self.items = {}  # item -> [last writer node or None, set of reader nodes since]
+        self.operations = 0
+        self.commits = 0
+        self.aborts = 0
+        self.cycles = []
+        self.cycle_count = 0
+        self.anomalies = []
+        self.anomaly_count = 0
+        self._lock = threading.Lock()
+
+    # Recorder interface, so the checker can be a LockManager's recorder
+    def record(self, kind, tid, item=None, lock_type=None, detail=None):
+        with self._lock:
+            if kind == "granted":
+                self._access(tid, item, lock_type)
+            elif kind == "aborted":
+                self._abort(tid)
+            elif kind == "commit":
+                self._commit(tid)
+
+    def report(self):
+        with self._lock:
+            return SerializabilityReport(self.operations, self.commits, self.aborts, list(self.cycles),
+                                         self.cycle_count, list(self.anomalies), self.anomaly_count,
+                                         len(self.succs))
+
+    def _node(self, tid):
+        node = self.current.get(tid)
+        if node is None:
+            self.next_incarnation += 1
+            node = self.current[tid] = (tid, self.next_incarnation)
+            self.succs[node] = {}
+            self.preds[node] = {}
+            self.touched[node] = set()
+        return node
+
+    def _access(self, tid, item, op):
+        self.operations += 1
+        node = self._node(tid)
+        self.touched[node].add(item)
+        state = self.items.setdefault(item, [None, set()])
+        writer, readers = state
+        if writer is not None and writer != node:
+            self._add_edge(writer, node, item, 'W')
+        if op == 'W':
+            for reader in readers:
+                if reader != node:
+                    self._add_edge(reader, node, item, 'R')
+            state[0] = node
+            state[1] = set()
+        else:
+            readers.add(node)
+
+    def _add_edge(self, u, v, item, op):
+        edge = self.succs[u].get(v)
+        if edge is None:
+            path = self._path(v, u)
+            if path is not None:
+                self.cycle_count += 1
+                if len(self.cycles) < MAX_REPORTED:
+                    self.cycles.append(([node[0] for node in path + [v]], item))
+                return
+            edge = self.succs[u][v] = {}
+            self.preds[v][u] = edge
+        if edge.get(item) != 'W':
+            edge[item] = op
+
+    def _path(self, start, goal):
+        # Depth-first search along successor edges; returns start..goal or None
+        parents = {start: None}
+        stack = [start]
+        while stack:
+            node = stack.pop()
+            if node == goal:
+                path = []
+                while node is not None:
+                    path.append(node)
+                    node = parents[node]
+                return path[::-1]
+            for succ in self.succs[node]:
+                if succ not in parents:
+                    parents[succ] = node
+                    stack.append(succ)
+        return None
+
+    def _abort(self, tid):
+        node = self.current.pop(tid, None)
+        if node is None:
+            return
+        self.aborts += 1
+        preds = self.preds.pop(node)
+        succs = self.succs.pop(node)
+
+        # Keep the orderings that ran through the aborted node on the same item
+        for pred, pred_items in preds.items():
+            del self.succs[pred][node]
+            for succ, succ_items in succs.items():
+                for item in pred_items.keys() & succ_items.keys():
+                    self._add_edge(pred, succ, item, pred_items[item])
+        for succ in succs:
+            del self.preds[succ][node]
+
+        # Roll each item back to what the aborted node saw before it
+        for item in self.touched.pop(node):
+            state = self.items.get(item)
+            if state is None:
+                continue
+            writer, readers = state
+            readers.discard(node)
+            if writer == node:
+                for reader in readers:
+                    self.anomaly_count += 1
+                    if len(self.anomalies) < MAX_REPORTED:
+                        self.anomalies.append(("aborted-read", reader[0], item, tid))
+                state[0] = None
+                for pred, pred_items in preds.items():
+                    if pred_items.get(item) == 'W':
+                        state[0] = pred
+                    elif item in pred_items:
+                        readers.add(pred)
+            self._forget_item(item, state)
+        for succ in succs:
+            self._prune(succ)
+
+    def _commit(self, tid):
+        node = self.current.pop(tid, None)
+        if node is None:
+            return
+        self.commits += 1
+        self.committed.add(node)
+        self._prune(node)
+
+    def _prune(self, node):
+        pending = [node]
+        while pending:
+            node = pending.pop()
+            if node not in self.committed or self.preds.get(node):
+                continue
+            self.committed.discard(node)
+            del self.preds[node]
+            for succ in self.succs.pop(node):
+                del self.preds[succ][node]
+                pending.append(succ)
+            for item in self.touched.pop(node):
+                state = self.items.get(item)
+                if state is None:
+                    continue
+                if state[0] == node:
+                    state[0] = None
+                state[1].discard(node)
+                self._forget_item(item, state)
+
+    def _forget_item(self, item, state):
+        if state[0] is None and not state[1]:
+            del self.items[item]
+
+
+# Offline check of recorded (kind, tid, item, lock_type, detail) events,
+# e.g. ScheduleRecorder.events
+def check_history(events):
+    checker = SerializabilityChecker()
+    for kind, tid, item, lock_type, detail in events:
+        checker.record(kind, tid, item, lock_type, detail)
+    return checker.report()
@@ -0,0 +1,219 @@
+import multiprocessing
+import os
+import time
+import zlib
+from collections import defaultdict
+
+from clock import HybridLogicalClock
+
+
+def shard_for(item, shard_count):
+    # crc32 rather than hash(): str hashes are salted per process
+    return zlib.crc32(item.encode("utf-8")) % shard_count
+
+
+def split_by_shard(operations, shard_count):
+    parts = defaultdict(list)
+    for op, item in operations:
+        parts[shard_for(item, shard_count)].append((op, item))
+    return parts
+
+
+# Runs batches against one shard's LockManager, and doubles as its recorder
+class ShardWorker:
+    def __init__(self, lock_manager, make_transaction, max_restarts=None):
+        self.lock_manager = lock_manager
+        self.make_transaction = make_transaction
+        self.max_restarts = max_restarts  # None: restart an aborted part until it commits
+        self.aborted = set()
+        lock_manager.recorder = self
+
+    def record(self, kind, tid, item=None, lock_type=None, detail=None):
+        if kind == "aborted":
+            self.aborted.add(tid)
+
+    def withdraw(self, trans, item):
+        # Leave the queue for item, if still in it, and hand back anything
+        # promoted to trans after the abort
+        if item is not None:
+            self.lock_manager.cancel_wait(trans, item)
+        for held in list(trans.locks_held):
+            self.lock_manager.release_lock(trans, held)
+
+    def run_batch(self, batch):
+        # Interleave the batch one operation per transaction per round. A lock
+        # is held for one round and a waiter stays queued until promote_locks
+        # grants it. A part the protocol aborts starts over in the next round
+        # with its original start time, so it only gets older than the parts
+        # it meets: the oldest part in the shard can't die or be wounded, and
+        # every part commits. Returns (tid, restarts, committed) per part; a
+        # part is only given up on after more than max_restarts restarts.
+        lock_manager = self.lock_manager
+        pending = []
+        for tid, start_time, operations in batch:
+            trans = self.make_transaction(tid, start_time)
+            lock_manager.add_transaction(trans)
+            pending.append([trans, operations, 0, None])
+
+        results = []
+        while pending:
+            still_pending = []
+            for state in pending:
+                trans, operations, cursor, held = state
+                if trans.tid in self.aborted:
+                    self.aborted.discard(trans.tid)
+                    self.withdraw(trans, held)
+                    if self.max_restarts is not None and trans.aborts > self.max_restarts:
+                        results.append((trans.tid, trans.aborts, False))
+                        lock_manager.remove_transaction(trans)
+                        continue
+                    state[2], state[3] = 0, None
+                    still_pending.append(state)
+                    continue
+                if held is not None:
+                    if held not in trans.locks_held:
+                        still_pending.append(state)
+                        continue
+                    lock_manager.release_lock(trans, held)
+                    cursor += 1
+                if cursor == len(operations):
+                    results.append((trans.tid, trans.aborts, True))
+                    lock_manager.remove_transaction(trans)
+                    continue
+                op, item = operations[cursor]
+                lock_manager.request_lock(trans, item, op)
+                state[2], state[3] = cursor, item
+                still_pending.append(state)
+            pending = still_pending
+
+        return results
+
+
+def _shard_worker(shard_id, requests, responses, make_lock_manager, make_transaction, max_restarts):
+    worker = ShardWorker(make_lock_manager(), make_transaction, max_restarts)
+    while True:
+        batch = requests.get()
+        if batch is None:
+            break
+        responses.put((shard_id, worker.run_batch(batch)))
+
+
+# ShardedResult class
+class ShardedResult:
+    def __init__(self, committed, failed, retries, elapsed, shards):
+        self.committed = committed
+        self.failed = failed
+        self.retries = retries
+        self.elapsed = elapsed
+        self.shards = shards
+
+    def throughput(self):
+        return self.committed / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        return (f"{self.committed} committed, {self.failed} failed, {self.retries} retries on "
+                f"{self.shards} shards in {self.elapsed:.2f} s ({self.throughput():.0f} TPS)")
+
+
+# ShardedEngine class
+#
+# Items are hash-partitioned across worker processes, each owning its own
+# LockManager (make_lock_manager must build a quiet one: NullQueue messages,
+# re_execute=False). Every transaction takes one HybridLogicalClock start time
+# for all of its parts. A part that is aborted restarts on its shard with that
+# same start time (see ShardWorker.run_batch), so it keeps its age and wins
+# once it is the oldest; a transaction commits when all of its parts have.
+# retries counts part restarts. With max_retries, a part restarted more often
+# than that fails its transaction.
+class ShardedEngine:
+    def __init__(self, make_lock_manager, make_transaction, shards=None, batch_size=256,
+                 max_retries=None, max_in_flight=50000, context=None, clock=None):
+        self.context = context or multiprocessing.get_context()
+        self.make_lock_manager = make_lock_manager
+        self.make_transaction = make_transaction
+        self.shard_count = shards or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.max_in_flight = max_in_flight
+        self.clock = clock or HybridLogicalClock()
+        self.requests = []
+        self.responses = None
+        self.workers = []
+
+    def start(self):
+        self.responses = self.context.Queue()
+        for shard_id in range(self.shard_count):
+            requests = self.context.Queue()
+            worker = self.context.Process(
+                target=_shard_worker,
+                args=(shard_id, requests, self.responses, self.make_lock_manager, self.make_transaction,
+                      self.max_retries),
+                daemon=True)
+            worker.start()
+            self.requests.append(requests)
+            self.workers.append(worker)
+        return self
+
+    def stop(self):
+        for requests in self.requests:
+            requests.put(None)
+        for worker in self.workers:
+            worker.join()
+        self.requests, self.workers = [], []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def run(self, workload):
+        started = time.perf_counter()
+        batches = defaultdict(list)
+        in_flight = {}  # tid -> [parts_left, failed]
+        outstanding = 0
+        totals = {"committed": 0, "failed": 0, "retries": 0}
+
+        def flush(shard_id):
+            nonlocal outstanding
+            if batches[shard_id]:
+                self.requests[shard_id].put(batches.pop(shard_id))
+                outstanding += 1
+
+        def drain():
+            nonlocal outstanding
+            while outstanding:
+                _, results = self.responses.get()
+                outstanding -= 1
+                for tid, restarts, committed in results:
+                    totals["retries"] += restarts
+                    entry = in_flight[tid]
+                    entry[0] -= 1
+                    entry[1] = entry[1] or not committed
+                    if not entry[0]:
+                        totals["failed" if entry[1] else "committed"] += 1
+                        del in_flight[tid]
+
+        for operations in workload:
+            if not operations:
+                totals["committed"] += 1
+                continue
+            # Timestamps double as tids so they stay unique across runs
+            tid = start_time = self.clock.now()
+            parts = split_by_shard(operations, self.shard_count)
+            in_flight[tid] = [len(parts), False]
+            for shard_id, part in parts.items():
+                batches[shard_id].append((tid, start_time, part))
+                if len(batches[shard_id]) >= self.batch_size:
+                    flush(shard_id)
+            if len(in_flight) >= self.max_in_flight:
+                for shard_id in list(batches):
+                    flush(shard_id)
+                drain()
+
+        for shard_id in list(batches):
+            flush(shard_id)
+        drain()
+
+        return ShardedResult(totals["committed"], totals["failed"], totals["retries"],
+                             time.perf_counter() - started, self.shard_count)
@@ -0,0 +1,196 @@
+import heapq
+import itertools
+import random
+
+from metrics import Histogram, LockMetrics
+
+
+# Operation latency distributions, in virtual seconds; each takes the rng
+def constant(value):
+    return lambda rng: value
+
+
+def uniform(low, high):
+    return lambda rng: rng.uniform(low, high)
+
+
+def exponential(mean):
+    return lambda rng: rng.expovariate(1.0 / mean)
+
+
+def lognormal(mu, sigma):
+    return lambda rng: rng.lognormvariate(mu, sigma)
+
+
+def generate_workload(count, items=("x", "y", "z"), ops_per_transaction=2, write_ratio=0.5, seed=None):
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield [('W' if rng.random() < write_ratio else 'R', rng.choice(items)) for _ in range(ops_per_transaction)]
+
+
+# Per-transaction simulation state
+class _SimTransaction:
+    __slots__ = ("trans", "operations", "cursor", "epoch", "waiting_item", "arrived_at", "restarts")
+
+    def __init__(self, trans, operations, arrived_at):
+        self.trans = trans
+        self.operations = operations
+        self.cursor = 0
+        self.epoch = 0
+        self.waiting_item = None
+        self.arrived_at = arrived_at
+        self.restarts = 0
+
+
+# SimulationResult class
+class SimulationResult:
+    def __init__(self, simulator):
+        self.committed = simulator.committed
+        self.aborts = simulator.aborts
+        self.unfinished = len(simulator.active)
+        self.elapsed = simulator.now
+        self.events = simulator.events_processed
+        self.latency = simulator.latency
+        self.metrics = simulator.metrics
+
+    def throughput(self):
+        return self.committed / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        return (f"{self.committed} committed, {self.aborts} aborts, {self.unfinished} unfinished in "
+                f"{self.elapsed:.3f} virtual s ({self.throughput():.1f} TPS, "
+                f"mean latency {self.latency.mean() / 1e9:.4f} s, {self.events} events)")
+
+
+# Simulator class
+#
+# Drives a LockManager (built with messages=NullQueue(), re_execute=False) on
+# a virtual clock. The simulator installs itself as the manager's recorder to
+# hear about grants, waits and aborts, so handle_wait_die, handle_wound_wait
+# and promote_locks make every protocol decision. Unlike the threaded engine,
+# a waiting transaction stays parked until promote_locks grants it the lock,
+# and an aborted one restarts from its first operation after restart_delay.
+class Simulator:
+    def __init__(self, lock_manager, make_transaction, op_latency=constant(0.1),
+                 arrival=constant(0.0), restart_delay=constant(0.1), seed=None, checker=None):
+        self.lock_manager = lock_manager
+        self.make_transaction = make_transaction
+        self.op_latency = op_latency if isinstance(op_latency, dict) else {'R': op_latency, 'W': op_latency}
+        self.arrival = arrival
+        self.restart_delay = restart_delay
+        self.rng = random.Random(seed)
+        self.checker = checker  # Optional SerializabilityChecker fed the operations that really run
+
+        self.now = 0.0
+        self.events = []
+        self.sequence = itertools.count()
+        self.active = {}
+        self.issuing = None
+        self.issuing_item = None
+        self.committed = 0
+        self.aborts = 0
+        self.events_processed = 0
+
+        self.metrics = LockMetrics(clock=lambda: int(self.now * 1e9))
+        self.latency = Histogram()
+        lock_manager.metrics = self.metrics
+        lock_manager.recorder = self
+
+    def schedule(self, delay, action, sim_trans, payload=None):
+        heapq.heappush(self.events, (self.now + delay, next(self.sequence), action, sim_trans, sim_trans.epoch, payload))
+
+    def run(self, workload, until=None):
+        # Arrivals are generated lazily so huge workloads never sit in memory
+        workload = iter(workload)
+        next_arrival = 0.0
+        tid = 0
+
+        def admit():
+            nonlocal next_arrival, tid
+            operations = next(workload, None)
+            if operations is None:
+                return
+            tid += 1
+            trans = self.make_transaction(tid, tid)
+            sim_trans = _SimTransaction(trans, list(operations), next_arrival)
+            heapq.heappush(self.events, (next_arrival, next(self.sequence), "arrive", sim_trans, 0, None))
+            next_arrival += self.arrival(self.rng)
+
+        admit()
+        while self.events:
+            when, _, action, sim_trans, epoch, payload = heapq.heappop(self.events)
+            if until is not None and when > until:
+                break
+            self.now = when
+            self.events_processed += 1
+            if action == "arrive":
+                self.active[sim_trans.trans.tid] = sim_trans
+                self.lock_manager.add_transaction(sim_trans.trans)
+                self.metrics.transaction_started(sim_trans.trans)
+                admit()
+                self.issue(sim_trans)
+            elif action == "release":
+                self.lock_manager.release_lock(sim_trans.trans, payload)
+            elif epoch != sim_trans.epoch:
+                continue  # Scheduled before an abort
+            elif action == "begin":
+                sim_trans.cursor = 0
+                self.issue(sim_trans)
+            elif action == "done":
+                self.finish_operation(sim_trans, payload)
+
+        return SimulationResult(self)
+
+    def issue(self, sim_trans):
+        op, item = sim_trans.operations[sim_trans.cursor]
+        epoch = sim_trans.epoch
+        self.issuing, self.issuing_item = sim_trans, item
+        self.lock_manager.request_lock(sim_trans.trans, item, op)
+        self.issuing = self.issuing_item = None
+        if sim_trans.epoch != epoch:
+            return  # Died under wait-die; the restart is already scheduled
+        if item in sim_trans.trans.locks_held:
+            self.schedule(self.op_latency[op](self.rng), "done", sim_trans, item)
+        else:
+            sim_trans.waiting_item = item
+
+    def finish_operation(self, sim_trans, item):
+        self.lock_manager.release_lock(sim_trans.trans, item)
+        sim_trans.cursor += 1
+        if sim_trans.cursor < len(sim_trans.operations):
+            self.issue(sim_trans)
+            return
+        self.committed += 1
+        self.metrics.transaction_committed(sim_trans.trans)
+        if self.checker is not None:
+            self.checker.record("commit", sim_trans.trans.tid)
+        self.latency.record(int((self.now - sim_trans.arrived_at) * 1e9))
+        del self.active[sim_trans.trans.tid]
+        self.lock_manager.remove_transaction(sim_trans.trans)
+
+    # Recorder interface, called by the LockManager under its mutex
+    def record(self, kind, tid, item=None, lock_type=None, detail=None):
+        sim_trans = self.active.get(tid)
+        if sim_trans is None:
+            return
+        if kind == "granted":
+            if sim_trans is self.issuing and item == self.issuing_item:
+                if self.checker is not None:
+                    self.checker.record(kind, tid, item, lock_type)
+                return  # issue() schedules the operation itself
+            if sim_trans.waiting_item == item:
+                sim_trans.waiting_item = None
+                if self.checker is not None:
+                    self.checker.record(kind, tid, item, lock_type)
+                self.schedule(self.op_latency[lock_type](self.rng), "done", sim_trans, item)
+            else:
+                # Promoted out of a queue it joined before being aborted
+                self.schedule(0.0, "release", sim_trans, item)
+        elif kind == "aborted":
+            if self.checker is not None:
+                self.checker.record(kind, tid)
+            self.aborts += 1
+            sim_trans.epoch += 1
+            sim_trans.restarts += 1
+            sim_trans.waiting_item = None
+            self.schedule(self.restart_delay(self.rng), "begin", sim_trans)
@@ -0,0 +1,118 @@
+from array import array
+
+try:
+    import numpy
+except ImportError:  # Optional: the array layout falls back to array.array
+    numpy = None
+
+LAYOUTS = ("dict", "array")
+
+
+# Dict layout: one entry per item that was ever written
+class DictStore:
+    layout = "dict"
+
+    def __init__(self, default=0):
+        self.default = default
+        self.values = {}
+
+    def __len__(self):
+        return len(self.values)
+
+    def get(self, item):
+        return self.values.get(item, self.default)
+
+    def put(self, item, value):
+        self.values[item] = value
+
+    def get_many(self, items):
+        values, default = self.values, self.default
+        return [values.get(item, default) for item in items]
+
+    def put_many(self, items, values):
+        self.values.update(zip(items, values))
+
+
+# Dense layout: items are interned to integer ids once and their values live
+# in one int64 buffer (a NumPy array when available, else array('q')), so
+# there is no Python object per value. Batch reads and writes over interned
+# ids (gather/scatter) are single vectorized operations with NumPy.
+class ArrayStore:
+    layout = "array"
+
+    def __init__(self, capacity=1024, default=0, use_numpy=None):
+        self.default = default
+        self.use_numpy = numpy is not None if use_numpy is None else use_numpy
+        if self.use_numpy and numpy is None:
+            raise ImportError("numpy is not installed")
+        self.ids = {}  # item -> id, in first-seen order
+        self.values = self._allocate(max(1, capacity))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _allocate(self, capacity):
+        if self.use_numpy:
+            return numpy.full(capacity, self.default, dtype=numpy.int64)
+        return array('q', [self.default]) * capacity
+
+    def _grow(self, needed):
+        capacity = len(self.values)
+        while capacity < needed:
+            capacity *= 2
+        if capacity != len(self.values):
+            values = self._allocate(capacity)
+            values[:len(self.values)] = self.values
+            self.values = values
+
+    def intern(self, item):
+        item_id = self.ids.get(item)
+        if item_id is None:
+            item_id = self.ids[item] = len(self.ids)
+            if item_id >= len(self.values):
+                self._grow(item_id + 1)
+        return item_id
+
+    def intern_many(self, items):
+        ids = [self.intern(item) for item in items]
+        return numpy.asarray(ids, dtype=numpy.intp) if self.use_numpy else ids
+
+    def get(self, item):
+        item_id = self.ids.get(item)
+        return self.default if item_id is None else int(self.values[item_id])
+
+    def put(self, item, value):
+        self.values[self.intern(item)] = value
+
+    def gather(self, ids):
+        if self.use_numpy:
+            return self.values[ids]
+        values = self.values
+        return array('q', [values[item_id] for item_id in ids])
+
+    def scatter(self, ids, values):
+        if self.use_numpy:
+            self.values[ids] = values
+            return
+        for item_id, value in zip(ids, values):
+            self.values[item_id] = value
+
+    def get_many(self, items):
+        # Reads never intern: an item nobody wrote reads as the default and
+        # takes no id or buffer slot
+        found = [self.ids.get(item) for item in items]
+        if None not in found:
+            return self.gather(numpy.asarray(found, dtype=numpy.intp) if self.use_numpy else found).tolist()
+        default, values = self.default, self.values
+        return [default if item_id is None else int(values[item_id]) for item_id in found]
+
+    def put_many(self, items, values):
+        self.scatter(self.intern_many(items), values)
+
+
+def create_store(layout="dict", **options):
+    if layout == "dict":
+        return DictStore(**options)
+    if layout == "array":
+        return ArrayStore(**options)
+    raise ValueError(f"Unknown store layout: {layout!r}")
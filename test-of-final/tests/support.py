@@ -0,0 +1,18 @@
+import importlib.util
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+# think-this-is-it.py has no importable module name; load it once and share it
+def _load_engine():
+    spec = importlib.util.spec_from_file_location("engine", os.path.join(ROOT, "think-this-is-it.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+engine = _load_engine()
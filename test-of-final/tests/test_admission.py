@@ -0,0 +1,78 @@
+import threading
+import unittest
+
+import support  # noqa: F401  Puts the modules under test on sys.path
+
+from admission import AdmissionController
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class AdmissionControllerTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = _Clock()
+
+    def controller(self, **options):
+        return AdmissionController(clock=self.clock, window=4, **options)
+
+    def finish_window(self, controller, seconds=1.0, aborts=(0, 0, 0, 0)):
+        self.clock.now += seconds
+        for count in aborts:
+            controller.acquire()
+            controller.release(count)
+
+    def test_additive_increase(self):
+        controller = self.controller(initial_limit=4, max_limit=6)
+        for expected in (5, 6, 6):
+            self.finish_window(controller)
+            self.assertEqual(controller.limit, expected)
+        self.assertEqual([entry[1:] for entry in controller.adjustments],
+                         [(5, 0.0, 4.0), (6, 0.0, 4.0), (6, 0.0, 4.0)])
+
+    def test_multiplicative_decrease_on_aborts(self):
+        controller = self.controller(initial_limit=16, target_abort_rate=0.2)
+        # 2 aborts for 4 finished: a 1/3 abort rate
+        self.finish_window(controller, aborts=(1, 1, 0, 0))
+        self.assertEqual(controller.limit, 8)
+        self.assertAlmostEqual(controller.adjustments[-1][2], 1 / 3)
+        self.finish_window(controller, aborts=(5, 5, 5, 5))
+        self.finish_window(controller, aborts=(5, 5, 5, 5))
+        self.finish_window(controller, aborts=(5, 5, 5, 5))
+        self.assertEqual(controller.limit, 1)
+        self.finish_window(controller, aborts=(5, 5, 5, 5))
+        self.assertEqual(controller.limit, 1)  # Never below min_limit
+
+    def test_decrease_when_a_raise_costs_throughput(self):
+        controller = self.controller(initial_limit=4)
+        self.finish_window(controller, seconds=1.0)
+        self.assertEqual(controller.limit, 5)
+        # The raise made the next window 20% slower: back off
+        self.finish_window(controller, seconds=1.25)
+        self.assertEqual(controller.limit, 2)
+        # A slow window right after a cut is not blamed on a raise
+        self.finish_window(controller, seconds=2.0)
+        self.assertEqual(controller.limit, 3)
+
+    def test_limit_caps_concurrency(self):
+        controller = self.controller(initial_limit=2)
+        controller.acquire()
+        controller.acquire()
+        third = threading.Thread(target=controller.acquire, daemon=True)
+        third.start()
+        third.join(0.2)
+        self.assertTrue(third.is_alive())
+        self.assertEqual(controller.snapshot(), {"limit": 2, "active": 2, "queued": 1})
+        controller.release()
+        third.join(5)
+        self.assertFalse(third.is_alive())
+        self.assertEqual(controller.snapshot(), {"limit": 2, "active": 2, "queued": 0})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+
+from support import engine  # First: it also puts the modules under test on sys.path
+
+import analysis
+from analysis import analyze_conflicts
+from simulation import generate_workload
+
+
+def _batch(count, items, ops_per_transaction, seed):
+    workload = generate_workload(count, items=items, ops_per_transaction=ops_per_transaction, seed=seed)
+    # Start times in reverse tid order, so age order differs from input order
+    return [(engine.Transaction(tid, count - tid), operations) for tid, operations in enumerate(workload, 1)]
+
+
+class AnalyzeConflictsTest(unittest.TestCase):
+    def test_small_batch(self):
+        transactions = [(engine.Transaction(1, 1), [('W', "x"), ('R', "y")]),
+                        (engine.Transaction(2, 2), [('R', "x"), ('R', "y")]),
+                        (engine.Transaction(3, 3), [('R', "z"), ('W', "x")])]
+        result = analyze_conflicts(transactions, use_numpy=False)
+        self.assertEqual((result.transactions, result.operations, result.conflict_pairs), (3, 6, 3))
+        self.assertEqual(result.hot_items, [("x", 3)])
+        # T2 meets T1's write on x in tick 0; T3 reaches x in tick 1, where
+        # the late T2 would hold it, and T2 is older
+        self.assertEqual(result.predicted_aborts("wait-die"), {2})
+        self.assertEqual(result.wound_wait_waits, {2})
+        self.assertEqual(result.predicted_aborts("wound-wait"), set())
+        with self.assertRaises(ValueError):
+            result.predicted_aborts("occ")
+
+    @unittest.skipIf(analysis.numpy is not None, "numpy is installed")
+    def test_numpy_pass_needs_numpy(self):
+        with self.assertRaises(ImportError):
+            analyze_conflicts(_batch(4, ("x",), 1, 0), use_numpy=True)
+
+    @unittest.skipIf(analysis.numpy is None, "numpy is not installed")
+    def test_numpy_and_python_passes_agree(self):
+        cases = [(0, ("x",), 1, 0), (1, ("x",), 2, 1), (50, ("x", "y", "z"), 2, 2), (300, [f"k{n}" for n in range(20)], 4, 3),
+                 (2000, [f"k{n}" for n in range(200)], 3, 4)]
+        for count, items, ops_per_transaction, seed in cases:
+            transactions = _batch(count, items, ops_per_transaction, seed)
+            fast = analyze_conflicts(transactions, top_n=len(items), use_numpy=True)
+            slow = analyze_conflicts(transactions, top_n=len(items), use_numpy=False)
+            self.assertEqual(fast.format(), slow.format())
+            self.assertEqual(sorted(fast.hot_items), sorted(slow.hot_items))
+            for name in ("conflict_pairs", "wait_die_aborts", "wound_wait_waits", "wound_wait_aborts"):
+                self.assertEqual(getattr(fast, name), getattr(slow, name), (count, name))
+
+
+if __name__ == "__main__":
+    unittest.main()
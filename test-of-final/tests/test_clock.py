@@ -0,0 +1,65 @@
+import unittest
+
+import support  # noqa: F401  Puts the modules under test on sys.path
+
+from clock import LOGICAL_BITS, MAX_NODE_ID, NODE_BITS, HybridLogicalClock, node_of, physical_ms
+
+
+class _Wall:
+    def __init__(self, ms):
+        self.ms = ms
+
+    def __call__(self):
+        return self.ms
+
+
+class HybridLogicalClockTest(unittest.TestCase):
+    def test_bit_layout(self):
+        clock = HybridLogicalClock(node_id=5, wall_ms=_Wall(1_700_000_000_000))
+        stamp = clock.now()
+        self.assertEqual((physical_ms(stamp), node_of(stamp)), (1_700_000_000_000, 5))
+        self.assertEqual((stamp >> NODE_BITS) & ((1 << LOGICAL_BITS) - 1), 0)
+        self.assertLess(stamp, 1 << 63)  # Fits the signed 64-bit wire field
+        self.assertEqual(node_of(HybridLogicalClock(MAX_NODE_ID, _Wall(1)).now()), MAX_NODE_ID)
+        for node_id in (-1, MAX_NODE_ID + 1):
+            with self.assertRaises(ValueError):
+                HybridLogicalClock(node_id)
+
+    def test_monotonic_within_one_millisecond(self):
+        wall = _Wall(1000)
+        clock = HybridLogicalClock(node_id=1, wall_ms=wall)
+        stamps = [clock.now() for _ in range(5000)]
+        self.assertEqual(stamps, sorted(set(stamps)))
+        # The logical counter counts up in the low bits ...
+        self.assertEqual([stamp >> NODE_BITS for stamp in stamps[:3]], [1000 << LOGICAL_BITS, (1000 << LOGICAL_BITS) + 1,
+                                                                         (1000 << LOGICAL_BITS) + 2])
+        # ... and past 4096 stamps borrows from the physical part
+        self.assertEqual(physical_ms(stamps[-1]), 1001)
+        # A wall clock that steps back doesn't either
+        wall.ms = 900
+        self.assertGreater(clock.now(), stamps[-1])
+        # Once the wall clock passes the borrowed time, stamps follow it again
+        wall.ms = 2000
+        self.assertEqual(clock.now() >> NODE_BITS, 2000 << LOGICAL_BITS)
+
+    def test_update_with_a_remote_clock_ahead(self):
+        local = HybridLogicalClock(node_id=1, wall_ms=_Wall(1000))
+        remote = HybridLogicalClock(node_id=2, wall_ms=_Wall(5000))
+        local.now()
+        received = remote.now()
+        updated = local.update(received)
+        self.assertGreater(updated, received)
+        self.assertEqual((physical_ms(updated), node_of(updated)), (5000, 1))
+        self.assertEqual(updated >> NODE_BITS, (received >> NODE_BITS) + 1)
+        # Later local stamps stay ahead of the remote one, though the local
+        # wall clock is still behind
+        self.assertGreater(local.now(), updated)
+
+    def test_update_with_a_remote_clock_behind(self):
+        local = HybridLogicalClock(node_id=1, wall_ms=_Wall(5000))
+        remote = HybridLogicalClock(node_id=2, wall_ms=_Wall(1000))
+        self.assertEqual(local.update(remote.now()) >> NODE_BITS, 5000 << LOGICAL_BITS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import tempfile
+import unittest
+from queue import Queue
+
+from support import engine  # First: it also puts the modules under test on sys.path
+
+from diagnostics import dump_state, load_state, restore_state
+from replay import DeterministicScheduler, NullQueue
+
+
+def _manager(protocol, messages=None):
+    return engine.LockManager(protocol, messages=messages or NullQueue(), re_execute=False)
+
+
+class LockStateTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def dumped(self, protocol, name="state.json.gz"):
+        # T2 holds x, T1 (older) waits for it, T3 shares y
+        lock_manager = _manager(protocol)
+        transactions = {tid: engine.Transaction(tid, tid) for tid in (1, 2, 3)}
+        for trans in transactions.values():
+            lock_manager.add_transaction(trans)
+        lock_manager.request_lock(transactions[2], "x", 'W')
+        lock_manager.request_lock(transactions[3], "y", 'R')
+        if protocol == "wait-die":
+            lock_manager.request_lock(transactions[1], "x", 'W')
+        path = os.path.join(self.directory, name)
+        dump_state(lock_manager, path)
+        return path
+
+    def test_round_trip_into_the_scheduler(self):
+        state = load_state(self.dumped("wait-die"))
+        self.assertEqual(state["waiters"]["x"][0][:2], [1, 'W'])
+
+        scheduler = DeterministicScheduler(lambda: _manager("wait-die"), engine.Transaction)
+        # T4 shares y with the restored T3, and releasing x hands it to the
+        # restored waiter T1
+        result = scheduler.run({4: (4, [('R', "y")])}, [4, ("release", 2, "x")], initial_state=state)
+        self.assertEqual(result.decisions(), [("granted", 4, "y", 'R', None), ("granted", 1, "x", 'W', None)])
+        snapshot = result.lock_manager.table_snapshot()
+        self.assertEqual((snapshot["holders"], snapshot["waiters"]), ({"x": [1], "y": [3]}, {}))
+
+    def test_protocol_must_match(self):
+        state = load_state(self.dumped("wound-wait", "state.json"))
+        with self.assertRaises(ValueError):
+            restore_state(_manager("wait-die"), state, engine.Transaction)
+
+    def test_waiter_without_a_transaction_is_skipped(self):
+        state = load_state(self.dumped("wait-die"))
+        state["waiters"]["x"].append([9, 'R', state["taken_at"]])
+        state["waiters"]["z"] = [[8, 'W', state["taken_at"]]]
+        messages = Queue()
+        lock_manager = _manager("wait-die", messages)
+        restored = restore_state(lock_manager, state, engine.Transaction)
+
+        self.assertEqual(sorted(restored), [1, 2, 3])
+        self.assertEqual(lock_manager.table_snapshot()["waiters"], {"x": 1})
+        reported = [messages.get_nowait() for _ in range(messages.qsize())]
+        self.assertEqual(len(reported), 2)
+        self.assertTrue(all("skipped waiter" in line for line in reported))
+
+
+if __name__ == "__main__":
+    unittest.main()
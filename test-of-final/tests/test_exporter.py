@@ -0,0 +1,100 @@
+import os
+import sys
+import unittest
+from urllib.request import urlopen
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from exporter import CONTENT_TYPE, EXPORT_EDGES, MetricsExporter, render_metrics  # noqa: E402
+from metrics import LockMetrics, bucket_index, bucket_upper_bound  # noqa: E402
+
+
+class _Transaction:
+    def __init__(self, tid):
+        self.tid = tid
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+def _samples(text):
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+
+class MetricsExporterTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = _Clock()
+        self.metrics = LockMetrics(clock=self.clock)
+
+    def wait(self, tid, wait_ns):
+        trans = _Transaction(tid)
+        self.metrics.transaction_started(trans)
+        self.metrics.wait_started(trans, "x", 1)
+        self.clock.now += wait_ns
+        self.metrics.lock_granted(trans, "x")
+        self.metrics.lock_released(trans, "x")
+        self.metrics.transaction_committed(trans)
+
+    def test_local_scrape(self):
+        self.wait(1, 2_000_000)
+        exporter = MetricsExporter(self.metrics, port=0).start()
+        try:
+            with urlopen(exporter.url, timeout=5) as response:
+                self.assertEqual(response.status, 200)
+                self.assertEqual(response.headers["Content-Type"], CONTENT_TYPE)
+                body = response.read().decode("utf-8")
+        finally:
+            exporter.stop()
+
+        samples = _samples(body)
+        self.assertEqual(samples["lock_grants_total"], 1)
+        self.assertEqual(samples["lock_waits_total"], 1)
+        self.assertEqual(samples["transactions_committed_total"], 1)
+        self.assertEqual(samples["lock_wait_seconds_count"], 1)
+        self.assertEqual(samples['lock_wait_seconds_bucket{le="+Inf"}'], 1)
+        self.assertNotIn("# EOF", body)
+
+    def test_unknown_path_is_404(self):
+        exporter = MetricsExporter(self.metrics, port=0).start()
+        try:
+            with self.assertRaises(Exception) as raised:
+                urlopen(exporter.url.replace("/metrics", "/other"), timeout=5)
+            self.assertEqual(raised.exception.code, 404)
+        finally:
+            exporter.stop()
+
+    def test_buckets_never_overcount(self):
+        # Just above each exported edge, but inside the HDR bucket that holds
+        # the nominal bound: must not be counted under that le
+        for tid, (label, index) in enumerate(EXPORT_EDGES, 1):
+            self.wait(tid, bucket_upper_bound(index) + 1)
+        samples = _samples(render_metrics(self.metrics.snapshot()))
+
+        for position, (label, index) in enumerate(EXPORT_EDGES):
+            edge_ns = bucket_upper_bound(index)
+            self.assertEqual(bucket_index(edge_ns), index)
+            self.assertEqual(samples[f'lock_wait_seconds_bucket{{le="{label}"}}'], position)
+            self.assertAlmostEqual(float(label), edge_ns / 1e9)
+
+    def test_buckets_are_cumulative(self):
+        for tid, wait_ns in enumerate((50_000, 700_000, 3_000_000, 80_000_000, 2_000_000_000), 1):
+            self.wait(tid, wait_ns)
+        samples = _samples(render_metrics(self.metrics.snapshot()))
+        counts = [samples[f'lock_wait_seconds_bucket{{le="{label}"}}'] for label, _ in EXPORT_EDGES]
+        self.assertEqual(counts, sorted(counts))
+        self.assertEqual(counts[0], 1)
+        self.assertEqual(samples['lock_wait_seconds_bucket{le="+Inf"}'], 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import gzip
+import os
+import tempfile
+import threading
+import unittest
+
+import support  # noqa: F401  Puts the modules under test on sys.path
+
+from ingest import detect_format, parse_csv, parse_jsonl, parse_operations, parse_text, read_transactions, run_stream
+
+
+class ParserTest(unittest.TestCase):
+    def test_operations(self):
+        self.assertEqual(parse_operations("R(x) W( y ),R(z)"), [('R', "x"), ('W', "y"), ('R', "z")])
+        for text in ("", "R(x) junk", "X(y)", "R(x"):
+            with self.assertRaises(ValueError):
+                parse_operations(text)
+
+    def test_text(self):
+        lines = ["# header", "", "T3: R(x) W(y)", "W(z)", "  7 : R(a)"]
+        self.assertEqual(list(parse_text(lines)),
+                         [(3, [('R', "x"), ('W', "y")]), (None, [('W', "z")]), (7, [('R', "a")])])
+
+    def test_jsonl(self):
+        lines = ['{"tid": 2, "operations": [["R", "x"], ["W", 5]]}', "", '{"operations": "W(y)"}']
+        self.assertEqual(list(parse_jsonl(lines)), [(2, [('R', "x"), ('W', "5")]), (None, [('W', "y")])])
+        for line in ('{"tid": 1}', '{"operations": [["Q", "x"]]}', '{"operations": []}', "not json"):
+            with self.assertRaises(ValueError):
+                list(parse_jsonl([line]))
+
+    def test_csv(self):
+        lines = ["tid,op,item", "1,R,x", "1,W,y", "2,W,x", "1,R,z"]
+        self.assertEqual(list(parse_csv(lines)),
+                         [(1, [('R', "x"), ('W', "y")]), (2, [('W', "x")]), (1, [('R', "z")])])
+        for line in ("1,R", "1,Q,x", "one,R,x"):
+            with self.assertRaises(ValueError):
+                list(parse_csv([line]))
+
+    def test_detect_format(self):
+        self.assertEqual([detect_format(name) for name in ("a.jsonl", "a.json.gz", "a.csv.gz", "a.txt", "a")],
+                         ["jsonl", "jsonl", "csv", "text", "text"])
+
+    def test_read_transactions(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "batch.txt.gz")
+            with gzip.open(path, "wt") as out:
+                out.write("R(x)\nT5: W(x)\nW(y)\n")
+            # A record without a tid gets the one after the largest seen
+            self.assertEqual(list(read_transactions(path)),
+                             [(1, [('R', "x")]), (5, [('W', "x")]), (6, [('W', "y")])])
+
+            path = os.path.join(directory, "bad.csv")
+            with open(path, "w") as out:
+                out.write("1,R,x\n1,R\n")
+            with self.assertRaisesRegex(ValueError, r"bad\.csv:2: Malformed row"):
+                list(read_transactions(path))
+
+
+class RunStreamTest(unittest.TestCase):
+    def test_runs_every_record(self):
+        seen = []
+        lock = threading.Lock()
+
+        def execute(tid, operations):
+            with lock:
+                seen.append(tid)
+
+        records = ((tid, [('R', "x")]) for tid in range(1, 201))
+        self.assertEqual(run_stream(records, execute, workers=4, backlog=2), 200)
+        self.assertEqual(sorted(seen), list(range(1, 201)))
+
+    def test_worker_error_reaches_the_caller(self):
+        # Every worker fails: the reader must not block on the full queue
+        def execute(tid, operations):
+            raise RuntimeError(f"T{tid} failed")
+
+        outcome = []
+
+        def run():
+            try:
+                run_stream(((tid, []) for tid in range(1, 10001)), execute, workers=2, backlog=1)
+            except RuntimeError as error:
+                outcome.append(error)
+
+        runner = threading.Thread(target=run, daemon=True)
+        runner.start()
+        runner.join(5)
+        self.assertFalse(runner.is_alive(), "run_stream hung after its workers failed")
+        self.assertEqual(len(outcome), 1)
+        self.assertRegex(str(outcome[0]), r"T\d+ failed")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+
+from support import engine  # First: it also puts the modules under test on sys.path
+
+from replay import NullQueue
+
+
+class ConservativeRequestTest(unittest.TestCase):
+    def setUp(self):
+        self.transactions = {}
+
+    def manager(self, protocol, start_times=(1, 2, 3), **options):
+        lock_manager = engine.LockManager(protocol, messages=NullQueue(), re_execute=False, **options)
+        for tid, start_time in enumerate(start_times, 1):
+            self.transactions[tid] = engine.Transaction(tid, start_time)
+            lock_manager.add_transaction(self.transactions[tid])
+        return lock_manager
+
+    def queued(self, lock_manager):
+        return {item: [trans.tid for trans, _, _ in waiters] for item, waiters in lock_manager.wait_queue.items()}
+
+    def test_respects_writer_preference(self):
+        # T1 holds R(y) and T2 is queued for W(y): T3, younger than T2, may
+        # not share y, so the whole set is refused and nothing is left behind.
+        # Under Wait-Die only an older T2 waits; under Wound-Wait a younger one.
+        for protocol, start_times in (("wait-die", (2, 1, 3)), ("wound-wait", (1, 2, 3))):
+            lock_manager = self.manager(protocol, start_times, writer_preference=True)
+            t1, t2, t3 = (self.transactions[tid] for tid in (1, 2, 3))
+            lock_manager.request_lock(t1, "y", 'R')
+            lock_manager.request_lock(t2, "y", 'W')
+            lock_manager.request_lock(t3, "z", 'R')
+            self.assertEqual(self.queued(lock_manager), {"y": [2]})
+
+            self.assertFalse(lock_manager.request_locks(t3, [("x", 'W'), ("y", 'R')], conservative=True))
+            self.assertEqual(t3.locks_held, {"z"})
+            self.assertEqual(t3.aborts, 0)
+            self.assertNotIn("x", lock_manager.locks)
+            self.assertEqual(self.queued(lock_manager), {"y": [2]})
+
+    def test_shares_without_writer_preference(self):
+        lock_manager = self.manager("wait-die")
+        t1, t2, t3 = (self.transactions[tid] for tid in (1, 2, 3))
+        lock_manager.request_lock(t2, "y", 'R')
+        lock_manager.request_lock(t1, "y", 'W')
+        self.assertTrue(lock_manager.request_locks(t3, [("x", 'W'), ("y", 'R')], conservative=True))
+        self.assertEqual(t3.locks_held, {"x", "y"})
+
+    def test_refuses_a_held_write(self):
+        lock_manager = self.manager("wound-wait")
+        t1, t3 = self.transactions[1], self.transactions[3]
+        lock_manager.request_lock(t3, "y", 'W')
+        self.assertFalse(lock_manager.request_locks(t1, [("x", 'R'), ("y", 'R')], conservative=True))
+        self.assertEqual(t1.locks_held, set())
+        self.assertEqual(t3.aborts, 0)
+
+
+class SnapshotVersionTest(unittest.TestCase):
+    def write(self, lock_manager, trans, item):
+        lock_manager.request_lock(trans, item, 'W')
+        lock_manager.release_lock(trans, item)
+
+    def test_versions_are_bounded(self):
+        lock_manager = engine.LockManager("wait-die", messages=NullQueue(), re_execute=False, version_limit=8)
+        writer, reader = engine.Transaction(1, 1), engine.Transaction(2, 2)
+        lock_manager.add_transaction(writer)
+        before = lock_manager.read_snapshot(reader, ["k0", "k1"])
+        for n in range(100):
+            self.write(lock_manager, writer, f"k{n}")
+        self.write(lock_manager, writer, "k0")
+
+        self.assertEqual(len(lock_manager.versions), 8)
+        after = lock_manager.read_snapshot(reader, ["k0", "k1", "k99"])
+        # Every item reads a version at least as new as before, and one
+        # written again reads newer than one that was only dropped
+        self.assertGreater(after["k1"], before["k1"])
+        self.assertGreater(after["k0"], after["k1"])
+        self.assertEqual(after["k99"], lock_manager.write_sequence - 1)
+
+    def test_no_versions_with_a_store(self):
+        lock_manager = engine.LockManager("wait-die", messages=NullQueue(), re_execute=False,
+                                          store=engine.create_store())
+        writer = engine.Transaction(1, 1)
+        lock_manager.add_transaction(writer)
+        for n in range(100):
+            self.write(lock_manager, writer, f"k{n}")
+        self.assertIsNone(lock_manager.versions)
+        self.assertEqual(lock_manager.read_snapshot(engine.Transaction(2, 2), ["k5"]), {"k5": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,183 @@
+import functools
+import threading
+import time
+import unittest
+
+from support import engine  # First: it also puts the modules under test on sys.path
+
+from clock import HybridLogicalClock, node_of, physical_ms
+from lock_server import ABORTED, GRANTED, ClusterClient, LocalCluster, LockClient, LockServer
+from replay import NullQueue
+
+
+class _Pending(threading.Thread):
+    # A request on its own connection, which may block until it is decided
+    def __init__(self, address, tid, start_time, item, lock_type=None):
+        super().__init__(daemon=True)
+        self.client = LockClient(*address)
+        self.call = (tid, start_time, item, lock_type)
+        self.status = None
+        self.start()
+
+    def run(self):
+        tid, start_time, item, lock_type = self.call
+        if lock_type is None:
+            self.status = self.client.request_locks(tid, start_time, item)  # item is the lock set
+        else:
+            self.status = self.client.request_lock(tid, start_time, item, lock_type)
+
+    def result(self):
+        self.join(5)
+        self.client.close()
+        return self.status
+
+
+class LockServiceTest(unittest.TestCase):
+    def start(self, protocol):
+        make_lock_manager = functools.partial(engine.LockManager, protocol, messages=NullQueue(), re_execute=False)
+        self.server = LockServer(make_lock_manager(), engine.Transaction).start()
+        self.addCleanup(self.server.stop)
+        self.client = LockClient(*self.server.address)
+        self.addCleanup(self.client.close)
+        return self.server.service.lock_manager
+
+    def wait_until_queued(self, lock_manager, item, tid):
+        for _ in range(500):
+            with lock_manager.lock:
+                if any(trans.tid == tid for trans, _, _ in lock_manager.wait_queue.get(item, ())):
+                    return
+            time.sleep(0.01)
+        self.fail(f"T{tid} never queued for {item}")
+
+    def test_request_blocks_until_granted(self):
+        lock_manager = self.start("wait-die")
+        self.assertEqual(self.client.request_lock(2, 2, "x", 'W'), GRANTED)
+        pending = _Pending(self.server.address, 1, 1, "x", 'W')
+        self.wait_until_queued(lock_manager, "x", 1)
+        self.assertIsNone(pending.status)
+        self.client.end_transaction(2)
+        self.assertEqual(pending.result(), GRANTED)
+        self.assertEqual(lock_manager.table_snapshot()["holders"], {"x": [1]})
+
+    def test_younger_request_dies(self):
+        self.start("wait-die")
+        self.assertEqual(self.client.request_lock(1, 1, "x", 'W'), GRANTED)
+        self.assertEqual(self.client.request_lock(2, 2, "x", 'R'), ABORTED)
+
+    def test_rerequesting_a_held_lock_is_a_noop(self):
+        for protocol in ("wait-die", "wound-wait"):
+            lock_manager = self.start(protocol)
+            self.assertEqual(self.client.request_lock(1, 1, "x", 'W'), GRANTED)
+            self.assertEqual(self.client.request_lock(1, 1, "x", 'W'), GRANTED)
+            self.assertEqual(self.client.request_lock(1, 1, "x", 'R'), GRANTED)
+            self.assertEqual(lock_manager.table_snapshot()["holders"], {"x": [1]})
+            self.assertEqual(lock_manager.transactions[1].aborts, 0)
+            self.client.end_transaction(1)
+
+    def test_wounded_waiter_is_told(self):
+        lock_manager = self.start("wound-wait")
+        self.assertEqual(self.client.request_lock(2, 2, "x", 'W'), GRANTED)
+        self.assertEqual(self.client.request_lock(3, 3, "z", 'W'), GRANTED)
+        pending = _Pending(self.server.address, 3, 3, "x", 'W')
+        self.wait_until_queued(lock_manager, "x", 3)
+        # T1 wounds T3 while T3 is queued for x
+        self.assertEqual(self.client.request_lock(1, 1, "z", 'W'), GRANTED)
+        self.assertEqual(pending.result(), ABORTED)
+        self.assertEqual(lock_manager.table_snapshot()["waiters"], {})
+        self.client.end_transaction(2)
+        self.assertEqual(lock_manager.table_snapshot()["holders"], {"z": [1]})
+
+    def test_request_many_takes_the_set_in_one_frame(self):
+        lock_manager = self.start("wait-die")
+        self.assertEqual(self.client.request_locks(2, 2, [("y", 'W'), ("x", 'R'), ("x", 'W'), ("z", 'R')]), GRANTED)
+        self.assertEqual(lock_manager.table_snapshot()["modes"], {"x": 'W', "y": 'W', "z": 'R'})
+        self.assertEqual(self.client.request_locks(3, 3, [("a", 'W'), ("y", 'R')]), ABORTED)
+        self.assertNotIn("a", lock_manager.locks)
+
+        # An older set waits at y, then takes the rest once y is handed over
+        pending = _Pending(self.server.address, 1, 1, [("b", 'W'), ("y", 'W'), ("z", 'W')])
+        self.wait_until_queued(lock_manager, "y", 1)
+        self.assertEqual(lock_manager.table_snapshot()["holders"]["b"], [1])
+        self.client.end_transaction(2)
+        self.assertEqual(pending.result(), GRANTED)
+        self.assertEqual(lock_manager.transactions[1].locks_held, {"b", "y", "z"})
+
+
+class ClusterClockTest(unittest.TestCase):
+    def test_nodes_fold_in_received_start_times(self):
+        make_lock_manager = functools.partial(engine.LockManager, "wait-die", messages=NullQueue(),
+                                              re_execute=False)
+        # A client whose wall clock runs an hour ahead of the nodes
+        ahead = HybridLogicalClock(0, wall_ms=lambda: time.time_ns() // 1_000_000 + 3_600_000)
+        with LocalCluster(3, make_lock_manager, engine.Transaction) as cluster:
+            services = [server.service for server in cluster.servers]
+            self.assertEqual([node_of(service.clock.now()) for service in services], [1, 2, 3])
+            stamp = ahead.now()
+            client = LockClient(*cluster.addresses[1])
+            try:
+                self.assertEqual(client.request_lock(stamp, stamp, "x", 'R'), GRANTED)
+            finally:
+                client.close()
+            later = services[1].clock.now()
+            self.assertGreater(later, stamp)
+            self.assertGreaterEqual(physical_ms(later), physical_ms(stamp))
+            self.assertLess(services[0].clock.now(), stamp)
+
+    def test_cluster_request_locks(self):
+        make_lock_manager = functools.partial(engine.LockManager, "wait-die", messages=NullQueue(),
+                                              re_execute=False)
+        with LocalCluster(3, make_lock_manager, engine.Transaction) as cluster:
+            client = ClusterClient(cluster.addresses)
+            try:
+                requests = [(f"k{n}", 'W') for n in range(12)]
+                self.assertEqual(client.request_locks(1, 1, requests), [GRANTED] * 12)
+                held = {item for server in cluster.servers for item in server.service.lock_manager.locks}
+                self.assertEqual(held, {item for item, _ in requests})
+                client.end_transaction(1)
+            finally:
+                client.close()
+
+    def test_release_gets_through_when_every_pooled_connection_blocks(self):
+        make_lock_manager = functools.partial(engine.LockManager, "wait-die", messages=NullQueue(),
+                                              re_execute=False)
+        with LocalCluster(1, make_lock_manager, engine.Transaction) as cluster:
+            client = ClusterClient(cluster.addresses, pool_size=2)
+            lock_manager = cluster.servers[0].service.lock_manager
+            try:
+                self.assertEqual(client.request_locks(100, 100, [("x", 'W')]), [GRANTED])
+                statuses = {}
+
+                def older(tid):
+                    statuses[tid] = client.request_locks(tid, tid, [("x", 'W')])
+                    client.end_transaction(tid)
+
+                # Three older waiters over a pool of two: two requests block
+                # on the server holding both connections, the third waits
+                # for a connection
+                waiters = [threading.Thread(target=older, args=(tid,), daemon=True) for tid in (1, 2, 3)]
+                for waiter in waiters:
+                    waiter.start()
+                for _ in range(500):
+                    if len(lock_manager.wait_queue.get("x", ())) == 2:
+                        break
+                    time.sleep(0.01)
+                self.assertEqual(len(lock_manager.wait_queue["x"]), 2)
+
+                holder = threading.Thread(target=client.end_transaction, args=(100,), daemon=True)
+                holder.start()
+                holder.join(5)
+                self.assertFalse(holder.is_alive(), "holder's end_transaction never got through")
+                for waiter in waiters:
+                    waiter.join(5)
+                    self.assertFalse(waiter.is_alive())
+                # Both queued waiters are granted in turn; the third may die
+                # if it reaches the server while an older one holds x
+                self.assertEqual(sorted(statuses), [1, 2, 3])
+                self.assertGreaterEqual(list(statuses.values()).count([GRANTED]), 2)
+                self.assertEqual(lock_manager.table_snapshot()["holders"], {})
+            finally:
+                client.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+
+from support import engine  # First: it also puts the modules under test on sys.path
+
+from metrics import LockMetrics
+from replay import NullQueue
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class PendingWaitTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = _Clock()
+        self.metrics = LockMetrics(clock=self.clock)
+
+    def manager(self):
+        return engine.LockManager("wait-die", metrics=self.metrics, messages=NullQueue(), re_execute=False)
+
+    def test_commit_ends_a_wait_that_was_never_granted(self):
+        lock_manager = self.manager()
+        older, younger = engine.Transaction(1, 1), engine.Transaction(2, 2)
+        lock_manager.add_transaction(older)
+        lock_manager.add_transaction(younger)
+        lock_manager.request_lock(younger, "x", 'W')
+        lock_manager.request_lock(older, "x", 'W')  # Queued; read_item/write_item don't block
+        self.clock.now += 1000
+        self.assertEqual(self.metrics.snapshot()["waiting"], 1)
+        self.assertEqual(self.metrics.starvation(), [(1, 1000, 0, True)])
+
+        self.metrics.transaction_committed(older)
+        self.clock.now += 1000
+        self.assertEqual(self.metrics.snapshot()["waiting"], 0)
+        self.assertEqual(self.metrics.starvation(), [])
+
+        # The stale request is promoted after the commit: not a wait of T1's
+        lock_manager.release_lock(younger, "x")
+        self.clock.now += 1000
+        self.assertEqual(self.metrics.starvation(), [])
+        self.assertEqual(self.metrics.snapshot()["wait_ns"].count, 0)
+
+    def test_new_manager_forgets_the_old_ones_waits(self):
+        first = self.manager()
+        holder, waiter = engine.Transaction(2, 2), engine.Transaction(1, 1)
+        for trans in (holder, waiter):
+            first.add_transaction(trans)
+        first.request_lock(holder, "x", 'W')
+        first.request_lock(waiter, "x", 'W')
+        self.assertEqual(self.metrics.snapshot()["waiting"], 1)
+
+        # The next batch numbers its transactions from 1 again
+        self.metrics.forget_pending()
+        second = self.manager()
+        trans = engine.Transaction(1, 1)
+        second.add_transaction(trans)
+        self.clock.now += 5000
+        second.request_lock(trans, "x", 'W')
+        snapshot = self.metrics.snapshot()
+        self.assertEqual((snapshot["waiting"], snapshot["wait_ns"].count, snapshot["starvation"]), (0, 0, []))
+
+
+if __name__ == "__main__":
+    unittest.main()
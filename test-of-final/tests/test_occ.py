@@ -0,0 +1,57 @@
+import unittest
+from unittest import mock
+
+from support import engine  # First: it also puts the modules under test on sys.path
+
+from metrics import LockMetrics
+from occ import OptimisticEngine
+from replay import ScheduleRecorder
+
+
+class OptimisticEngineTest(unittest.TestCase):
+    def setUp(self):
+        self.recorder = ScheduleRecorder()
+        self.engine = OptimisticEngine(metrics=LockMetrics(), recorder=self.recorder, store=engine.create_store())
+        self.reader, self.writer = engine.Transaction(1, 1), engine.Transaction(2, 2)
+        for trans in (self.reader, self.writer):
+            self.engine.add_transaction(trans)
+
+    def test_stale_read_fails_validation(self):
+        self.engine.request_lock(self.reader, "x", 'R')
+        self.engine.request_lock(self.reader, "y", 'W')
+        self.engine.request_lock(self.writer, "x", 'W')
+        self.assertTrue(self.engine.commit_transaction(self.writer))
+        self.assertFalse(self.engine.commit_transaction(self.reader))
+
+        self.assertEqual((self.engine.validations, self.engine.validation_failures), (2, 1))
+        self.assertEqual(self.reader.aborts, 1)
+        # The failed attempt's buffered write never lands
+        self.assertEqual(self.engine.versions, {"x": 1})
+        self.assertEqual(self.engine.store.get_many(["x", "y"]), [2, 0])
+        self.assertIn(("aborted", 1, None, None, "validation"), self.recorder.events)
+        self.assertEqual(self.engine.metrics.snapshot()["aborts"], {"validation": 1})
+
+    def test_restart_commits(self):
+        self.engine.request_lock(self.reader, "x", 'R')
+        self.engine.request_lock(self.writer, "x", 'W')
+        self.engine.commit_transaction(self.writer)
+        with mock.patch.object(engine.time, "sleep"):
+            # transaction_workflow runs a refused transaction again from the start
+            engine.transaction_workflow(self.reader, [('R', "x"), ('W', "y")], self.engine)
+        self.assertEqual(self.reader.aborts, 1)
+        self.assertEqual(self.engine.versions, {"x": 1, "y": 1})
+        self.assertEqual(self.engine.store.get_many(["y"]), [1])
+        self.assertEqual([event[:2] for event in self.recorder.events if event[0] in ("aborted", "commit")],
+                         [("commit", 2), ("aborted", 1), ("commit", 1)])
+
+    def test_accesses_show_up_in_the_metrics(self):
+        metrics = self.engine.metrics
+        with mock.patch.object(engine.time, "sleep"):
+            engine.transaction_workflow(self.writer, [('R', "x"), ('W', "y"), ('W', "x")], self.engine)
+        snapshot = metrics.snapshot()
+        self.assertEqual((snapshot["grants"], snapshot["hold_ns"].count), (3, 3))
+        self.assertEqual((snapshot["waits"], snapshot["waiting"], snapshot["commits"]), (0, 0, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
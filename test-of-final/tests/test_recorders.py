@@ -0,0 +1,150 @@
+import gzip
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from support import engine  # First: it also puts the modules under test on sys.path
+
+from replay import NullQueue, ScheduleRecorder
+from timeline import TimelineRecorder
+from tracing import TraceRecorder
+
+# (time, kind, tid, item, lock_type, detail). T2 is queued for x behind T1
+# and commits without waiting (read_item doesn't block); the grant reaches
+# it after the commit. T3 is aborted once and restarts.
+EVENTS = [
+    (1, "request", 1, "x", 'W', None),
+    (1, "granted", 1, "x", 'W', None),
+    (1, "request", 3, "y", 'R', None),
+    (1, "granted", 3, "y", 'R', None),
+    (2, "request", 2, "x", 'W', None),
+    (2, "waiting", 2, "x", 'W', None),
+    (2, "aborted", 3, None, None, "wound-wait"),
+    (3, "commit", 2, None, None, None),
+    (3, "granted", 3, "y", 'R', None),
+    (4, "release", 1, "x", None, None),
+    (4, "granted", 2, "x", 'W', None),
+    (5, "release", 2, "x", None, None),
+    (5, "release", 3, "y", None, None),
+    (6, "commit", 1, None, None, None),
+    (6, "commit", 3, None, None, None),
+    (7, "request", 4, "z", 'W', None),
+    (7, "waiting", 4, "z", 'W', None),
+]
+
+
+class _Clock:
+    def __init__(self, scale):
+        self.scale = scale
+        self.now = 0
+
+    def __call__(self):
+        return self.now * self.scale
+
+
+def _play(recorder, clock):
+    for at, kind, tid, item, lock_type, detail in EVENTS:
+        clock.now = at
+        recorder.record(kind, tid, item, lock_type, detail)
+
+
+class TimelineRecorderTest(unittest.TestCase):
+    def test_rows(self):
+        clock = _Clock(1)
+        forward = ScheduleRecorder()
+        recorder = TimelineRecorder(forward=forward, clock=clock)
+        _play(recorder, clock)
+        clock.now = 8
+        recorder.finish()
+
+        self.assertEqual(len(forward.events), len(EVENTS))
+        rows = {row.tid: row for row in recorder.rows}
+        # The late grant and the release after it don't start a new T2 row
+        self.assertEqual([row.tid for row in recorder.rows], [1, 3, 2, 4])
+        self.assertEqual((rows[2].spans, rows[2].marks, rows[2].end), ([(2, 3, "wait")], [(3, "commit")], 3))
+        self.assertEqual(recorder.lingering, {})
+        self.assertEqual(rows[1].spans, [(1, 4, 'W')])
+        self.assertEqual(rows[3].spans, [(1, 2, 'R'), (3, 5, 'R')])
+        self.assertEqual(rows[3].marks, [(2, "abort"), (6, "commit")])
+        # Still waiting when the batch stopped
+        self.assertEqual((rows[4].spans, rows[4].end), ([(7, 8, "wait")], None))
+
+        view = recorder.view(0, 4, 3.5, 4.5)
+        self.assertEqual([(row[1], row[4]) for row in view],
+                         [(1, [(1, 4, 'W')]), (3, [(3, 5, 'R')]), (2, []), (4, [])])
+
+
+class TraceRecorderTest(unittest.TestCase):
+    def test_events(self):
+        clock = _Clock(1000)  # trace timestamps are microseconds of a nanosecond clock
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "trace.json")
+            recorder = TraceRecorder(path, clock=clock)
+            _play(recorder, clock)
+            clock.now = 8
+            recorder.close()
+            with open(path, encoding="utf-8") as trace:
+                events = json.load(trace)
+
+        spans = {(event["name"], event["ts"], event["dur"]) for event in events if event["ph"] == "X"}
+        instants = [(event["name"], event["ts"]) for event in events if event["ph"] == "i"]
+        self.assertEqual(spans, {
+            ("hold W(x)", 1, 3), ("hold R(y)", 1, 1), ("hold R(y)", 3, 2), ("wait W(x)", 2, 1),
+            ("wait W(z)", 7, 1), ("T1", 1, 5), ("T2", 2, 1), ("T3", 1, 5), ("T4", 7, 1),
+        })
+        self.assertIn(("late grant T2 W(x)", 4), instants)
+        self.assertEqual(sum(name.startswith("commit") for name, _ in instants), 3)
+        unfinished = [event for event in events if event["name"] == "T4"]
+        self.assertEqual(unfinished[0]["args"], {"aborts": 0, "unfinished": True})
+
+    def test_threaded_run_is_valid_trace_json(self):
+        # The shape chrome://tracing and Perfetto expect: metadata names every
+        # track, complete events have a duration, instants are thread-scoped
+        with tempfile.TemporaryDirectory() as directory, mock.patch.object(engine.time, "sleep"):
+            path = os.path.join(directory, "trace.json.gz")
+            recorder = TraceRecorder(path)
+            lock_manager = engine.LockManager("wound-wait", recorder=recorder, messages=NullQueue())
+            transactions = [(engine.Transaction(tid, tid), [('W', "xyz"[tid % 3]), ('R', "xyz"[tid % 2])])
+                            for tid in range(1, 31)]
+            engine.execute_headless(lock_manager, transactions)
+            recorder.close()
+            with gzip.open(path, "rt", encoding="utf-8") as trace:
+                events = json.load(trace)
+
+        self.assertIsInstance(events, list)
+        tracks = {event["tid"] for event in events if event["name"] == "thread_name"}
+        for event in events:
+            self.assertIn(event["ph"], ("M", "X", "i"))
+            self.assertIsInstance(event["pid"], int)
+            if event["ph"] == "M":
+                self.assertIsInstance(event["args"]["name"], str)
+                continue
+            self.assertIn(event["tid"], tracks)
+            self.assertGreaterEqual(event["ts"], 0)
+            if event["ph"] == "X":
+                self.assertGreaterEqual(event["dur"], 0)
+            else:
+                self.assertEqual(event["s"], "t")
+        self.assertEqual(sum(event.get("cat") == "transaction" for event in events), 30)
+
+    def test_record_does_not_wait_for_the_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            recorder = TraceRecorder(os.path.join(directory, "trace.json"))
+            gate = threading.Event()
+            write = recorder.out.write
+            recorder.out.write = lambda text: gate.wait() and write(text)
+            recording = threading.Thread(target=_play, args=(recorder, _Clock(1000)), daemon=True)
+            recording.start()
+            recording.join(5)
+            self.assertFalse(recording.is_alive(), "record() blocked on the trace file")
+            gate.set()
+            recorder.close()
+            with open(recorder.path, encoding="utf-8") as trace:
+                self.assertEqual(sum(event.get("cat") == "transaction" for event in json.load(trace)), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+
+from support import engine  # First: it also puts the modules under test on sys.path
+
+from replay import DeterministicScheduler, NullQueue, ScheduleRecorder
+
+
+def _manager(protocol, recorder=None):
+    return engine.LockManager(protocol, recorder=recorder, messages=NullQueue(), re_execute=False)
+
+
+def _scheduler(protocol):
+    return DeterministicScheduler(lambda: _manager(protocol), engine.Transaction)
+
+
+class ReplayTest(unittest.TestCase):
+    def test_nested_calls_are_not_steps(self):
+        # T1 wounds T2: the abort and the release it causes happen inside
+        # T1's request and must not show up as steps of their own
+        recorder = ScheduleRecorder()
+        lock_manager = _manager("wound-wait", recorder)
+        older, younger = engine.Transaction(1, 1), engine.Transaction(2, 2)
+        lock_manager.add_transaction(older)
+        lock_manager.add_transaction(younger)
+        lock_manager.request_lock(younger, "x", 'W')
+        lock_manager.request_lock(older, "x", 'W')
+
+        self.assertEqual([step[:4] for step in recorder.steps()],
+                         [("add", 1, None, None), ("add", 2, None, None),
+                          ("request", 2, "x", 'W'), ("request", 1, "x", 'W')])
+        self.assertEqual([event[:2] for event in recorder.decisions()],
+                         [("granted", 2), ("aborted", 2), ("granted", 1)])
+
+    def test_promotion_is_not_a_step(self):
+        recorder = ScheduleRecorder()
+        lock_manager = _manager("wait-die", recorder)
+        older, younger = engine.Transaction(1, 1), engine.Transaction(2, 2)
+        lock_manager.add_transaction(older)
+        lock_manager.add_transaction(younger)
+        lock_manager.request_lock(younger, "x", 'W')
+        lock_manager.request_lock(older, "x", 'W')
+        lock_manager.release_lock(younger, "x")
+
+        self.assertEqual([step[0] for step in recorder.steps()], ["add", "add", "request", "request", "release"])
+        self.assertEqual([event[:2] for event in recorder.decisions()],
+                         [("granted", 2), ("waiting", 1), ("granted", 1)])
+
+    def test_calls_under_an_outside_lock_are_steps(self):
+        # Callers such as finish_transaction hold lock_manager.lock across
+        # several calls; each of those calls is still a step
+        recorder = ScheduleRecorder()
+        lock_manager = _manager("wait-die", recorder)
+        trans = engine.Transaction(1, 1)
+        lock_manager.add_transaction(trans)
+        with lock_manager.lock:
+            lock_manager.request_lock(trans, "x", 'R')
+            lock_manager.release_locks(trans)
+
+        self.assertEqual([step[:3] for step in recorder.steps()],
+                         [("add", 1, None), ("request", 1, "x"), ("release", 1, "x")])
+
+    def test_run_is_deterministic(self):
+        transactions = {1: (1, [('W', "x"), ('R', "y")]), 2: (2, [('R', "x"), ('W', "y")]),
+                        3: (3, [('W', "y"), ('W', "x")])}
+        schedule = [1, ("request", 3, "y", 'W'), 2, 1, ("release", 3, "y"), 2]
+        for protocol in ("wait-die", "wound-wait"):
+            first = _scheduler(protocol).run(transactions, schedule)
+            second = _scheduler(protocol).run(transactions, schedule)
+            self.assertTrue(first.decisions())
+            self.assertTrue(first.matches(second))
+
+    def test_threaded_run_replays_to_the_same_decisions(self):
+        for protocol in ("wait-die", "wound-wait"):
+            recorder = ScheduleRecorder()
+            lock_manager = _manager(protocol, recorder)
+            transactions = [(engine.Transaction(tid, tid), [('W', "x"), ('R', "y"), ('W', "z")][tid % 3:] +
+                             [('R', "x")]) for tid in range(1, 7)]
+            engine.execute_headless(lock_manager, transactions)
+
+            replayed = _scheduler(protocol).replay(recorder)
+            self.assertEqual(replayed.decisions(), recorder.decisions())
+            self.assertEqual(replayed.recorder.steps(), recorder.steps())
+
+    def test_snapshot_reads_replay(self):
+        recorder = ScheduleRecorder()
+        lock_manager = _manager("wait-die", recorder)
+        transactions = [(engine.Transaction(1, 1), [('W', "x"), ('W', "y")]),
+                        (engine.Transaction(2, 2), [('R', "x"), ('R', "y")]),
+                        (engine.Transaction(3, 3), [('W', "y")])]
+        engine.execute_headless(lock_manager, transactions)
+        self.assertIn(("snapshot", 2, None, None, ("x", "y")), recorder.steps())
+
+        replayed = _scheduler("wait-die").replay(recorder)
+        self.assertEqual(replayed.recorder.steps(), recorder.steps())
+        self.assertEqual(replayed.decisions(), recorder.decisions())
+        self.assertIn(("commit", 2, None, None, None), replayed.recorder.events)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+
+import support  # noqa: F401  Puts the modules under test on sys.path
+
+from serializability import SerializabilityChecker, check_history
+
+
+def _ops(*steps):
+    # ("R", tid, item) / ("W", tid, item) / ("abort", tid) / ("commit", tid)
+    events = []
+    for step in steps:
+        if step[0] in ('R', 'W'):
+            events.append(("granted", step[1], step[2], step[0], None))
+        else:
+            events.append(("aborted" if step[0] == "abort" else "commit", step[1], None, None, None))
+    return events
+
+
+class SerializabilityTest(unittest.TestCase):
+    def test_cycle(self):
+        # T1 -> T2 on x, T2 -> T1 on y: a lost update pattern
+        report = check_history(_ops(('R', 1, "x"), ('R', 2, "y"), ('W', 2, "x"), ('W', 1, "y"),
+                                    ("commit", 1), ("commit", 2)))
+        self.assertFalse(report.serializable)
+        self.assertEqual(report.cycle_count, 1)
+        self.assertEqual(report.cycles, [([1, 2, 1], "y")])
+        self.assertIn("NOT serializable (1 cycles)", report.summary())
+
+    def test_no_cycle(self):
+        report = check_history(_ops(('W', 1, "x"), ('R', 2, "x"), ('W', 2, "y"), ('R', 3, "y"), ('R', 3, "x"),
+                                    ("commit", 1), ("commit", 2), ("commit", 3)))
+        self.assertTrue(report.serializable)
+        self.assertEqual((report.operations, report.committed, report.aborted), (5, 3, 0))
+        self.assertEqual((report.cycles, report.anomalies), ([], []))
+
+    def test_committed_sources_are_pruned(self):
+        checker = SerializabilityChecker()
+        # A long chain: each transaction reads what the previous one wrote
+        for tid in range(1, 1001):
+            for event in _ops(('R', tid, "x"), ('W', tid, "x"), ("commit", tid)):
+                checker.record(*event)
+        self.assertEqual(checker.report().live, 0)
+        self.assertEqual(checker.items, {})
+
+        # A committed transaction with a live predecessor must stay until
+        # that one finishes, then goes with it
+        for event in _ops(('W', 1001, "y"), ('R', 1002, "y"), ("commit", 1002)):
+            checker.record(*event)
+        self.assertEqual(checker.report().live, 2)
+        checker.record("commit", 1001)
+        self.assertEqual(checker.report().live, 0)
+        self.assertTrue(checker.report().serializable)
+
+    def test_read_of_an_aborted_write(self):
+        report = check_history(_ops(('W', 1, "x"), ('R', 2, "x"), ("abort", 1), ("commit", 2),
+                                    ('W', 1, "x"), ("commit", 1)))
+        self.assertEqual(report.anomaly_count, 1)
+        self.assertEqual(report.anomalies, [("aborted-read", 2, "x", 1)])
+        self.assertEqual((report.committed, report.aborted), (2, 1))
+        self.assertTrue(report.serializable)
+
+    def test_abort_discards_the_incarnation(self):
+        # Without T2's aborted first attempt there is no T2 -> T1 edge
+        report = check_history(_ops(('R', 1, "x"), ('W', 2, "y"), ('R', 1, "y"), ("abort", 2),
+                                    ('W', 2, "x"), ('W', 2, "y"), ("commit", 1), ("commit", 2)))
+        self.assertTrue(report.serializable)
+        self.assertEqual(report.aborted, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
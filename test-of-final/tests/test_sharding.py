@@ -0,0 +1,56 @@
+import functools
+import unittest
+
+from support import engine  # First: it also puts the modules under test on sys.path
+
+from replay import NullQueue
+from sharding import ShardedEngine, ShardWorker
+from simulation import generate_workload
+
+
+def _make_lock_manager(protocol):
+    return functools.partial(engine.LockManager, protocol, messages=NullQueue(), re_execute=False)
+
+
+class ShardWorkerTest(unittest.TestCase):
+    def test_every_part_commits(self):
+        # Three hot items and 256 parts at once: plenty of dies and wounds
+        for protocol in ("wait-die", "wound-wait"):
+            worker = ShardWorker(_make_lock_manager(protocol)(), engine.Transaction)
+            batch = [(tid, tid, operations) for tid, operations in enumerate(generate_workload(256, seed=3), 1)]
+            results = worker.run_batch(batch)
+
+            self.assertEqual(sorted(tid for tid, _, _ in results), list(range(1, 257)))
+            self.assertTrue(all(committed for _, _, committed in results))
+            self.assertTrue(any(restarts for _, restarts, _ in results))
+            snapshot = worker.lock_manager.table_snapshot()
+            self.assertEqual((snapshot["holders"], snapshot["waiters"], snapshot["transactions"]), ({}, {}, 0))
+
+    def test_oldest_part_never_restarts(self):
+        for protocol in ("wait-die", "wound-wait"):
+            worker = ShardWorker(_make_lock_manager(protocol)(), engine.Transaction)
+            batch = [(tid, 1000 - tid, [('W', "x"), ('W', "y")]) for tid in range(1, 51)]
+            restarts = {tid: count for tid, count, _ in worker.run_batch(batch)}
+            self.assertEqual(restarts[50], 0)
+
+    def test_restart_limit(self):
+        worker = ShardWorker(_make_lock_manager("wait-die")(), engine.Transaction, max_restarts=0)
+        results = worker.run_batch([(tid, tid, [('W', "x"), ('W', "x")]) for tid in range(1, 11)])
+        self.assertIn((1, 0, True), results)
+        self.assertTrue(any(not committed for _, _, committed in results))
+        self.assertEqual(worker.lock_manager.table_snapshot()["transactions"], 0)
+
+
+class ShardedEngineTest(unittest.TestCase):
+    def test_nothing_fails_whatever_the_shard_count(self):
+        items = [f"k{n}" for n in range(8)]
+        for protocol in ("wait-die", "wound-wait"):
+            for shards in (1, 3):
+                with ShardedEngine(_make_lock_manager(protocol), engine.Transaction, shards=shards,
+                                   batch_size=64) as sharded:
+                    result = sharded.run(generate_workload(1000, items=items, ops_per_transaction=3, seed=5))
+                self.assertEqual((result.committed, result.failed), (1000, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import random
+import unittest
+
+from support import engine  # First: it also puts the modules under test on sys.path
+
+from replay import NullQueue
+from simulation import Simulator, constant, exponential, generate_workload, lognormal, uniform
+
+
+def _simulator(protocol, **options):
+    lock_manager = engine.LockManager(protocol, messages=NullQueue(), re_execute=False)
+    return Simulator(lock_manager, engine.Transaction, **options)
+
+
+class DistributionTest(unittest.TestCase):
+    def test_samples(self):
+        rng = random.Random(7)
+        self.assertEqual(constant(0.25)(rng), 0.25)
+        self.assertTrue(all(0.1 <= uniform(0.1, 0.2)(rng) <= 0.2 for _ in range(1000)))
+        self.assertTrue(all(lognormal(0.0, 1.0)(rng) > 0 for _ in range(1000)))
+        samples = [exponential(0.5)(rng) for _ in range(20000)]
+        self.assertTrue(all(sample >= 0 for sample in samples))
+        self.assertAlmostEqual(sum(samples) / len(samples), 0.5, delta=0.02)
+
+    def test_workload(self):
+        first = list(generate_workload(50, items=("a", "b"), ops_per_transaction=3, write_ratio=0.0, seed=1))
+        self.assertEqual(first, list(generate_workload(50, items=("a", "b"), ops_per_transaction=3,
+                                                       write_ratio=0.0, seed=1)))
+        self.assertEqual(len(first), 50)
+        self.assertTrue(all(len(operations) == 3 for operations in first))
+        self.assertEqual({op for operations in first for op, _ in operations}, {'R'})
+        self.assertEqual({item for operations in first for _, item in operations}, {"a", "b"})
+
+
+class SimulatorTest(unittest.TestCase):
+    def test_operations_take_virtual_time(self):
+        simulator = _simulator("wait-die", op_latency=constant(0.1), arrival=constant(1.0))
+        result = simulator.run([[('R', "x"), ('W', "y")]] * 3)
+        # Three arrivals a second apart, each two 0.1 s operations long
+        self.assertEqual((result.committed, result.aborts, result.unfinished), (3, 0, 0))
+        self.assertAlmostEqual(result.elapsed, 2.2)
+        self.assertAlmostEqual(result.latency.mean() / 1e9, 0.2, places=3)
+        self.assertEqual(simulator.lock_manager.table_snapshot()["transactions"], 0)
+
+    def test_conflicts_follow_the_protocol(self):
+        # Both arrive at once and write x: the younger dies and restarts under
+        # Wait-Die, and waits for the lock under Wound-Wait
+        workload = [[('W', "x")], [('W', "x")]]
+        wait_die = _simulator("wait-die", op_latency=constant(0.1), restart_delay=constant(0.5)).run(workload)
+        self.assertEqual((wait_die.committed, wait_die.aborts), (2, 1))
+        self.assertAlmostEqual(wait_die.elapsed, 0.6)
+
+        wound_wait = _simulator("wound-wait", op_latency=constant(0.1)).run(workload)
+        self.assertEqual((wound_wait.committed, wound_wait.aborts), (2, 0))
+        self.assertAlmostEqual(wound_wait.elapsed, 0.2)
+
+    def test_until_stops_the_clock(self):
+        simulator = _simulator("wound-wait", op_latency=constant(1.0), arrival=constant(1.0))
+        result = simulator.run([[('W', "x")]] * 10, until=4.5)
+        self.assertEqual(result.committed, 4)
+        self.assertEqual(result.unfinished, 1)
+        self.assertLessEqual(result.elapsed, 4.5)
+
+    def test_poisson_arrivals_keep_contention_low(self):
+        items = [f"k{n}" for n in range(100)]
+        for protocol in ("wait-die", "wound-wait"):
+            simulator = _simulator(protocol, op_latency=exponential(0.1), arrival=exponential(0.05), seed=1)
+            result = simulator.run(generate_workload(2000, items=items, seed=1))
+            self.assertEqual((result.committed, result.unfinished), (2000, 0))
+            self.assertLess(result.aborts, 200)
+            self.assertEqual(result.metrics.snapshot()["commits"], 2000)
+
+
+if __name__ == "__main__":
+    unittest.main()
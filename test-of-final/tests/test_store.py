@@ -0,0 +1,30 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from store import LAYOUTS, create_store  # noqa: E402
+
+
+class StoreTest(unittest.TestCase):
+    def test_layouts_agree(self):
+        for layout in LAYOUTS:
+            store = create_store(layout, default=-1)
+            store.put("x", 1)
+            store.put_many(["y", "z"], [2, 3])
+            self.assertEqual(store.get("y"), 2)
+            self.assertEqual(store.get_many(["z", "x", "w"]), [3, 1, -1])
+            self.assertEqual(len(store), 3)
+
+    def test_reads_do_not_intern(self):
+        store = create_store("array", capacity=2)
+        store.put("x", 7)
+        self.assertEqual(store.get_many(["x", "cold-1", "cold-2", "cold-3"]), [7, 0, 0, 0])
+        self.assertEqual(store.get_many(["x"]), [7])
+        self.assertEqual(len(store), 1)
+        self.assertEqual(len(store.values), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
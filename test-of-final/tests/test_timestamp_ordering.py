@@ -0,0 +1,100 @@
+import unittest
+from unittest import mock
+
+from support import engine  # First: it also puts the modules under test on sys.path
+
+from replay import ScheduleRecorder
+from timestamp_ordering import TimestampOrderingEngine
+
+
+class TimestampOrderingTest(unittest.TestCase):
+    def manager(self, thomas_write_rule=False, start_times=(1, 2, 3)):
+        self.recorder = ScheduleRecorder()
+        manager = TimestampOrderingEngine(thomas_write_rule=thomas_write_rule, recorder=self.recorder,
+                                          store=engine.create_store())
+        self.t = {tid: engine.Transaction(tid, start_time) for tid, start_time in enumerate(start_times, 1)}
+        for trans in self.t.values():
+            manager.add_transaction(trans)
+        return manager
+
+    def aborts(self):
+        return [(event[1], event[4]) for event in self.recorder.events if event[0] == "aborted"]
+
+    def test_late_read_is_rejected(self):
+        manager = self.manager()
+        manager.request_lock(self.t[2], "x", 'W')
+        manager.request_lock(self.t[1], "x", 'R')
+        manager.request_lock(self.t[3], "x", 'R')
+        self.assertEqual(self.aborts(), [(1, "late-read")])
+        self.assertEqual((manager.read_ts, manager.write_ts), ({"x": 3}, {"x": 2}))
+
+    def test_write_after_a_younger_read_is_rejected(self):
+        for thomas_write_rule in (False, True):
+            manager = self.manager(thomas_write_rule)
+            manager.request_lock(self.t[2], "x", 'R')
+            manager.request_lock(self.t[1], "x", 'W')
+            self.assertEqual(self.aborts(), [(1, "late-write")])
+            self.assertNotIn("x", manager.write_ts)
+
+    def test_write_after_a_younger_write(self):
+        manager = self.manager()
+        manager.request_lock(self.t[2], "x", 'W')
+        manager.request_lock(self.t[1], "x", 'W')
+        self.assertEqual(self.aborts(), [(1, "late-write")])
+
+        # The Thomas write rule drops the obsolete write instead
+        manager = self.manager(thomas_write_rule=True)
+        manager.request_lock(self.t[2], "x", 'W')
+        manager.request_lock(self.t[1], "x", 'W')
+        self.assertEqual((self.aborts(), manager.skipped_writes), ([], 1))
+        self.assertEqual((manager.write_ts, manager.store.get("x")), ({"x": 2}, 2))
+        self.assertTrue(manager.commit_transaction(self.t[1]))
+
+    def test_rejected_attempt_ignores_the_rest_and_restarts_later(self):
+        manager = self.manager()
+        manager.request_lock(self.t[2], "x", 'R')
+        manager.request_lock(self.t[1], "x", 'W')
+        manager.request_lock(self.t[1], "y", 'W')  # Ignored: the attempt is already rejected
+        self.assertNotIn("y", manager.write_ts)
+        self.assertFalse(manager.commit_transaction(self.t[1]))
+        self.assertEqual(self.t[1].start_time, 4)
+        manager.request_lock(self.t[1], "x", 'W')
+        self.assertTrue(manager.commit_transaction(self.t[1]))
+        self.assertEqual(manager.write_ts, {"x": 4})
+
+    def test_abort_undoes_the_attempts_writes(self):
+        manager = self.manager(start_times=(1, 2, 3))
+        manager.request_lock(self.t[1], "x", 'W')
+        self.assertTrue(manager.commit_transaction(self.t[1]))
+        manager.request_lock(self.t[3], "z", 'R')
+        # T2 writes x and y, then is rejected on z: both writes are undone
+        manager.request_lock(self.t[2], "x", 'W')
+        manager.request_lock(self.t[2], "y", 'W')
+        manager.request_lock(self.t[2], "x", 'W')
+        manager.request_lock(self.t[2], "z", 'W')
+        self.assertEqual(self.aborts(), [(2, "late-write")])
+        self.assertEqual(manager.write_ts, {"x": 1})
+        self.assertEqual(manager.store.get_many(["x", "y"]), [1, 0])
+
+        # A write overwritten by a younger transaction since is left alone
+        manager = self.manager(start_times=(1, 2, 3))
+        manager.request_lock(self.t[1], "x", 'W')
+        manager.request_lock(self.t[3], "x", 'W')
+        manager.request_lock(self.t[2], "y", 'R')
+        manager.request_lock(self.t[1], "y", 'W')
+        self.assertEqual(self.aborts(), [(1, "late-write")])
+        self.assertEqual((manager.write_ts, manager.store.get("x")), ({"x": 3}, 3))
+
+    def test_workflow_commits_every_transaction(self):
+        for thomas_write_rule in (False, True):
+            manager = self.manager(thomas_write_rule, start_times=range(1, 9))
+            with mock.patch.object(engine.time, "sleep"):
+                engine.execute_headless(manager, [(trans, [('R', "x"), ('W', "x"), ('W', "y")])
+                                                  for trans in self.t.values()])
+            commits = [event[1] for event in self.recorder.events if event[0] == "commit"]
+            self.assertEqual(sorted(commits), list(range(1, 9)))
+            self.assertEqual(manager.undo, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
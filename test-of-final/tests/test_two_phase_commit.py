@@ -0,0 +1,92 @@
+import functools
+import os
+import tempfile
+import unittest
+
+from support import engine  # First: it also puts the modules under test on sys.path
+
+from lock_server import GRANTED, LocalCluster
+from replay import NullQueue
+from simulation import generate_workload
+from two_phase_commit import CoordinatorLog, LocalParticipant, RemoteParticipant, TwoPhaseCommitCoordinator
+
+
+class TwoPhaseCommitTest(unittest.TestCase):
+    def cluster(self, protocol, nodes=3):
+        make_lock_manager = functools.partial(engine.LockManager, protocol, messages=NullQueue(), re_execute=False)
+        cluster = LocalCluster(nodes, make_lock_manager, engine.Transaction).__enter__()
+        self.addCleanup(cluster.__exit__, None, None, None)
+        return cluster
+
+    def participants(self, cluster, remote):
+        if not remote:
+            return [LocalParticipant(server.service) for server in cluster.servers]
+        participants = [RemoteParticipant(host, port) for host, port in cluster.addresses]
+        for participant in participants:
+            self.addCleanup(participant.close)
+        return participants
+
+    def coordinator(self, participants, **options):
+        coordinator = TwoPhaseCommitCoordinator(participants, **options)
+        self.addCleanup(coordinator.close)
+        return coordinator
+
+    def assert_idle(self, cluster):
+        for server in cluster.servers:
+            snapshot = server.service.lock_manager.table_snapshot()
+            self.assertEqual((snapshot["holders"], snapshot["transactions"]), ({}, 0))
+            self.assertEqual(server.service.in_doubt(), set())
+
+    def test_contended_batch_commits_without_retries(self):
+        items = [f"k{n}" for n in range(20)]
+        for protocol in ("wait-die", "wound-wait"):
+            cluster = self.cluster(protocol)
+            for first, remote in ((1, False), (1001, True)):
+                coordinator = self.coordinator(self.participants(cluster, remote))
+                workload = generate_workload(300, items=items, ops_per_transaction=3, seed=1)
+                result = coordinator.run([(tid, tid, operations) for tid, operations in enumerate(workload, first)])
+
+                self.assertEqual((sorted(result.committed), result.failed, result.retries),
+                                 (list(range(first, first + 300)), [], 0))
+                self.assert_idle(cluster)
+
+    def test_outside_holder_aborts_after_max_attempts(self):
+        cluster = self.cluster("wait-die", nodes=1)
+        service = cluster.servers[0].service
+        holder = service.transaction(1, 1)
+        service.lock_manager.request_lock(holder, "x", 'W')
+
+        coordinator = self.coordinator(self.participants(cluster, False), max_attempts=3, backoff=0)
+        result = coordinator.run([(5, 5, [('W', "y"), ('R', "x")]), (6, 6, [('W', "z")])])
+        self.assertEqual((result.committed, result.failed, result.retries), ([6], [5], 2))
+        self.assertEqual(service.lock_manager.table_snapshot()["holders"], {"x": [1]})
+        self.assertEqual(coordinator.log.in_doubt(), set())
+
+    def test_recover_commits_logged_and_rolls_back_orphans(self):
+        for remote in (False, True):
+            cluster = self.cluster("wound-wait", nodes=2)
+            services = [server.service for server in cluster.servers]
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, "coordinator.log")
+                # A coordinator that crashed after forcing T7's commit but
+                # before telling anyone, with T8 prepared and undecided
+                log = CoordinatorLog(path)
+                log.log_commit([7])
+                log.close()
+                for service in services:
+                    for tid in (7, 8):
+                        self.assertEqual(service.prepare(service.transaction(tid, tid), [(f"k{tid}", 'W')]), GRANTED)
+                    self.assertEqual(service.in_doubt(), {7, 8})
+
+                log = CoordinatorLog(path)
+                self.assertEqual(log.in_doubt(), {7})
+                self.coordinator(self.participants(cluster, remote), log=log).recover()
+                log.close()
+                log = CoordinatorLog(path)
+                self.assertEqual((log.committed, log.in_doubt()), ({7}, set()))
+                log.close()
+            self.assert_idle(cluster)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import random
+import unittest
+
+from support import engine  # First: it also puts the modules under test on sys.path
+
+from simulation import generate_workload
+from waves import describe_waves, plan_waves, read_write_sets
+
+
+def _conflict(first, second):
+    first_reads, first_writes = read_write_sets(first)
+    second_reads, second_writes = read_write_sets(second)
+    return bool(first_writes & (second_reads | second_writes) or second_writes & first_reads)
+
+
+class PlanWavesTest(unittest.TestCase):
+    def test_waves_are_conflict_free_and_complete(self):
+        rng = random.Random(4)
+        for seed in range(20):
+            items = [f"k{n}" for n in range(rng.randint(1, 12))]
+            workload = generate_workload(60, items=items, ops_per_transaction=rng.randint(1, 4), seed=seed)
+            start_times = rng.sample(range(1000), 60)
+            transactions = [(engine.Transaction(tid, start_time), operations)
+                            for tid, (start_time, operations) in enumerate(zip(start_times, workload), 1)]
+            waves = plan_waves(transactions)
+
+            scheduled = [trans.tid for wave in waves for trans, _ in wave]
+            self.assertEqual(sorted(scheduled), list(range(1, 61)))
+            self.assertTrue(all(waves))
+            wave_of = {trans.tid: index for index, wave in enumerate(waves) for trans, _ in wave}
+            for wave in waves:
+                for n, (_, first) in enumerate(wave):
+                    for _, second in wave[n + 1:]:
+                        self.assertFalse(_conflict(first, second))
+            # Conflicting pairs keep their start_time order
+            for older, older_ops in transactions:
+                for younger, younger_ops in transactions:
+                    if older.start_time < younger.start_time and _conflict(older_ops, younger_ops):
+                        self.assertLess(wave_of[older.tid], wave_of[younger.tid])
+
+    def test_readers_share_a_wave(self):
+        transactions = [(engine.Transaction(tid, tid), operations) for tid, operations in enumerate(
+            [[('R', "x")], [('R', "x"), ('R', "y")], [('W', "x")], [('R', "x")], [('W', "y"), ('R', "y")]], 1)]
+        waves = plan_waves(transactions)
+        self.assertEqual([[trans.tid for trans, _ in wave] for wave in waves], [[1, 2], [3, 5], [4]])
+        self.assertEqual(describe_waves(waves), "5 transactions in 3 waves (widest 2)")
+        self.assertEqual(describe_waves([]), "0 transactions in 0 waves (widest 0)")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+from unittest import mock
+
+from support import engine  # First: it also puts the modules under test on sys.path
+
+
+class _Messages:
+    def __init__(self):
+        self.lines = []
+
+    def put(self, message):
+        self.lines.append(message)
+
+
+class WorkflowMessagesTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(engine.time, "sleep")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_workflow(self, workflow, operations, **options):
+        messages = _Messages()
+        lock_manager = engine.create_lock_manager("wait-die", messages=messages, re_execute=False, **options)
+        trans = engine.Transaction(1, 1)
+        lock_manager.add_transaction(trans)
+        workflow(trans, operations, lock_manager)
+        return messages.lines
+
+    def test_workflows_post_to_the_managers_queue(self):
+        cases = [
+            (engine.transaction_workflow, [('R', "x"), ('W', "y")], "writes to y"),
+            (engine.transaction_workflow, [('R', "x")], "(snapshot)"),
+            (engine.conservative_workflow, [('R', "x"), ('W', "y")], "writes to y"),
+        ]
+        for workflow, operations, expected in cases:
+            lines = self.run_workflow(workflow, operations)
+            self.assertTrue(any(expected in line for line in lines), lines)
+        lines = self.run_workflow(engine.transaction_workflow, [('R', "x")], store=engine.create_store())
+        self.assertIn("Transaction 1 reads x = 0 (snapshot)", lines)
+        self.assertTrue(engine.message_queue.empty())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,88 +1,341 @@
 import tkinter as tk
-from tkinter import messagebox, ttk
+from tkinter import filedialog, messagebox, ttk
+import argparse
+import functools
+import random
 import threading
 import time
-from collections import defaultdict
+from collections import OrderedDict, deque
+from contextlib import contextmanager
 from queue import Queue, Empty
 
+from admission import AdmissionController
+from analysis import analyze_conflicts
+from clock import HybridLogicalClock
+from diagnostics import default_dump_path, describe_state, dump_state, load_state, restore_state
+from exporter import MetricsExporter
+from ingest import FORMATS, read_transactions, run_stream
+from metrics import LockMetrics
+from occ import OptimisticEngine
+from replay import DeterministicScheduler, NullQueue, ScheduleRecorder
+from lock_server import LocalCluster, LockServer
+from serializability import SerializabilityChecker, check_history
+from sharding import ShardedEngine
+from simulation import Simulator, constant, exponential, generate_workload
+from store import LAYOUTS, create_store
+from timeline import TimelinePanel, TimelineRecorder
+from timestamp_ordering import TimestampOrderingEngine
+from two_phase_commit import CoordinatorLog, RemoteParticipant, TwoPhaseCommitCoordinator
+from tracing import TraceRecorder, default_trace_path
+from waves import describe_waves, plan_waves
+
 # Create a queue for message handling
 message_queue = Queue()
 
 # Transaction class
 class Transaction:
-    def __init__(self, tid, start_time):
+    def __init__(self, tid, start_time, read_only=False):
         self.tid = tid
         self.start_time = start_time
+        self.read_only = read_only
         self.locks_held = set()
         self.aborted_operations = []
+        self.aborts = 0
 
 # LockManager class
 class LockManager:
-    def __init__(self, protocol):
-        self.locks = defaultdict(list)
-        self.wait_queue = defaultdict(Queue)
-        self.lock_table = defaultdict(lambda: None)
+    def __init__(self, protocol, metrics=None, recorder=None, messages=message_queue, re_execute=True,
+                 pool_size=1024, aging_step=0, writer_preference=False, store=None, version_limit=4096):
+        # locks/lock_table only hold items that are locked right now; entries
+        # go as soon as the last holder releases, so memory tracks live locks
+        self.locks = {}
+        self.wait_queue = {}  # item -> deque of (trans, lock_type, waited_since); only while someone waits
+        self.lock_table = {}
         self.transactions = {}
         self.protocol = protocol
+        self.metrics = metrics  # Optional LockMetrics, None disables instrumentation
+        self.lock = threading.RLock()  # Reentrant: aborts and promotions re-enter the manager
+        self._depth = threading.local()  # Nesting of manager calls on the current thread
+        self.recorder = recorder  # Optional ScheduleRecorder for replay
+        self.messages = messages
+        self.re_execute = re_execute
+        self.free_holder_lists = []  # Recycled holder lists, up to pool_size
+        self.pool_size = pool_size
+        self.store = store  # Optional store.DictStore/ArrayStore; a write stores the writer's tid
+        # Without a store, snapshots read versions instead: item -> sequence
+        # number of its last write (a write takes effect at its grant). Only
+        # the version_limit most recently written items are kept; any other
+        # item reads as version_floor, the newest version dropped so far,
+        # which is never older than its own.
+        self.versions = OrderedDict() if store is None else None
+        self.version_limit = version_limit
+        self.version_floor = 0
+        self.write_sequence = 0
+        # Starvation controls: every abort makes a transaction count as
+        # aging_step older, and with writer_preference a queued W stops
+        # younger readers from sharing past it
+        self.aging_step = aging_step
+        self.writer_preference = writer_preference
+
+    @contextmanager
+    def _call(self):
+        # Enter the manager; yields True for the outermost call on this
+        # thread. Aborts and promotions re-enter request_lock/release_lock
+        # from inside, and only outermost calls are schedule steps.
+        depth = getattr(self._depth, "value", 0)
+        with self.lock:
+            self._depth.value = depth + 1
+            try:
+                yield depth == 0
+            finally:
+                self._depth.value = depth
 
     def add_transaction(self, trans):
-        self.transactions[trans.tid] = trans
+        with self.lock:
+            self.transactions[trans.tid] = trans
+            if self.recorder is not None:
+                self.recorder.record("add", trans.tid, detail=trans.start_time)
 
-    def request_lock(self, trans, item, lock_type):
-        current_lock = self.lock_table[item]
+    def remove_transaction(self, trans):
+        with self.lock:
+            self.transactions.pop(trans.tid, None)
 
-        if current_lock is None:
-            self.grant_lock(trans, item, lock_type)
-        elif current_lock == 'R' and lock_type == 'R':
-            self.grant_lock(trans, item, lock_type)
-        else:
-            if self.protocol == "wait-die":
-                if self.handle_wait_die(trans, item):
-                    message_queue.put(f"Transaction {trans.tid} waits for {lock_type} lock on {item}")
-                    self.wait_queue[item].put((trans, lock_type))
-                else:
-                    message_queue.put(f"Transaction {trans.tid} aborted (Wait-Die rule)")
-                    self.abort_transaction(trans)
-            elif self.protocol == "wound-wait":
-                if self.handle_wound_wait(trans, item, lock_type):
+    def request_lock(self, trans, item, lock_type):
+        # Only calls made from outside the manager are schedule steps
+        with self._call() as outermost:
+            top_level = outermost and self.recorder is not None
+            if top_level:
+                self.recorder.record("request", trans.tid, item, lock_type)
+            current_lock = self.lock_table.get(item)
+
+            if current_lock is None:
+                self.grant_lock(trans, item, lock_type)
+            elif current_lock == 'R' and lock_type == 'R':
+                writer = self.writer_ahead(trans, item)
+                if writer is None:
                     self.grant_lock(trans, item, lock_type)
+                elif self.protocol == "wound-wait":
+                    # Younger than the writer ahead of it: queue behind it
+                    self.messages.put(f"Transaction {trans.tid} waits behind writer {writer.tid} on {item}")
+                    self.enqueue_waiter(trans, item, lock_type)
                 else:
-                    message_queue.put(f"Transaction {trans.tid} waits for {lock_type} lock on {item}")
-                    self.wait_queue[item].put((trans, lock_type))
+                    self.messages.put(f"Transaction {trans.tid} aborted (Wait-Die rule, writer {writer.tid} queued)")
+                    self.abort_transaction(trans, cause="wait-die")
+            else:
+                if self.protocol == "wait-die":
+                    if self.handle_wait_die(trans, item):
+                        self.messages.put(f"Transaction {trans.tid} waits for {lock_type} lock on {item}")
+                        self.enqueue_waiter(trans, item, lock_type)
+                    else:
+                        self.messages.put(f"Transaction {trans.tid} aborted (Wait-Die rule)")
+                        self.abort_transaction(trans, cause="wait-die")
+                elif self.protocol == "wound-wait":
+                    if self.handle_wound_wait(trans, item, lock_type):
+                        self.grant_lock(trans, item, lock_type)
+                    else:
+                        self.messages.put(f"Transaction {trans.tid} waits for {lock_type} lock on {item}")
+                        self.enqueue_waiter(trans, item, lock_type)
+
+    def request_locks(self, trans, requests, conservative=False):
+        # Take a whole lock set in one critical section, in item order so
+        # concurrent batches can't deadlock. A write subsumes a read of the
+        # same item. Normally each item follows the protocol like
+        # request_lock and the batch stops at the first item the transaction
+        # has to wait for (call again once it is granted) or that aborts it.
+        # With conservative=True (conservative 2PL) it is all or nothing:
+        # unless request_lock would grant every item right now (free, or
+        # shareable and not behind a preferred writer), nothing is taken,
+        # nobody waits or aborts, and the caller retries later.
+        wanted = {}
+        for item, lock_type in requests:
+            if wanted.get(item) != 'W':
+                wanted[item] = lock_type
+        with self._call() as outermost:
+            top_level = outermost and self.recorder is not None
+            batch = [(item, wanted[item]) for item in sorted(wanted) if item not in trans.locks_held]
+            if conservative and not all(self.grantable(trans, item, lock_type) for item, lock_type in batch):
+                return False
+            aborts = trans.aborts
+            for item, lock_type in batch:
+                if top_level:
+                    self.recorder.record("request", trans.tid, item, lock_type)
+                self.request_lock(trans, item, lock_type)
+                if trans.aborts != aborts or item not in trans.locks_held:
+                    return False
+            return True
+
+    def release_locks(self, trans):
+        with self._call() as outermost:
+            top_level = outermost and self.recorder is not None
+            for item in sorted(trans.locks_held):
+                if top_level:
+                    self.recorder.record("release", trans.tid, item)
+                self.release_lock(trans, item)
+
+    def read_snapshot(self, trans, items):
+        # Read-only fast path: the values (or, without a store, versions) of
+        # items as of one instant, taken without touching the lock table, so
+        # the reader never waits, never aborts and never blocks a writer
+        with self._call() as outermost:
+            if outermost and self.recorder is not None:
+                self.recorder.record("snapshot", trans.tid, detail=tuple(items))
+            if self.store is not None:
+                snapshot = dict(zip(items, self.store.get_many(items)))
+            else:
+                snapshot = {item: self.versions.get(item, self.version_floor) for item in items}
+            if self.recorder is not None:
+                for item in snapshot:
+                    self.recorder.record("granted", trans.tid, item, 'R')
+                self.recorder.record("commit", trans.tid)
+        return snapshot
+
+    def enqueue_waiter(self, trans, item, lock_type):
+        # Called under self.lock, which is the latch for every wait queue
+        waiters = self.wait_queue.get(item)
+        if waiters is None:
+            waiters = self.wait_queue[item] = deque()
+        waiters.append((trans, lock_type, time.time()))
+        if self.recorder is not None:
+            self.recorder.record("waiting", trans.tid, item, lock_type)
+        if self.metrics is not None:
+            self.metrics.wait_started(trans, item, len(waiters))
+
+    def cancel_wait(self, trans, item):
+        with self.lock:
+            waiters = self.wait_queue.get(item)
+            if waiters is None:
+                return
+            kept = deque(entry for entry in waiters if entry[0] is not trans)
+            if kept:
+                self.wait_queue[item] = kept
+            else:
+                del self.wait_queue[item]
+            if self.metrics is not None:
+                self.metrics.wait_cancelled(trans, item)
 
     def grant_lock(self, trans, item, lock_type):
-        self.locks[item].append(trans.tid)
+        holders = self.locks.get(item)
+        if holders is None:
+            holders = self.locks[item] = self.free_holder_lists.pop() if self.free_holder_lists else []
+        holders.append(trans.tid)
         self.lock_table[item] = lock_type
+        if lock_type == 'W':
+            if self.store is not None:
+                self.store.put(item, trans.tid)
+            else:
+                self.bump_version(item)
         trans.locks_held.add(item)
+        if self.metrics is not None:
+            self.metrics.lock_granted(trans, item)
+        if self.recorder is not None:
+            self.recorder.record("granted", trans.tid, item, lock_type)
         lock_type_desc = "shared (read)" if lock_type == 'R' else "exclusive (write)"
-        message_queue.put(f"Transaction {trans.tid} granted {lock_type_desc} lock on {item}")
+        self.messages.put(f"Transaction {trans.tid} granted {lock_type_desc} lock on {item}")
+
+    def bump_version(self, item):
+        self.write_sequence += 1
+        self.versions[item] = self.write_sequence
+        self.versions.move_to_end(item)
+        if len(self.versions) > self.version_limit:
+            self.version_floor = self.versions.popitem(last=False)[1]
 
     def release_lock(self, trans, item):
-        if trans.tid in self.locks[item]:
-            self.locks[item].remove(trans.tid)
-            if not self.locks[item]:
-                self.lock_table[item] = None
-                self.promote_locks(item)
-            trans.locks_held.remove(item)
-            message_queue.put(f"Transaction {trans.tid} released lock on {item}")
+        with self._call() as outermost:
+            top_level = outermost and self.recorder is not None
+            if top_level:
+                self.recorder.record("release", trans.tid, item)
+            holders = self.locks.get(item)
+            if holders is not None and trans.tid in holders:
+                holders.remove(trans.tid)
+                if not holders:
+                    del self.locks[item]
+                    del self.lock_table[item]
+                    if len(self.free_holder_lists) < self.pool_size:
+                        self.free_holder_lists.append(holders)
+                    self.promote_locks(item)
+                trans.locks_held.remove(item)
+                if self.metrics is not None:
+                    self.metrics.lock_released(trans, item)
+                self.messages.put(f"Transaction {trans.tid} released lock on {item}")
+
+    def commit_transaction(self, trans):
+        # Every lock is already released by now; two-phase locking has
+        # nothing left to validate
+        if self.recorder is not None:
+            self.recorder.record("commit", trans.tid)
+        return True
+
+    def table_snapshot(self):
+        # Copy only; callers format the result after the mutex is released
+        with self.lock:
+            return {
+                "holders": {item: list(tids) for item, tids in self.locks.items()},
+                "modes": dict(self.lock_table),
+                "waiters": {item: len(waiters) for item, waiters in self.wait_queue.items()},
+                "transactions": len(self.transactions),
+            }
+
+    def state_snapshot(self):
+        # Full state for diagnostics. The critical section only copies
+        # references into tuples; serialisation happens after it is released.
+        with self.lock:
+            holders = [(item, tuple(tids), self.lock_table[item]) for item, tids in self.locks.items()]
+            waiters = [(item, tuple(entries)) for item, entries in self.wait_queue.items()]
+            transactions = [(trans, tuple(trans.locks_held)) for trans in self.transactions.values()]
+        return {
+            "version": 1,
+            "taken_at": time.time(),
+            "protocol": self.protocol,
+            "transactions": [[trans.tid, trans.start_time, sorted(held)] for trans, held in transactions],
+            "holders": {item: {"mode": mode, "tids": list(tids)} for item, tids, mode in holders},
+            "waiters": {item: [[trans.tid, lock_type, waited_since] for trans, lock_type, waited_since in entries]
+                        for item, entries in waiters},
+        }
 
     def promote_locks(self, item):
-        if not self.wait_queue[item].empty():
-            next_trans, lock_type = self.wait_queue[item].get()
+        waiters = self.wait_queue.get(item)
+        if waiters:
+            next_trans, lock_type, _ = waiters.popleft()
+            if not waiters:
+                del self.wait_queue[item]
             if self.protocol == "wound-wait":
                 self.request_lock(next_trans, item, lock_type)
             else:
                 self.grant_lock(next_trans, item, lock_type)
 
+    def priority(self, trans):
+        # Smaller is older. Aging lets a transaction that keeps getting
+        # aborted overtake younger ones instead of dying again.
+        return trans.start_time - self.aging_step * trans.aborts
+
+    def oldest_queued_writer(self, item):
+        waiters = self.wait_queue.get(item)
+        if not waiters:
+            return None
+        writers = [trans for trans, lock_type, _ in waiters if lock_type == 'W']
+        return min(writers, key=self.priority) if writers else None
+
+    def writer_ahead(self, trans, item):
+        # With writer_preference, the queued writer a reader may not share past
+        writer = self.oldest_queued_writer(item) if self.writer_preference else None
+        return writer if writer is not None and self.priority(trans) >= self.priority(writer) else None
+
+    def grantable(self, trans, item, lock_type):
+        # Whether request_lock would grant right now, with nobody waiting or aborted
+        current_lock = self.lock_table.get(item)
+        if current_lock is None:
+            return True
+        return current_lock == lock_type == 'R' and self.writer_ahead(trans, item) is None
+
     def handle_wait_die(self, trans, item):
         if self.lock_table[item] == 'W':
             holding_trans_tid = self.locks[item][0]
         else:
-            holding_trans_tid = min(self.locks[item], key=lambda tid: self.transactions[tid].start_time)
+            holding_trans_tid = min(self.locks[item], key=lambda tid: self.priority(self.transactions[tid]))
 
         holding_trans = self.transactions[holding_trans_tid]
 
-        if trans.start_time < holding_trans.start_time:
+        if self.priority(trans) < self.priority(holding_trans):
             return True  # Older transaction waits
         else:
             return False  # Younger transaction dies
@@ -91,15 +344,15 @@ class LockManager:
         if self.lock_table[item] == 'W':
             holding_trans_tid = self.locks[item][0]
         else:
-            holding_trans_tid = min(self.locks[item], key=lambda tid: self.transactions[tid].start_time)
+            holding_trans_tid = min(self.locks[item], key=lambda tid: self.priority(self.transactions[tid]))
 
         holding_trans = self.transactions[holding_trans_tid]
 
-        if trans.start_time < holding_trans.start_time:
+        if self.priority(trans) < self.priority(holding_trans):
             if lock_type == 'W' or self.lock_table[item] == 'W':
                 # Older transaction wounds the younger transaction
-                message_queue.put(f"Transaction {holding_trans.tid} aborted (Wound-Wait rule)")
-                self.abort_transaction(holding_trans)
+                self.messages.put(f"Transaction {holding_trans.tid} aborted (Wound-Wait rule)")
+                self.abort_transaction(holding_trans, cause="wound-wait")
                 return True  # Older transaction gets the lock
             else:
                 # If the older transaction is requesting a read lock, it waits
@@ -107,16 +360,26 @@ class LockManager:
         else:
             return False  # Younger transaction waits
 
-    def abort_transaction(self, trans):
-        aborted_operations = []
-        for item in list(trans.locks_held):
-            self.release_lock(trans, item)
-            # Save the aborted operations for later re-execution
-            aborted_operations.append(('release', item))
-        trans.aborted_operations.extend(aborted_operations)
-        message_queue.put(f"Transaction {trans.tid} aborted (aborted)")
-        message_queue.put(f"Transaction {trans.tid} re-executing aborted operations")
-        self.re_execute_aborted_operations(trans)
+    def abort_transaction(self, trans, cause=None):
+        with self._call() as outermost:
+            top_level = outermost and self.recorder is not None
+            if top_level:
+                self.recorder.record("abort", trans.tid)
+            trans.aborts += 1
+            if self.metrics is not None:
+                self.metrics.transaction_aborted(trans, cause)
+            if self.recorder is not None:
+                self.recorder.record("aborted", trans.tid, detail=cause)
+            aborted_operations = []
+            for item in list(trans.locks_held):
+                self.release_lock(trans, item)
+                # Save the aborted operations for later re-execution
+                aborted_operations.append(('release', item))
+            trans.aborted_operations.extend(aborted_operations)
+            self.messages.put(f"Transaction {trans.tid} aborted (aborted)")
+            if self.re_execute:
+                self.messages.put(f"Transaction {trans.tid} re-executing aborted operations")
+                self.re_execute_aborted_operations(trans)
 
     def re_execute_aborted_operations(self, trans):
         def run_aborted_operations():
@@ -133,38 +396,205 @@ class LockManager:
 def read_item(trans, item, lock_manager):
     lock_manager.request_lock(trans, item, 'R')
     time.sleep(0.1)
-    message_queue.put(f"Transaction {trans.tid} reads {item}")
+    if lock_manager.store is not None:
+        lock_manager.messages.put(f"Transaction {trans.tid} reads {item} = {lock_manager.store.get(item)}")
+    else:
+        lock_manager.messages.put(f"Transaction {trans.tid} reads {item}")
     lock_manager.release_lock(trans, item)
 
 def write_item(trans, item, lock_manager):
     lock_manager.request_lock(trans, item, 'W')
     time.sleep(0.1)
-    message_queue.put(f"Transaction {trans.tid} writes to {item}")
+    lock_manager.messages.put(f"Transaction {trans.tid} writes to {item}")
     lock_manager.release_lock(trans, item)
 
+# Randomised linear backoff between restarts of a refused transaction (s)
+RESTART_BACKOFF = 0.05
+MAX_BACKOFF_STEPS = 10
+
 def transaction_workflow(trans, operations, lock_manager):
+    if (trans.read_only or all(op == 'R' for op, _ in operations)) and hasattr(lock_manager, "read_snapshot"):
+        read_only_workflow(trans, operations, lock_manager)
+        return
+    metrics = lock_manager.metrics
+    try:
+        if metrics is not None:
+            metrics.transaction_started(trans)
+        while True:
+            for op, item in operations:
+                if op == 'R':
+                    read_item(trans, item, lock_manager)
+                elif op == 'W':
+                    write_item(trans, item, lock_manager)
+            if lock_manager.commit_transaction(trans):
+                break
+            # Only the optimistic and timestamp engines refuse a commit. Back
+            # off before running it again so restarts don't keep colliding.
+            time.sleep(random.uniform(0, RESTART_BACKOFF * min(trans.aborts, MAX_BACKOFF_STEPS)))
+        if metrics is not None:
+            metrics.transaction_committed(trans)
+    except Exception as e:
+        lock_manager.messages.put(f"Exception in transaction {trans.tid}: {e}")
+
+# Every concurrency control engine the UI and headless API can choose from
+PROTOCOLS = ("wait-die", "wound-wait", "occ", "to", "to-thomas")
+
+def create_lock_manager(protocol, metrics=None, recorder=None, messages=message_queue, store=None, **options):
+    if protocol == "occ":
+        return OptimisticEngine(metrics=metrics, recorder=recorder, messages=messages, store=store)
+    if protocol in ("to", "to-thomas"):
+        return TimestampOrderingEngine(thomas_write_rule=protocol == "to-thomas", metrics=metrics,
+                                       recorder=recorder, messages=messages, store=store)
+    if protocol not in PROTOCOLS:
+        raise ValueError(f"Unknown protocol: {protocol!r}")
+    return LockManager(protocol, metrics=metrics, recorder=recorder, messages=messages, store=store, **options)
+
+def read_only_workflow(trans, operations, lock_manager):
+    metrics = lock_manager.metrics
     try:
+        if metrics is not None:
+            metrics.transaction_started(trans)
+        snapshot = lock_manager.read_snapshot(trans, [item for _, item in operations])
+        for _, item in operations:
+            time.sleep(0.1)
+            lock_manager.messages.put(f"Transaction {trans.tid} reads {item} = {snapshot[item]} (snapshot)")
+        if metrics is not None:
+            metrics.transaction_committed(trans)
+            metrics.read_only_committed(trans)
+    except Exception as e:
+        lock_manager.messages.put(f"Exception in transaction {trans.tid}: {e}")
+
+# Conservative strict 2PL: take every lock up front with one request_locks
+# call, run the operations, release everything at the end. Nothing waits in
+# a queue or aborts; a transaction that can't get its whole set backs off
+# and tries again.
+def conservative_workflow(trans, operations, lock_manager):
+    metrics = lock_manager.metrics
+    try:
+        if metrics is not None:
+            metrics.transaction_started(trans)
+        attempts = 0
+        while not lock_manager.request_locks(trans, [(item, op) for op, item in operations], conservative=True):
+            attempts += 1
+            time.sleep(random.uniform(0, RESTART_BACKOFF * min(attempts, MAX_BACKOFF_STEPS)))
         for op, item in operations:
-            if op == 'R':
-                read_item(trans, item, lock_manager)
-            elif op == 'W':
-                write_item(trans, item, lock_manager)
+            time.sleep(0.1)
+            lock_manager.messages.put(f"Transaction {trans.tid} {'reads' if op == 'R' else 'writes to'} {item}")
+        lock_manager.release_locks(trans)
+        lock_manager.commit_transaction(trans)
+        if metrics is not None:
+            metrics.transaction_committed(trans)
     except Exception as e:
-        message_queue.put(f"Exception in transaction {trans.tid}: {e}")
+        lock_manager.messages.put(f"Exception in transaction {trans.tid}: {e}")
+
+def admitted_workflow(trans, operations, lock_manager, admission, workflow=transaction_workflow):
+    try:
+        workflow(trans, operations, lock_manager)
+    finally:
+        admission.release(trans.aborts)
+
+# Start one thread per transaction, oldest first. With an AdmissionController
+# a thread only starts once a slot is free, so excess transactions queue here.
+def start_transactions(lock_manager, transactions, admission=None, workflow=transaction_workflow):
+    threads = []
+    if admission is not None:
+        admission.enqueue(len(transactions))
+    for trans, operations in sorted(transactions, key=lambda t: t[0].start_time):
+        if admission is None:
+            t = threading.Thread(target=workflow, args=(trans, operations, lock_manager))
+        else:
+            admission.acquire(enqueued=True)
+            t = threading.Thread(target=admitted_workflow, args=(trans, operations, lock_manager, admission, workflow))
+        threads.append(t)
+        t.start()
+
+    for t in threads:
+        t.join()
+
+# Run the batch wave by wave (see waves.plan_waves): nothing inside a wave
+# conflicts, so pre-declared transactions never wait or abort
+def start_in_waves(lock_manager, transactions, admission=None, workflow=transaction_workflow):
+    waves = plan_waves(transactions)
+    for wave in waves:
+        start_transactions(lock_manager, wave, admission, workflow)
+    return waves
+
+# Run a batch without the UI, e.g. behind a MetricsExporter
+def execute_headless(lock_manager, transactions, admission=None, waves=False, conservative=False):
+    workflow = conservative_workflow if conservative else transaction_workflow
+    for trans, _ in transactions:
+        lock_manager.add_transaction(trans)
+    if waves:
+        return start_in_waves(lock_manager, transactions, admission, workflow)
+    start_transactions(lock_manager, transactions, admission, workflow)
+
+# Forget a finished transaction. read_item never blocks, so it can still be
+# queued for an item, or have been promoted to a lock after it moved on;
+# hand all of that back first or the next request trips over a stale holder.
+def finish_transaction(lock_manager, trans, operations):
+    if hasattr(lock_manager, "cancel_wait"):
+        with lock_manager.lock:
+            for item in {item for _, item in operations}:
+                lock_manager.cancel_wait(trans, item)
+            lock_manager.release_locks(trans)
+    lock_manager.remove_transaction(trans)
+
+# Run a stream of (tid, operations) records, e.g. from ingest.read_transactions,
+# on a bounded worker pool. Each transaction is stamped when a worker picks it
+# up and forgotten once done, so a long trace never piles up in the engine.
+def stream_headless(lock_manager, records, workers=16, backlog=64, workflow=transaction_workflow, clock=None):
+    clock = clock or HybridLogicalClock()
+
+    def execute(tid, operations):
+        trans = Transaction(tid, clock.now())
+        lock_manager.add_transaction(trans)
+        try:
+            workflow(trans, operations, lock_manager)
+        finally:
+            finish_transaction(lock_manager, trans, operations)
+
+    return run_stream(records, execute, workers=workers, backlog=backlog)
+
+# Dashboard refresh settings
+METRICS_REFRESH_MS = 1000
+METRICS_HISTORY = 60
+METRICS_TOP_N = 3
+SPARKLINE_WIDTH = 340
+SPARKLINE_HEIGHT = 50
+TIMELINE_REFRESH_MS = 200
+
+# Under Starvation Prevention each abort ages a transaction by 100 ms of
+# HybridLogicalClock start time
+STARVATION_AGING_STEP = 100 << 20
 
 class App:
-    def __init__(self, root):
+    def __init__(self, root, store_layout="dict", node_id=0):
         self.root = root
         self.root.title("Concurrency Control Protocols")
+        self.store = create_store(store_layout)  # Item values, shared by every batch and protocol
         
         self.protocol_var = tk.StringVar(value="wait-die")
         self.lock_manager = None
         self.transactions = []
         self.next_tid = 1
         self.current_operations = []
+        self.clock = HybridLogicalClock(node_id)  # Start times stay ordered across batches and runs
+        self.metrics = LockMetrics()
+        self.last_metrics_snapshot = None
+        self.wait_history = deque(maxlen=METRICS_HISTORY)
+        self.record_var = tk.BooleanVar(value=False)
+        self.last_recording = None
+        self.admission = AdmissionController()  # Kept across batches so the learned limit carries over
+        self.admission_var = tk.BooleanVar(value=False)
+        self.waves_var = tk.BooleanVar(value=False)
+        self.conservative_var = tk.BooleanVar(value=False)
+        self.starvation_var = tk.BooleanVar(value=False)
+        self.trace_var = tk.BooleanVar(value=False)
 
         self.create_widgets()
         self.update_message_display()
+        self.update_metrics_display()
+        self.update_timeline()
 
     def create_widgets(self):
         main_frame = tk.Frame(self.root)
@@ -179,9 +609,41 @@ class App:
         self.operations_display = tk.Text(left_frame, height=25, width=50)
         self.operations_display.grid(row=1, column=0, padx=5, pady=5)
 
+        metrics_frame = tk.LabelFrame(left_frame, text="Live Metrics")
+        metrics_frame.grid(row=2, column=0, padx=5, pady=5, sticky=tk.EW)
+
+        self.tps_label = tk.Label(metrics_frame, text="TPS: 0.0")
+        self.tps_label.grid(row=0, column=0, sticky=tk.W)
+
+        self.abort_rate_label = tk.Label(metrics_frame, text="Abort rate: 0.0%")
+        self.abort_rate_label.grid(row=0, column=1, sticky=tk.W)
+
+        self.active_label = tk.Label(metrics_frame, text="Active: 0  Waiting: 0  Read-only: 0")
+        self.active_label.grid(row=1, column=0, sticky=tk.W)
+
+        self.admission_label = tk.Label(metrics_frame, text="MPL limit: -")
+        self.admission_label.grid(row=1, column=1, sticky=tk.W)
+
+        self.hot_items_label = tk.Label(metrics_frame, text="Hottest items: -", justify=tk.LEFT)
+        self.hot_items_label.grid(row=2, column=0, columnspan=2, sticky=tk.W)
+
+        self.starvation_label = tk.Label(metrics_frame, text="Longest waits: -", justify=tk.LEFT)
+        self.starvation_label.grid(row=5, column=0, columnspan=2, sticky=tk.W)
+
+        wait_label = tk.Label(metrics_frame, text="Mean wait per interval (ms):")
+        wait_label.grid(row=3, column=0, columnspan=2, sticky=tk.W)
+
+        self.wait_sparkline = tk.Canvas(metrics_frame, width=SPARKLINE_WIDTH, height=SPARKLINE_HEIGHT, bg="white")
+        self.wait_sparkline.grid(row=4, column=0, columnspan=2, pady=5)
+
         right_frame = tk.Frame(main_frame)
         right_frame.grid(row=0, column=1, padx=10, pady=10)
 
+        timeline_frame = tk.LabelFrame(main_frame, text="Timeline")
+        timeline_frame.grid(row=1, column=0, columnspan=2, padx=10, sticky=tk.EW)
+        self.timeline = TimelinePanel(timeline_frame, width=1200, height=200)
+        self.timeline.grid(row=0, column=0, padx=5, pady=5)
+
         protocol_label = tk.Label(right_frame, text="Select Protocol:")
         protocol_label.grid(row=0, column=0, sticky=tk.W)
 
@@ -191,6 +653,15 @@ class App:
         self.wound_wait_radio = tk.Radiobutton(right_frame, text="Wound-Wait", variable=self.protocol_var, value="wound-wait", command=self.update_protocol)
         self.wound_wait_radio.grid(row=0, column=2, sticky=tk.W)
 
+        self.occ_radio = tk.Radiobutton(right_frame, text="Optimistic (OCC)", variable=self.protocol_var, value="occ", command=self.update_protocol)
+        self.occ_radio.grid(row=0, column=3, sticky=tk.W)
+
+        self.to_radio = tk.Radiobutton(right_frame, text="Timestamp Ordering", variable=self.protocol_var, value="to", command=self.update_protocol)
+        self.to_radio.grid(row=0, column=4, sticky=tk.W)
+
+        self.to_thomas_radio = tk.Radiobutton(right_frame, text="TO + Thomas Write Rule", variable=self.protocol_var, value="to-thomas", command=self.update_protocol)
+        self.to_thomas_radio.grid(row=0, column=5, sticky=tk.W)
+
         self.add_trans_button = tk.Button(right_frame, text="Add Transaction", command=self.add_transaction)
         self.add_trans_button.grid(row=1, column=0, pady=5)
 
@@ -206,6 +677,12 @@ class App:
         self.clear_operations_button = tk.Button(right_frame, text="Clear Operations", command=self.clear_operations)
         self.clear_operations_button.grid(row=1, column=4, pady=5)
 
+        self.predict_button = tk.Button(right_frame, text="Predict Contention", command=self.predict_contention)
+        self.predict_button.grid(row=1, column=5, pady=5)
+
+        self.load_button = tk.Button(right_frame, text="Load Transactions", command=self.load_transactions)
+        self.load_button.grid(row=1, column=6, pady=5)
+
         self.transaction_frame = tk.Frame(right_frame)
         self.transaction_frame.grid(row=2, column=0, columnspan=5, pady=10)
 
@@ -231,6 +708,33 @@ class App:
         self.add_operation_button = tk.Button(self.transaction_frame, text="Add Operation", command=self.add_operation)
         self.add_operation_button.grid(row=0, column=6)
 
+        self.replay_frame = tk.Frame(right_frame)
+        self.replay_frame.grid(row=3, column=0, columnspan=5)
+
+        self.record_check = tk.Checkbutton(self.replay_frame, text="Record Schedule", variable=self.record_var)
+        self.record_check.grid(row=0, column=0, padx=5)
+
+        self.replay_button = tk.Button(self.replay_frame, text="Replay Last Schedule", command=self.replay_last_schedule)
+        self.replay_button.grid(row=0, column=1, padx=5)
+
+        self.dump_state_button = tk.Button(self.replay_frame, text="Dump Lock State", command=self.dump_lock_state)
+        self.dump_state_button.grid(row=0, column=2, padx=5)
+
+        self.admission_check = tk.Checkbutton(self.replay_frame, text="Admission Control", variable=self.admission_var)
+        self.admission_check.grid(row=0, column=3, padx=5)
+
+        self.waves_check = tk.Checkbutton(self.replay_frame, text="Conflict-Aware Waves", variable=self.waves_var)
+        self.waves_check.grid(row=0, column=4, padx=5)
+
+        self.conservative_check = tk.Checkbutton(self.replay_frame, text="Conservative 2PL", variable=self.conservative_var)
+        self.conservative_check.grid(row=0, column=5, padx=5)
+
+        self.starvation_check = tk.Checkbutton(self.replay_frame, text="Starvation Prevention", variable=self.starvation_var, command=self.update_protocol)
+        self.starvation_check.grid(row=0, column=6, padx=5)
+
+        self.trace_check = tk.Checkbutton(self.replay_frame, text="Export Trace", variable=self.trace_var)
+        self.trace_check.grid(row=0, column=7, padx=5)
+
         self.scaling_display = tk.Text(right_frame, height=10, width=80)
         self.scaling_display.grid(row=4, column=0, columnspan=5, pady=10)
 
@@ -246,8 +750,20 @@ class App:
         self.log_disk_display = tk.Text(right_frame, height=10, width=80, state=tk.DISABLED)
         self.log_disk_display.grid(row=8, column=0, columnspan=5, pady=10)
 
+    def new_lock_manager(self):
+        self.metrics.forget_pending()
+        recorder = ScheduleRecorder() if self.record_var.get() else None
+        options = self.lock_options() if self.protocol_var.get() in ("wait-die", "wound-wait") else {}
+        return create_lock_manager(self.protocol_var.get(), metrics=self.metrics, recorder=recorder,
+                                   store=self.store, **options)
+
+    def lock_options(self):
+        if not self.starvation_var.get():
+            return {}
+        return {"aging_step": STARVATION_AGING_STEP, "writer_preference": True}
+
     def update_protocol(self):
-        self.lock_manager = LockManager(self.protocol_var.get())
+        self.lock_manager = self.new_lock_manager()
 
     def display_scaling(self, message):
         self.scaling_display.insert(tk.END, message + "\n")
@@ -307,7 +823,7 @@ class App:
 
     def add_transaction(self):
         tid = self.next_tid
-        start_time = self.next_tid
+        start_time = self.clock.now()
         operations = self.current_operations[:]
 
         if not operations:
@@ -318,7 +834,7 @@ class App:
         self.transactions.append((trans, operations))
 
         if self.lock_manager is None:
-            self.lock_manager = LockManager(self.protocol_var.get())
+            self.lock_manager = self.new_lock_manager()
 
         self.lock_manager.add_transaction(trans)
 
@@ -328,25 +844,77 @@ class App:
 
         operation_str = ', '.join([f"{op}({item})" for op, item in operations])
         self.display_scaling(f"Added Transaction {tid} with operations: {operation_str}, Start Time: {start_time}")
+        self.lock_protocol_selection()
 
+    def lock_protocol_selection(self):
         # Disable protocol selection radio buttons
         self.wait_die_radio.config(state=tk.DISABLED)
         self.wound_wait_radio.config(state=tk.DISABLED)
+        self.occ_radio.config(state=tk.DISABLED)
+        self.to_radio.config(state=tk.DISABLED)
+        self.to_thomas_radio.config(state=tk.DISABLED)
+        self.starvation_check.config(state=tk.DISABLED)
+        self.record_check.config(state=tk.DISABLED)
+
+    def load_transactions(self):
+        path = filedialog.askopenfilename(
+            title="Load Transactions",
+            filetypes=[("Transaction files", "*.txt *.jsonl *.ndjson *.csv *.gz"), ("All files", "*")])
+        if not path:
+            return
+
+        if self.lock_manager is None:
+            self.lock_manager = self.new_lock_manager()
+        loaded = 0
+        try:
+            for _, operations in read_transactions(path):
+                trans = Transaction(self.next_tid, self.clock.now())
+                self.transactions.append((trans, operations))
+                self.lock_manager.add_transaction(trans)
+                self.next_tid += 1
+                loaded += 1
+        except (OSError, ValueError) as error:
+            messagebox.showerror("Load Error", str(error))
+        if loaded:
+            self.display_scaling(f"Loaded {loaded} transactions from {path}")
+            self.lock_protocol_selection()
 
     def execute_transactions(self):
         if not self.transactions:
             messagebox.showwarning("Execution Error", "No transactions to execute")
             return
 
-        def run_transactions():
-            threads = []
-            for trans, operations in sorted(self.transactions, key=lambda t: t[0].start_time):
-                t = threading.Thread(target=transaction_workflow, args=(trans, operations, self.lock_manager))
-                threads.append(t)
-                t.start()
+        workflow = transaction_workflow
+        if self.conservative_var.get():
+            if not hasattr(self.lock_manager, "request_locks"):
+                messagebox.showwarning("Execution Error", "Conservative 2PL needs a locking protocol")
+                return
+            workflow = conservative_workflow
+
+        admission = self.admission if self.admission_var.get() else None
+        use_waves = self.waves_var.get()
+        schedule = self.lock_manager.recorder
+        timeline = TimelineRecorder(forward=schedule)
+        tracer = None
+        if self.trace_var.get():
+            try:
+                tracer = TraceRecorder(default_trace_path(), forward=timeline)
+            except OSError as error:
+                messagebox.showerror("Trace Error", str(error))
+                return
+        self.lock_manager.recorder = tracer or timeline
+        self.timeline.reset(timeline)
+        self.admission_check.config(state=tk.DISABLED)
+        self.waves_check.config(state=tk.DISABLED)
+        self.conservative_check.config(state=tk.DISABLED)
+        self.trace_check.config(state=tk.DISABLED)
 
-            for t in threads:
-                t.join()
+        def run_transactions():
+            if use_waves:
+                waves = start_in_waves(self.lock_manager, self.transactions, admission, workflow)
+                self.display_scaling(f"Scheduled {describe_waves(waves)}")
+            else:
+                start_transactions(self.lock_manager, self.transactions, admission, workflow)
 
             execution_order = ", ".join([str(trans.tid) for trans, _ in self.transactions])
             self.display_scaling(f"Transactions executed in order: {execution_order}")
@@ -357,17 +925,87 @@ class App:
                 self.display_log_disk(f"Transaction {trans.tid} with operations: {operation_str}")
             self.display_log_disk("--commit--")
 
+            timeline.finish()
+            if tracer is not None:
+                tracer.close()
+                self.display_scaling(f"Trace of {tracer.events} events written to {tracer.path}")
+            if schedule is not None:
+                self.last_recording = (self.lock_manager.protocol, schedule, self.lock_options())
+                self.display_scaling(f"Recorded {len(schedule.steps())} schedule steps")
+                for line in check_history(schedule.events).format():
+                    self.display_scaling(line)
+
             self.transactions.clear()
-            self.lock_manager = LockManager(self.protocol_var.get())
+            self.lock_manager = self.new_lock_manager()
             self.next_tid = 1
 
             # Re-enable protocol selection radio buttons
             self.wait_die_radio.config(state=tk.NORMAL)
             self.wound_wait_radio.config(state=tk.NORMAL)
+            self.occ_radio.config(state=tk.NORMAL)
+            self.to_radio.config(state=tk.NORMAL)
+            self.to_thomas_radio.config(state=tk.NORMAL)
+            self.starvation_check.config(state=tk.NORMAL)
+            self.record_check.config(state=tk.NORMAL)
+            self.admission_check.config(state=tk.NORMAL)
+            self.waves_check.config(state=tk.NORMAL)
+            self.conservative_check.config(state=tk.NORMAL)
+            self.trace_check.config(state=tk.NORMAL)
 
         execution_thread = threading.Thread(target=run_transactions)
         execution_thread.start()
 
+    def predict_contention(self):
+        if not self.transactions:
+            messagebox.showwarning("Prediction Error", "No transactions to analyze")
+            return
+
+        analysis = analyze_conflicts(self.transactions)
+        self.display_scaling("Predicted contention for the queued batch:")
+        for line in analysis.format():
+            self.display_scaling(f"  {line}")
+        protocol = self.protocol_var.get()
+        if protocol in ("wait-die", "wound-wait"):
+            victims = ", ".join(str(tid) for tid in sorted(analysis.predicted_aborts(protocol))) or "none"
+            self.display_scaling(f"  Likely {protocol} victims: {victims}")
+
+    def replay_last_schedule(self):
+        if self.last_recording is None:
+            messagebox.showwarning("Replay Error", "No recorded schedule to replay")
+            return
+
+        protocol, recorded, options = self.last_recording
+        if protocol not in ("wait-die", "wound-wait"):
+            messagebox.showwarning("Replay Error", "Only lock-based schedules can be replayed")
+            return
+        scheduler = DeterministicScheduler(
+            lambda: LockManager(protocol, messages=NullQueue(), re_execute=False, **options), Transaction)
+        result = scheduler.replay(recorded)
+
+        self.display_scaling(f"Replayed {len(recorded.steps())} steps ({protocol}):")
+        for line in result.recorder.format():
+            self.display_scaling(f"  {line}")
+        if result.decisions() == recorded.decisions():
+            self.display_scaling("Replay matches the recorded decisions")
+        else:
+            self.display_scaling("Replay diverged from the recorded decisions")
+
+    def dump_lock_state(self):
+        if self.lock_manager is None:
+            messagebox.showwarning("Dump Error", "No lock manager to dump yet")
+            return
+
+        path = default_dump_path()
+        try:
+            state = dump_state(self.lock_manager, path)
+        except OSError as error:
+            messagebox.showerror("Dump Error", str(error))
+            return
+
+        self.display_scaling(f"Lock state written to {path}:")
+        for line in describe_state(state, now=time.time()):
+            self.display_scaling(line)
+
     def clear_scaling(self):
         self.scaling_display.delete(1.0, tk.END)
 
@@ -385,7 +1023,206 @@ class App:
             pass
         self.root.after(100, self.update_message_display)
 
+    def update_metrics_display(self):
+        snapshot = self.metrics.snapshot(top_n=METRICS_TOP_N)
+        previous = self.last_metrics_snapshot
+        self.last_metrics_snapshot = snapshot
+
+        if previous is not None:
+            elapsed = (snapshot["taken_at"] - previous["taken_at"]) / 1e9
+            commits = snapshot["commits"] - previous["commits"]
+            aborts = sum(snapshot["aborts"].values()) - sum(previous["aborts"].values())
+            finished = commits + aborts
+            waits = snapshot["wait_ns"].count - previous["wait_ns"].count
+            wait_total = snapshot["wait_ns"].total - previous["wait_ns"].total
+
+            tps = commits / elapsed if elapsed > 0 else 0.0
+            abort_rate = 100.0 * aborts / finished if finished else 0.0
+            self.tps_label.config(text=f"TPS: {tps:.1f}")
+            self.abort_rate_label.config(text=f"Abort rate: {abort_rate:.1f}%")
+            self.wait_history.append(wait_total / waits / 1e6 if waits else 0.0)
+
+        self.active_label.config(text=f"Active: {snapshot['active']}  Waiting: {snapshot['waiting']}  "
+                                      f"Read-only: {snapshot['read_only']}")
+        admission = self.admission.snapshot()
+        self.admission_label.config(text=f"MPL limit: {admission['limit']}  Queued: {admission['queued']}")
+        hot_items = ", ".join(f"{item} ({count})" for item, count in snapshot["hot_items"])
+        self.hot_items_label.config(text=f"Hottest items: {hot_items or '-'}")
+        starved = ", ".join(f"T{tid} {wait_ns / 1e9:.2f}s/{aborts} aborts{' (waiting)' if waiting else ''}"
+                            for tid, wait_ns, aborts, waiting in snapshot["starvation"])
+        self.starvation_label.config(text=f"Longest waits: {starved or '-'}")
+        self.draw_wait_sparkline()
+
+        self.root.after(METRICS_REFRESH_MS, self.update_metrics_display)
+
+    def update_timeline(self):
+        self.timeline.refresh()
+        self.root.after(TIMELINE_REFRESH_MS, self.update_timeline)
+
+    def draw_wait_sparkline(self):
+        self.wait_sparkline.delete("all")
+        if len(self.wait_history) < 2:
+            return
+        peak = max(self.wait_history) or 1.0
+        step = SPARKLINE_WIDTH / (METRICS_HISTORY - 1)
+        offset = METRICS_HISTORY - len(self.wait_history)
+        points = []
+        for i, value in enumerate(self.wait_history):
+            points.append((offset + i) * step)
+            points.append(SPARKLINE_HEIGHT - 2 - (SPARKLINE_HEIGHT - 4) * value / peak)
+        self.wait_sparkline.create_line(*points, fill="blue")
+        self.wait_sparkline.create_text(2, 2, anchor=tk.NW, text=f"{peak:.1f}", font=("TkDefaultFont", 7))
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrency Control Protocols")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="serve metrics in the Prometheus text format (0.0.4) on http://127.0.0.1:PORT/metrics")
+    parser.add_argument("--simulate", type=int, metavar="N", default=None,
+                        help="run N random transactions on a virtual clock and exit")
+    parser.add_argument("--sharded", type=int, metavar="N", default=None,
+                        help="run N random transactions on a multi-process sharded engine and exit")
+    parser.add_argument("--shards", type=int, default=None, help="worker processes for --sharded (default: CPU count)")
+    parser.add_argument("--two-phase", type=int, metavar="N", default=None,
+                        help="run N random transactions across local lock server nodes with two-phase commit and exit")
+    parser.add_argument("--nodes", type=int, default=3, help="lock server nodes for --two-phase")
+    parser.add_argument("--coordinator-log", metavar="PATH", default=None,
+                        help="with --two-phase, force commit decisions to PATH and recover from it first")
+    parser.add_argument("--serve", type=int, metavar="PORT", default=None,
+                        help="run a headless lock server node on 127.0.0.1:PORT")
+    parser.add_argument("--protocol", choices=["wait-die", "wound-wait"], default="wait-die")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--items", type=int, default=100,
+                        help="distinct items in generated workloads (--simulate, --sharded, --two-phase)")
+    parser.add_argument("--arrival", type=float, default=0.01, metavar="SECONDS",
+                        help="mean virtual time between Poisson arrivals for --simulate and --virtual "
+                             "(0: everything arrives at once)")
+    parser.add_argument("--latency", type=float, default=0.1, metavar="SECONDS",
+                        help="mean virtual time an operation takes for --simulate and --virtual (exponential)")
+    parser.add_argument("--check-serializability", action="store_true",
+                        help="with --simulate, check the conflict graph of the run as it happens")
+    parser.add_argument("--predict", action="store_true",
+                        help="with --simulate, print the contention predicted for the workload as one batch first")
+    parser.add_argument("--ingest", metavar="SOURCE", default=None,
+                        help="stream transactions from a file or - (stdin), run them headless and exit")
+    parser.add_argument("--format", choices=FORMATS, default=None,
+                        help="format of --ingest (default: from the file extension, text for stdin)")
+    parser.add_argument("--workers", type=int, default=16, help="worker threads for --ingest")
+    parser.add_argument("--backlog", type=int, default=64,
+                        help="transactions --ingest reads ahead of the workers before it blocks")
+    parser.add_argument("--trace", metavar="PATH", default=None,
+                        help="with --ingest, write a Chrome/Perfetto trace of the run (gzipped if PATH ends in .gz)")
+    parser.add_argument("--virtual", action="store_true",
+                        help="with --ingest, run the stream on the virtual-clock simulator instead")
+    parser.add_argument("--store", choices=LAYOUTS, default="dict",
+                        help="item value layout for the UI (array: interned ids in one int64 buffer)")
+    parser.add_argument("--load-state", metavar="PATH", default=None,
+                        help="restore a lock state dump into a fresh manager, describe it and exit")
+    parser.add_argument("--node-id", type=int, default=0,
+                        help="node id (0-255) in the start times this process issues; give every process "
+                             "that issues or serves them its own")
+    args = parser.parse_args()
+    try:
+        clock = HybridLogicalClock(args.node_id)
+    except ValueError as error:
+        parser.error(str(error))
+    if args.items < 1 or args.arrival < 0 or args.latency <= 0:
+        parser.error("--items and --latency must be positive and --arrival not negative")
+    items = [f"k{n}" for n in range(args.items)]
+    arrival = exponential(args.arrival) if args.arrival else constant(0.0)
+
+    if args.load_state is not None:
+        try:
+            state = load_state(args.load_state)
+            messages = Queue()
+            lock_manager = LockManager(state["protocol"], messages=messages, re_execute=False)
+            restore_state(lock_manager, state, Transaction)
+        except (OSError, ValueError, KeyError) as error:
+            parser.exit(1, f"Cannot load {args.load_state}: {error}\n")
+        # Waits are timed from when the dump was taken
+        for line in describe_state(lock_manager.state_snapshot(), now=state["taken_at"]):
+            print(line)
+        while not messages.empty():
+            print(messages.get())
+        raise SystemExit(0)
+
+    if args.simulate is not None:
+        lock_manager = LockManager(args.protocol, messages=NullQueue(), re_execute=False)
+        checker = SerializabilityChecker() if args.check_serializability else None
+        simulator = Simulator(lock_manager, Transaction, op_latency=exponential(args.latency), arrival=arrival,
+                              seed=args.seed, checker=checker)
+        workload = generate_workload(args.simulate, items=items, seed=args.seed)
+        if args.predict:
+            workload = list(workload)
+            batch = [(Transaction(tid, tid), operations) for tid, operations in enumerate(workload, 1)]
+            print("\n".join(analyze_conflicts(batch).format()))
+        result = simulator.run(workload)
+        print(f"{args.protocol}: {result.summary()}")
+        if checker is not None:
+            print("\n".join(checker.report().format()))
+        raise SystemExit(0)
+
+    if args.ingest is not None:
+        records = read_transactions(args.ingest, args.format)
+        try:
+            if args.virtual:
+                lock_manager = LockManager(args.protocol, messages=NullQueue(), re_execute=False)
+                simulator = Simulator(lock_manager, Transaction, op_latency=exponential(args.latency),
+                                      arrival=arrival, seed=args.seed)
+                result = simulator.run(operations for _, operations in records)
+                print(f"{args.protocol}: {result.summary()}")
+            else:
+                metrics = LockMetrics()
+                tracer = TraceRecorder(args.trace) if args.trace is not None else None
+                lock_manager = LockManager(args.protocol, metrics=metrics, recorder=tracer, messages=NullQueue())
+                try:
+                    count = stream_headless(lock_manager, records, workers=args.workers, backlog=args.backlog,
+                                            clock=clock)
+                finally:
+                    if tracer is not None:
+                        tracer.close()
+                snapshot = metrics.snapshot()
+                print(f"{args.protocol}: {count} transactions, {snapshot['commits']} committed, "
+                      f"{sum(snapshot['aborts'].values())} aborts")
+        except (OSError, ValueError) as error:
+            parser.exit(1, f"{error}\n")
+        raise SystemExit(0)
+
+    if args.serve is not None:
+        server = LockServer(LockManager(args.protocol, messages=NullQueue(), re_execute=False), Transaction,
+                            port=args.serve, node_id=args.node_id)
+        print(f"{args.protocol} lock server listening on {server.address[0]}:{server.address[1]}")
+        server.serve_forever()
+        raise SystemExit(0)
+
+    if args.sharded is not None:
+        make_lock_manager = functools.partial(LockManager, args.protocol, messages=NullQueue(), re_execute=False)
+        with ShardedEngine(make_lock_manager, Transaction, shards=args.shards, clock=clock) as engine:
+            result = engine.run(generate_workload(args.sharded, items=items, seed=args.seed))
+        print(f"{args.protocol}: {result.summary()}")
+        raise SystemExit(0)
+
+    if args.two_phase is not None:
+        make_lock_manager = functools.partial(LockManager, args.protocol, messages=NullQueue(), re_execute=False)
+        with LocalCluster(args.nodes, make_lock_manager, Transaction) as cluster:
+            participants = [RemoteParticipant(host, port) for host, port in cluster.addresses]
+            log = CoordinatorLog(args.coordinator_log)
+            coordinator = TwoPhaseCommitCoordinator(participants, log=log)
+            try:
+                coordinator.recover()
+                workload = generate_workload(args.two_phase, items=items, seed=args.seed)
+                transactions = [(tid, clock.now(), operations) for tid, operations in enumerate(workload, 1)]
+                result = coordinator.run(transactions)
+            finally:
+                coordinator.close()
+                log.close()
+                for participant in participants:
+                    participant.close()
+        print(f"{args.protocol}: {result.summary()}")
+        raise SystemExit(0)
+
     root = tk.Tk()
-    app = App(root)
+    app = App(root, store_layout=args.store, node_id=args.node_id)
+    if args.metrics_port is not None:
+        exporter = MetricsExporter(app.metrics, lambda: app.lock_manager, port=args.metrics_port).start()
+        app.display_scaling(f"Serving metrics on {exporter.url}")
     root.mainloop()
@@ -0,0 +1,198 @@
+import time
+import tkinter as tk
+
+from lock_events import LockSpanRecorder
+
+# Layout and colours
+ROW_HEIGHT = 16
+LABEL_WIDTH = 48
+PIXELS_PER_SECOND = 200
+COLORS = {
+    "active": "#e6e6e6",
+    "wait": "#f1c232",
+    "R": "#6fa8dc",
+    "W": "#1c4587",
+    "abort": "#cc0000",
+    "commit": "#38a838",
+}
+
+
+# Per-transaction timeline row
+class _Row:
+    __slots__ = ("tid", "begin", "end", "spans", "marks", "activity")
+
+    def __init__(self, activity):
+        self.tid = activity.tid
+        self.begin = activity.begin
+        self.end = None  # commit time
+        self.spans = []  # closed (start, end, kind), kind is "wait", "R" or "W"
+        self.marks = []  # (time, "abort" or "commit")
+        self.activity = activity  # open waits and holds, and the version
+
+
+# TimelineRecorder class
+#
+# A LockSpanRecorder that keeps one row per transaction, in the order they
+# began: its closed wait and hold spans plus abort and commit marks. view()
+# hands out only the rows and spans inside a time window, so the panel never
+# copies more than it draws.
+class TimelineRecorder(LockSpanRecorder):
+    def __init__(self, forward=None, clock=time.monotonic):
+        super().__init__(forward)
+        self.clock = clock
+        self.origin = clock()
+        self.rows = []
+        self.stopped = None
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _now(self):
+        return self.clock() - self.origin
+
+    def _begin(self, activity):
+        activity.owner = _Row(activity)
+        self.rows.append(activity.owner)
+
+    def _span(self, activity, category, item, lock_type, start, end, how=None):
+        activity.owner.spans.append((start, end, "wait" if category == "wait" else lock_type))
+
+    def _aborted(self, activity, now, detail):
+        activity.owner.marks.append((now, "abort"))
+
+    def _committed(self, activity, now):
+        activity.owner.marks.append((now, "commit"))
+        activity.owner.end = now
+
+    def elapsed(self):
+        return self.stopped if self.stopped is not None else self._now()
+
+    def finish(self):
+        # Freeze the clock once the batch is over; anything still open ends here
+        with self._lock:
+            if self.stopped is None:
+                self.stopped = self._now()
+                self._close_active(self.stopped)
+
+    def view(self, first, last, start, end):
+        # Rows first..last-1 as (index, tid, begin, end, spans, marks,
+        # version), keeping only what overlaps [start, end]. Open spans run
+        # to now, and a row that has any reports version None: it grows.
+        now = self.elapsed()
+        visible = []
+        with self._lock:
+            for index in range(max(first, 0), min(last, len(self.rows))):
+                row = self.rows[index]
+                activity = row.activity
+                spans = [span for span in row.spans if span[1] >= start and span[0] <= end]
+                spans.extend((started, now, "wait") for started, _ in activity.waits.values() if started <= end)
+                spans.extend((started, now, lock_type) for started, lock_type in activity.holds.values()
+                             if started <= end)
+                marks = [mark for mark in row.marks if start <= mark[0] <= end]
+                version = None if row.end is None else activity.version
+                visible.append((index, row.tid, row.begin, row.end, spans, marks, version))
+        return visible
+
+
+# TimelinePanel class
+#
+# Gantt view of a TimelineRecorder on a scrollable tk.Canvas. refresh() only
+# touches rows inside the viewport: rows that scrolled out are deleted, and a
+# visible row is redrawn only when it changed, is still running, or the
+# horizontal window moved, so thousands of transactions stay cheap. While
+# the view is scrolled to the right edge it follows the clock.
+class TimelinePanel:
+    def __init__(self, parent, width=900, height=200):
+        self.frame = tk.Frame(parent)
+        self.recorder = None
+        self.drawn = {}  # row index -> version drawn
+        self.window = None  # (start, end) seconds drawn last time
+
+        legend = tk.Frame(self.frame)
+        legend.grid(row=0, column=0, columnspan=2, sticky=tk.W)
+        for text, color in (("waiting", COLORS["wait"]), ("holding R", COLORS["R"]),
+                            ("holding W", COLORS["W"]), ("aborted", COLORS["abort"]),
+                            ("committed", COLORS["commit"])):
+            tk.Label(legend, text="  ", bg=color).pack(side=tk.LEFT, padx=(8, 2))
+            tk.Label(legend, text=text).pack(side=tk.LEFT)
+        self.range_label = tk.Label(legend, text="")
+        self.range_label.pack(side=tk.LEFT, padx=(16, 0))
+
+        self.canvas = tk.Canvas(self.frame, width=width, height=height, bg="white")
+        self.canvas.grid(row=1, column=0, sticky=tk.NSEW)
+        xscroll = tk.Scrollbar(self.frame, orient=tk.HORIZONTAL, command=self.scroll_x)
+        xscroll.grid(row=2, column=0, sticky=tk.EW)
+        yscroll = tk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self.scroll_y)
+        yscroll.grid(row=1, column=1, sticky=tk.NS)
+        self.canvas.config(xscrollcommand=xscroll.set, yscrollcommand=yscroll.set,
+                           scrollregion=(0, 0, width, height))
+
+    def grid(self, **options):
+        self.frame.grid(**options)
+
+    def scroll_x(self, *args):
+        self.canvas.xview(*args)
+        self.refresh()
+
+    def scroll_y(self, *args):
+        self.canvas.yview(*args)
+        self.refresh()
+
+    def reset(self, recorder):
+        self.recorder = recorder
+        self.canvas.delete("all")
+        self.drawn.clear()
+        self.window = None
+        self.canvas.xview_moveto(0)
+        self.canvas.yview_moveto(0)
+
+    def refresh(self):
+        if self.recorder is None:
+            return
+        canvas = self.canvas
+        following = canvas.xview()[1] >= 0.999
+        width = max(canvas.winfo_width(), int(canvas["width"]))
+        height = max(canvas.winfo_height(), int(canvas["height"]))
+        total_width = LABEL_WIDTH + self.recorder.elapsed() * PIXELS_PER_SECOND + 20
+        canvas.config(scrollregion=(0, 0, max(width, total_width), max(height, len(self.recorder) * ROW_HEIGHT)))
+        if following:
+            canvas.xview_moveto(1.0)
+
+        left, top = canvas.canvasx(0), canvas.canvasy(0)
+        first, last = int(top // ROW_HEIGHT), int((top + height) // ROW_HEIGHT) + 1
+        window = (max(0.0, (left - LABEL_WIDTH) / PIXELS_PER_SECOND), (left + width) / PIXELS_PER_SECOND)
+        moved = window != self.window
+        self.window = window
+        self.range_label.config(text=f"{window[0]:.1f} s - {window[1]:.1f} s, {len(self.recorder)} transactions")
+
+        for index in [index for index in self.drawn if not first <= index < last]:
+            canvas.delete(f"row{index}")
+            del self.drawn[index]
+        for row in self.recorder.view(first, last, *window):
+            index, version = row[0], row[-1]
+            if moved or version is None or self.drawn.get(index, -1) != version:
+                self.draw_row(row, left)
+                self.drawn[index] = version
+
+    def draw_row(self, row, left):
+        index, tid, begin, end, spans, marks, _ = row
+        canvas = self.canvas
+        tag = f"row{index}"
+        canvas.delete(tag)
+        top = index * ROW_HEIGHT + 2
+        bottom = top + ROW_HEIGHT - 4
+
+        def x(seconds):
+            return LABEL_WIDTH + seconds * PIXELS_PER_SECOND
+
+        right = x(end if end is not None else self.recorder.elapsed())
+        canvas.create_rectangle(x(begin), top, right, bottom, fill=COLORS["active"], outline="", tags=tag)
+        for start, stop, kind in spans:
+            canvas.create_rectangle(x(start), top, max(x(stop), x(start) + 1), bottom, fill=COLORS[kind],
+                                    outline="", tags=tag)
+        for at, kind in marks:
+            canvas.create_line(x(at), top - 1, x(at), bottom + 1, fill=COLORS[kind], width=2, tags=tag)
+        # The label sticks to the left edge of the viewport
+        canvas.create_rectangle(left, top - 2, left + LABEL_WIDTH - 4, bottom + 2, fill="white", outline="",
+                                tags=tag)
+        canvas.create_text(left + 4, (top + bottom) / 2, text=f"T{tid}", anchor=tk.W, tags=tag)
@@ -0,0 +1,134 @@
+import threading
+import time
+
+from replay import NullQueue
+
+
+# TimestampOrderingEngine class
+#
+# Basic timestamp ordering behind the LockManager interface. Each item keeps
+# the largest start_time that read it and that wrote it; an operation that
+# arrives too late is rejected on the spot, so nothing ever waits:
+#   read  with ts < write_ts             -> abort
+#   write with ts < read_ts              -> abort
+#   write with ts < write_ts             -> abort, or with the Thomas write
+#                                           rule, skip the obsolete write
+# A rejected transaction ignores the rest of its operations, fails
+# commit_transaction and is run again with a fresh timestamp above every one
+# seen so far; keeping the old one would only get it rejected again. Writes
+# are applied at once, so the abort undoes those of the attempt that no
+# later write has covered: left behind, its write_ts would reject older
+# readers for nothing and the store would show a value that never committed.
+# (A write the Thomas rule skipped because of an undone one stays skipped.)
+class TimestampOrderingEngine:
+    def __init__(self, thomas_write_rule=False, metrics=None, recorder=None, messages=None, store=None):
+        self.thomas_write_rule = thomas_write_rule
+        self.protocol = "to-thomas" if thomas_write_rule else "to"
+        self.read_ts = {}
+        self.write_ts = {}
+        self.rejected = set()  # tids whose current attempt was aborted
+        self.undo = {}  # tid -> [(item, write_ts, value) before the attempt's first write to it]
+        self.max_timestamp = 0
+        self.transactions = {}
+        self.metrics = metrics
+        self.recorder = recorder
+        self.messages = messages if messages is not None else NullQueue()
+        self.lock = threading.RLock()
+        self.skipped_writes = 0
+        self.store = store  # Optional value store; an accepted write stores the writer's tid
+
+    def add_transaction(self, trans):
+        with self.lock:
+            self.transactions[trans.tid] = trans
+            self.max_timestamp = max(self.max_timestamp, trans.start_time)
+            if self.recorder is not None:
+                self.recorder.record("add", trans.tid, detail=trans.start_time)
+
+    def remove_transaction(self, trans):
+        with self.lock:
+            self.transactions.pop(trans.tid, None)
+            self.rejected.discard(trans.tid)
+            self.undo.pop(trans.tid, None)
+
+    def request_lock(self, trans, item, lock_type):
+        ts = trans.start_time
+        with self.lock:
+            if trans.tid in self.rejected:
+                return
+            if lock_type == 'R':
+                if ts < self.write_ts.get(item, 0):
+                    self.abort_transaction(trans, cause="late-read")
+                    return
+                if ts > self.read_ts.get(item, 0):
+                    self.read_ts[item] = ts
+            else:
+                if ts < self.read_ts.get(item, 0):
+                    self.abort_transaction(trans, cause="late-write")
+                    return
+                if ts < self.write_ts.get(item, 0):
+                    if not self.thomas_write_rule:
+                        self.abort_transaction(trans, cause="late-write")
+                        return
+                    self.skipped_writes += 1
+                    self.messages.put(f"Transaction {trans.tid} skips obsolete write to {item} (Thomas write rule)")
+                    return
+                undo = self.undo.setdefault(trans.tid, [])
+                if all(entry[0] != item for entry in undo):
+                    value = self.store.get(item) if self.store is not None else None
+                    undo.append((item, self.write_ts.get(item), value))
+                self.write_ts[item] = ts
+                if self.store is not None:
+                    self.store.put(item, trans.tid)
+            if self.recorder is not None:
+                self.recorder.record("granted", trans.tid, item, lock_type)
+
+    def release_lock(self, trans, item):
+        pass
+
+    def commit_transaction(self, trans):
+        with self.lock:
+            if trans.tid in self.rejected:
+                self.rejected.discard(trans.tid)
+                self.max_timestamp += 1
+                trans.start_time = self.max_timestamp
+                self.messages.put(f"Transaction {trans.tid} restarts with timestamp {trans.start_time}")
+                return False
+            self.undo.pop(trans.tid, None)
+            if self.recorder is not None:
+                self.recorder.record("commit", trans.tid)
+        return True
+
+    def abort_transaction(self, trans, cause=None):
+        with self.lock:
+            self.rejected.add(trans.tid)
+            for item, write_ts, value in reversed(self.undo.pop(trans.tid, [])):
+                if self.write_ts.get(item) != trans.start_time:
+                    continue  # Overwritten since by a younger transaction
+                if write_ts is None:
+                    del self.write_ts[item]
+                else:
+                    self.write_ts[item] = write_ts
+                if self.store is not None:
+                    self.store.put(item, value)
+            trans.aborts += 1
+            if self.metrics is not None:
+                self.metrics.transaction_aborted(trans, cause)
+            if self.recorder is not None:
+                self.recorder.record("aborted", trans.tid, detail=cause)
+        self.messages.put(f"Transaction {trans.tid} aborted ({cause or 'external'})")
+
+    def table_snapshot(self):
+        with self.lock:
+            return {"holders": {}, "modes": {}, "waiters": {}, "transactions": len(self.transactions)}
+
+    def state_snapshot(self):
+        with self.lock:
+            transactions = [(trans.tid, trans.start_time) for trans in self.transactions.values()]
+        return {
+            "version": 1,
+            "taken_at": time.time(),
+            "protocol": self.protocol,
+            "transactions": [[tid, start_time, []] for tid, start_time in transactions],
+            "holders": {},
+            "waiters": {},
+        }
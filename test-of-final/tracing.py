@@ -0,0 +1,135 @@
+import gzip
+import json
+import os
+import queue
+import threading
+import time
+
+from lock_events import LockSpanRecorder
+
+
+def _open(path):
+    return gzip.open(path, "wt", encoding="utf-8") if path.endswith(".gz") else open(path, "w", encoding="utf-8")
+
+
+def default_trace_path():
+    return time.strftime("trace-%Y%m%d-%H%M%S.json")
+
+
+# TraceRecorder class
+#
+# A LockSpanRecorder that streams the run as Chrome trace-event JSON, which
+# chrome://tracing and the Perfetto UI both open. Each transaction is drawn
+# on the track of the worker thread that runs it:
+#   T<tid>           from its first call into the engine to its commit
+#   wait R(x)        from being queued to the grant or the abort
+#   hold W(x)        from the grant to the release, abort or commit
+#   abort, commit    instant events; an abort raised from another
+#                    transaction's call (a wound) names it in args.by
+# A grant that arrives after its transaction committed shows up as a
+# "late grant" instant. record() runs under the LockManager's mutex, so it
+# only queues finished events; a writer thread serialises them and writes
+# the file. Only open spans and events not yet written stay in memory.
+class TraceRecorder(LockSpanRecorder):
+    def __init__(self, path, forward=None, clock=time.perf_counter_ns):
+        super().__init__(forward)
+        self.path = path
+        self.clock = clock
+        self.origin = clock()
+        self.pid = os.getpid()
+        self.out = _open(path)
+        self.pending = queue.SimpleQueue()  # Events for the writer; None ends the file
+        self.writer = threading.Thread(target=self._write, name="trace-writer", daemon=True)
+        self.writer.start()
+        self.tracks = {}  # thread name -> track number
+        self.running = {}  # track -> tid it last started
+        self._emit({"name": "process_name", "ph": "M", "pid": self.pid, "args": {"name": "Concurrency Control"}})
+
+    def _emit(self, event):
+        self.pending.put(event)
+
+    def _write(self):
+        # Drain whatever has queued up in one write per wake-up
+        self.out.write("[")
+        separator = "\n"
+        while True:
+            batch = [self.pending.get()]
+            while batch[-1] is not None:
+                try:
+                    batch.append(self.pending.get_nowait())
+                except queue.Empty:
+                    break
+            done = batch[-1] is None
+            if done:
+                batch.pop()
+            if batch:
+                self.out.write(separator + ",\n".join(json.dumps(event, separators=(",", ":")) for event in batch))
+                separator = ",\n"
+            if done:
+                break
+        self.out.write("\n]\n")
+        self.out.close()
+
+    def _now(self):
+        return (self.clock() - self.origin) / 1000  # trace timestamps are in microseconds
+
+    def _track(self):
+        # Keyed by name: thread idents are reused once a thread exits
+        name = threading.current_thread().name
+        track = self.tracks.get(name)
+        if track is None:
+            track = self.tracks[name] = len(self.tracks) + 1
+            self._emit({"name": "thread_name", "ph": "M", "pid": self.pid, "tid": track, "args": {"name": name}})
+        return track
+
+    def _complete(self, name, cat, track, start, end, args=None):
+        event = {"name": name, "cat": cat, "ph": "X", "pid": self.pid, "tid": track, "ts": start, "dur": end - start}
+        if args:
+            event["args"] = args
+        self._emit(event)
+
+    def _instant(self, name, cat, track, ts, args=None):
+        event = {"name": name, "cat": cat, "ph": "i", "s": "t", "pid": self.pid, "tid": track, "ts": ts}
+        if args:
+            event["args"] = args
+        self._emit(event)
+
+    def _begin(self, activity):
+        activity.owner = self._track()
+        self.running[activity.owner] = activity.tid
+
+    def _span(self, activity, category, item, lock_type, start, end, how=None):
+        self._complete(f"{category} {lock_type}({item})", category, activity.owner, start, end,
+                       {how: True} if how else None)
+
+    def _aborted(self, activity, now, detail):
+        args = {"cause": detail or "external"}
+        by = self.running.get(self._track())
+        if by is not None and by != activity.tid:
+            args["by"] = f"T{by}"
+        self._instant(f"abort T{activity.tid}", "abort", activity.owner, now, args)
+
+    def _committed(self, activity, now):
+        track = activity.owner
+        self._instant(f"commit T{activity.tid}", "commit", track, now)
+        self._complete(f"T{activity.tid}", "transaction", track, activity.begin, now, {"aborts": activity.aborts})
+
+    def _late(self, tid, kind, item, lock_type, now, detail):
+        if kind == "granted":
+            self._instant(f"late grant T{tid} {lock_type}({item})", "hold", self._track(), now)
+        else:
+            self._instant(f"abort T{tid}", "abort", self._track(), now, {"cause": detail or "external",
+                                                                         "after_commit": True})
+
+    def close(self):
+        with self._lock:
+            if self.closed:
+                return
+            now = self._now()
+            self._close_active(now)
+            for activity in self.active.values():
+                self._complete(f"T{activity.tid}", "transaction", activity.owner, activity.begin, now,
+                               {"aborts": activity.aborts, "unfinished": True})
+            self.active.clear()
+        self.pending.put(None)
+        self.writer.join()
@@ -0,0 +1,249 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from lock_server import (GRANTED, OP_COMMIT, OP_PREPARE, OP_ROLLBACK, OP_ROLLBACK_PREPARED, ConnectionPool,
+                         encode_lock_requests)
+from sharding import shard_for
+
+
+# Participant backed by an in-process LockService
+class LocalParticipant:
+    def __init__(self, service):
+        self.service = service
+
+    def prepare_many(self, batch):
+        # batch: [(tid, start_time, [(item, lock_type), ...]), ...]
+        return [self.service.prepare(self.service.transaction(tid, start_time), requests)
+                for tid, start_time, requests in batch]
+
+    def commit_many(self, tids):
+        self._finish(tids)
+
+    def abort_many(self, tids):
+        self._finish(tids)
+
+    def _finish(self, tids):
+        for tid in tids:
+            with self.service.mutex:
+                trans = self.service.transactions.get(tid)
+            if trans is not None:
+                self.service.finish(trans)
+
+    def abort_orphans(self):
+        return self.service.rollback_prepared()
+
+
+# Participant reached over the lock_server wire protocol; each phase is one
+# pipelined round trip however many transactions it carries
+class RemoteParticipant:
+    def __init__(self, host, port, pool_size=2):
+        self.pool = ConnectionPool(host, port, pool_size)
+
+    def prepare_many(self, batch):
+        with self.pool.connection() as client:
+            return client.pipeline([(OP_PREPARE, tid, start_time, encode_lock_requests(requests), "-")
+                                    for tid, start_time, requests in batch])
+
+    def commit_many(self, tids):
+        with self.pool.connection() as client:
+            client.pipeline([(OP_COMMIT, tid, 0, "", "-") for tid in tids])
+
+    def abort_many(self, tids):
+        with self.pool.connection() as client:
+            client.pipeline([(OP_ROLLBACK, tid, 0, "", "-") for tid in tids])
+
+    def abort_orphans(self):
+        with self.pool.connection() as client:
+            client.pipeline([(OP_ROLLBACK_PREPARED, 0, 0, "", "-")])
+
+    def close(self):
+        self.pool.close()
+
+
+# Presumed-abort coordinator log: only commit decisions are forced to disk,
+# so a transaction with no COMMIT record is aborted on recovery
+class CoordinatorLog:
+    def __init__(self, path=None):
+        self.path = path
+        self.committed = set()
+        self.ended = set()
+        self.mutex = threading.Lock()
+        self.file = None
+        if path is not None:
+            if os.path.exists(path):
+                with open(path) as log:
+                    for line in log:
+                        kind, _, tid = line.strip().partition(" ")
+                        (self.committed if kind == "C" else self.ended).add(int(tid))
+            self.file = open(path, "a")
+
+    def log_commit(self, tids):
+        # One forced write for the whole group
+        if not tids:
+            return
+        with self.mutex:
+            self.committed.update(tids)
+            if self.file is not None:
+                self.file.write("".join(f"C {tid}\n" for tid in tids))
+                self.file.flush()
+                os.fsync(self.file.fileno())
+
+    def log_end(self, tids):
+        if not tids:
+            return
+        with self.mutex:
+            self.ended.update(tids)
+            if self.file is not None:
+                self.file.write("".join(f"E {tid}\n" for tid in tids))
+
+    def outcome(self, tid):
+        return "commit" if tid in self.committed else "abort"
+
+    def in_doubt(self):
+        with self.mutex:
+            return self.committed - self.ended
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+# TwoPhaseCommitCoordinator class
+#
+# Each round prepares a group of pending transactions that do not conflict
+# with one another, oldest first, so the coordinator never makes its own
+# transactions wait for or kill each other; a conflicting one simply goes in
+# a later round. Votes against a group only come from locks held outside it.
+# Transactions keep their start time across retries, so the participants'
+# wait-die/wound-wait rules settle those conflicts locally: a transaction that
+# is told to wait or was killed retries with the same age and eventually is
+# the oldest, so no global deadlock detector is needed. max_attempts counts
+# the rounds in which a transaction was prepared and voted down.
+class TwoPhaseCommitCoordinator:
+    def __init__(self, participants, log=None, max_attempts=20, backoff=0.001):
+        self.participants = participants
+        self.log = log or CoordinatorLog()
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.executor = ThreadPoolExecutor(max_workers=max(1, len(participants)))
+
+    def close(self):
+        self.executor.shutdown()
+
+    def participant_for(self, item):
+        return shard_for(item, len(self.participants))
+
+    def _each(self, calls):
+        # Contact every participant in parallel: one round trip per phase
+        futures = [self.executor.submit(fn, arg) for fn, arg in calls]
+        return [future.result() for future in futures]
+
+    def run(self, transactions):
+        # transactions: [(tid, start_time, [(op, item), ...]), ...]
+        committed, failed, retries = [], [], 0
+        attempts = {}
+        pending = sorted(transactions, key=lambda entry: entry[1])
+        backoff = 0
+        while pending:
+            if backoff:
+                time.sleep(self.backoff * backoff)
+            group, later = self._group(pending)
+
+            batches = {}
+            for tid, start_time, operations in group:
+                parts = {}
+                for op, item in operations:
+                    requests = parts.setdefault(self.participant_for(item), {})
+                    if requests.get(item) != 'W':  # A write subsumes a read of the same item
+                        requests[item] = op
+                for index, requests in parts.items():
+                    batches.setdefault(index, []).append((tid, start_time, sorted(requests.items())))
+
+            # Phase one: batched prepare
+            votes = {tid: True for tid, _, _ in group}
+            prepared = {index: [] for index in batches}
+            results = self._each([(self.participants[index].prepare_many, batch) for index, batch in batches.items()])
+            for (index, batch), statuses in zip(batches.items(), results):
+                for (tid, _, _), status in zip(batch, statuses):
+                    if status == GRANTED:
+                        prepared[index].append(tid)
+                    else:
+                        votes[tid] = False
+
+            # Phase two: force the commit group, then tell everyone
+            to_commit = [tid for tid, vote in votes.items() if vote]
+            self.log.log_commit(to_commit)
+            commit_set = set(to_commit)
+            calls = []
+            for index, tids in prepared.items():
+                commits = [tid for tid in tids if tid in commit_set]
+                aborts = [tid for tid in tids if tid not in commit_set]
+                if commits:
+                    calls.append((self.participants[index].commit_many, commits))
+                if aborts:
+                    calls.append((self.participants[index].abort_many, aborts))
+            self._each(calls)
+            self.log.log_end(to_commit)
+            committed += to_commit
+
+            retry = []
+            for entry in group:
+                tid = entry[0]
+                if tid in commit_set:
+                    continue
+                attempts[tid] = attempts.get(tid, 0) + 1
+                if attempts[tid] >= self.max_attempts:
+                    failed.append(tid)
+                else:
+                    retries += 1
+                    retry.append(entry)
+            # Back off only while something outside the coordinator holds us up
+            backoff = backoff + 1 if retry and not to_commit else 0
+            pending = sorted(retry + later, key=lambda entry: entry[1])
+
+        return TwoPhaseCommitResult(committed, failed, retries)
+
+    @staticmethod
+    def _group(pending):
+        # Greedy, oldest first: a transaction joins the round unless it
+        # writes an item the group touches or touches one the group writes
+        modes = {}
+        group, later = [], []
+        for entry in pending:
+            wanted = {}
+            for op, item in entry[2]:
+                if wanted.get(item) != 'W':
+                    wanted[item] = op
+            if any(item in modes and 'W' in (op, modes[item]) for item, op in wanted.items()):
+                later.append(entry)
+                continue
+            group.append(entry)
+            for item, op in wanted.items():
+                if modes.get(item) != 'W':
+                    modes[item] = op
+        return group, later
+
+    def recover(self):
+        # Resend COMMIT for logged-but-unended transactions; presume abort
+        # for anything a participant still holds prepared after that, since
+        # every logged commit has now been delivered
+        in_doubt = sorted(self.log.in_doubt())
+        for participant in self.participants:
+            if in_doubt:
+                participant.commit_many(in_doubt)
+            participant.abort_orphans()
+        self.log.log_end(in_doubt)
+
+
+# TwoPhaseCommitResult class
+class TwoPhaseCommitResult:
+    def __init__(self, committed, failed, retries):
+        self.committed = committed
+        self.failed = failed
+        self.retries = retries
+
+    def summary(self):
+        return f"{len(self.committed)} committed, {len(self.failed)} failed, {self.retries} retries"
+
@@ -0,0 +1,37 @@
+def read_write_sets(operations):
+    reads, writes = set(), set()
+    for op, item in operations:
+        (writes if op == 'W' else reads).add(item)
+    return reads - writes, writes
+
+
+# Deterministic wave planning from declared read/write sets, Calvin-style:
+# transactions are taken in start_time order and each goes into the first
+# wave after every earlier transaction it conflicts with. A wave therefore
+# never holds two conflicting transactions and can run fully in parallel,
+# and conflicting pairs keep their start_time order. One pass, O(operations).
+def plan_waves(transactions):
+    last_read = {}  # item -> index of the last wave that reads it
+    last_write = {}  # item -> index of the last wave that writes it
+    waves = []
+    for trans, operations in sorted(transactions, key=lambda t: t[0].start_time):
+        reads, writes = read_write_sets(operations)
+        wave = 0
+        for item in reads:
+            wave = max(wave, last_write.get(item, -1) + 1)
+        for item in writes:
+            wave = max(wave, last_write.get(item, -1) + 1, last_read.get(item, -1) + 1)
+        if wave == len(waves):
+            waves.append([])
+        waves[wave].append((trans, operations))
+        for item in reads:
+            last_read[item] = max(last_read.get(item, -1), wave)
+        for item in writes:
+            last_write[item] = wave
+    return waves
+
+
+def describe_waves(waves):
+    widest = max((len(wave) for wave in waves), default=0)
+    total = sum(len(wave) for wave in waves)
+    return f"{total} transactions in {len(waves)} waves (widest {widest})"